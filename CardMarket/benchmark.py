@@ -0,0 +1,336 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from main import (
+    DEFAULT_ENGINE,
+    OPTIMIZER_ENGINES,
+    RESOURCES_DIR,
+    create_sellers_dataframe,
+    filter_sellers_df,
+    find_cheapest_seller_group,
+    print_info,
+    print_success,
+    print_warning,
+)
+from listings import compact_listings
+from countries import Countries, SHIPPING_MAX_VALUE
+from optimizer import build_price_matrix
+
+
+BENCHMARKS_DIR = os.path.join(RESOURCES_DIR, "Benchmarks")
+PRICE_DISTRIBUTIONS = ("lognormal", "uniform", "pareto")
+SHIPPING_TIER_VALUES = [25.0, 50.0, 100.0, 250.0, 500.0, SHIPPING_MAX_VALUE]
+
+SCENARIOS = {
+    "small": {"num_cards": 20, "num_sellers": 200, "num_countries": 5, "sparsity": 0.8},
+    "medium": {"num_cards": 60, "num_sellers": 1000, "num_countries": 10, "sparsity": 0.9},
+    "large": {"num_cards": 150, "num_sellers": 5000, "num_countries": 20, "sparsity": 0.95},
+}
+
+# Relative slowdown of a stage before it is reported as a regression
+TIME_TOLERANCE = 0.25
+
+
+# =============================================================================
+# Synthetic Data
+# =============================================================================
+
+def synthetic_countries(num_countries: int) -> list[str]:
+    """Listing-style country names ("Czech Republic") for the first ShippingApi countries."""
+    names = [country.name for country in Countries if country != Countries.NONE]
+    return [name.replace("_", " ").title() for name in names[:max(num_countries, 1)]]
+
+
+def generate_shipping_dict(seed: int = 0) -> dict:
+    """
+    Generate a shipping dictionary in the ShippingApi.get_shipping_prices format.
+
+    Every country gets the same value tiers with a random base price and
+    random, non-decreasing steps between tiers.
+    """
+    rng = np.random.default_rng(seed)
+    shipping_dict = {}
+    for country in Countries:
+        if country == Countries.NONE:
+            continue
+        prices = np.round(rng.uniform(1.0, 4.0) + np.cumsum(rng.uniform(0.0, 3.0, len(SHIPPING_TIER_VALUES))), 2)
+        shipping_dict[country.name] = [
+            {"price": float(price), "maxValue": float(max_value)}
+            for price, max_value in zip(prices, SHIPPING_TIER_VALUES)
+        ]
+    return shipping_dict
+
+
+def _base_prices(rng: np.random.Generator, num_cards: int, price_distribution: str) -> np.ndarray:
+    """Reference price per card drawn from the given distribution."""
+    if price_distribution == "uniform":
+        return rng.uniform(0.1, 20.0, num_cards)
+    if price_distribution == "pareto":
+        return (rng.pareto(1.5, num_cards) + 1.0) * 0.25
+    return rng.lognormal(mean=0.0, sigma=1.2, size=num_cards) + 0.02
+
+
+def generate_listings(
+    num_cards: int = 50,
+    num_sellers: int = 500,
+    num_countries: int = 10,
+    sparsity: float = 0.9,
+    price_distribution: str = "lognormal",
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate synthetic listings with the columns of scraped listings, in the
+    compact representation (see listings.compact_listings).
+
+    Each seller is placed in one of `num_countries` countries and offers each
+    card with probability 1 - `sparsity`, at the card's reference price
+    (see PRICE_DISTRIBUTIONS) times a random seller markup. Every card is
+    offered by at least one seller.
+    """
+    rng = np.random.default_rng(seed)
+    base_prices = _base_prices(rng, num_cards, price_distribution)
+
+    offered = rng.random((num_sellers, num_cards)) >= sparsity
+    unlisted = np.flatnonzero(~offered.any(axis=0))
+    offered[rng.integers(num_sellers, size=len(unlisted)), unlisted] = True
+    seller_index, card_index = np.nonzero(offered)
+
+    prices = base_prices[card_index] * rng.uniform(0.8, 1.25, len(card_index))
+    countries = np.array(synthetic_countries(num_countries))
+    seller_countries = countries[rng.integers(len(countries), size=num_sellers)]
+    seller_names = np.array([f"synthetic_seller_{s}" for s in range(num_sellers)])
+    card_names = np.array([f"Synthetic Card {c}" for c in range(num_cards)])
+
+    return compact_listings(pd.DataFrame({
+        "seller": seller_names[seller_index],
+        "card_name": card_names[card_index],
+        "price": np.maximum(np.round(prices, 2), 0.02),
+        "country": seller_countries[seller_index],
+        "link": [f"https://www.cardmarket.com/en/Magic/Products/Singles/Synthetic/Card-{c}" for c in card_index],
+    }))
+
+
+# =============================================================================
+# Benchmark Runner
+# =============================================================================
+
+def _measure(track_memory: bool, func, *args, **kwargs) -> tuple:
+    """Run func and return (result, stage record with wall time and peak memory)."""
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+        record = {"seconds": time.perf_counter() - start}
+        if track_memory:
+            record["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    return result, record
+
+
+def run_scenario(
+    name: str,
+    parameters: dict,
+    engines: list[str],
+    time_limit: float = None,
+    workers: int = 1,
+    track_memory: bool = True
+) -> dict:
+    """
+    Run the optimization pipeline on one synthetic scenario.
+
+    Records wall time and peak traced memory for create_sellers_dataframe,
+    filter_sellers_df and find_cheapest_seller_group (once per engine), plus
+    the plan cost and its ratio to the card-only cost (every card at its
+    cheapest price, no shipping), which is a lower bound on any plan.
+    Memory allocated in worker processes is not traced.
+    """
+    print_info(f"Scenario '{name}': {parameters}")
+    listings = generate_listings(**parameters)
+    shipping_dict = generate_shipping_dict(parameters.get("seed", 0))
+    card_names = sorted(listings['card_name'].str.lower().unique())
+
+    stages = {}
+    (sellers_df, found_cards), stages["create_sellers_dataframe"] = _measure(
+        track_memory, create_sellers_dataframe, listings, card_names
+    )
+    stages["create_sellers_dataframe"]["sellers"] = len(sellers_df)
+
+    filtered_df, stages["filter_sellers_df"] = _measure(
+        track_memory, filter_sellers_df, sellers_df, found_cards
+    )
+    stages["filter_sellers_df"]["sellers"] = len(filtered_df)
+
+    card_cost = float(build_price_matrix(sellers_df, found_cards).min(axis=0).sum())
+    for engine in engines:
+        (groups, cost), record = _measure(
+            track_memory, find_cheapest_seller_group,
+            filtered_df, shipping_dict, set(found_cards), engine, time_limit, workers
+        )
+        record["cost"] = float(cost)
+        record["card_cost"] = card_cost
+        record["cost_ratio"] = float(cost) / card_cost if card_cost > 0 else None
+        record["sellers"] = len(groups)
+        stages[f"find_cheapest_seller_group[{engine}]"] = record
+
+    # Heuristic plans are reported relative to the DP plan when both ran
+    dp_record = stages.get(f"find_cheapest_seller_group[{DEFAULT_ENGINE}]")
+    if dp_record is not None and dp_record["cost"] > 0:
+        for engine in engines:
+            record = stages[f"find_cheapest_seller_group[{engine}]"]
+            if engine != DEFAULT_ENGINE and np.isfinite(record["cost"]):
+                record["cost_vs_dp"] = record["cost"] / dp_record["cost"]
+
+    return {
+        "scenario": name,
+        "parameters": parameters,
+        "listings": len(listings),
+        "stages": stages,
+    }
+
+
+def compare_results(results: dict, baseline: dict, time_tolerance: float = TIME_TOLERANCE) -> int:
+    """
+    Compare a benchmark run against a previous results file.
+
+    A stage regresses when its plan cost increased or its wall time grew by
+    more than `time_tolerance`. Prints each regression and returns their count.
+    """
+    baseline_runs = {run["scenario"]: run for run in baseline.get("runs", [])}
+    regressions = 0
+    for run in results["runs"]:
+        previous = baseline_runs.get(run["scenario"])
+        if previous is None or previous["parameters"] != run["parameters"]:
+            continue
+        for stage, record in run["stages"].items():
+            old = previous["stages"].get(stage)
+            if old is None:
+                continue
+            if "cost" in record and record["cost"] > old["cost"] + 1e-9:
+                print_warning(
+                    f"{run['scenario']} / {stage}: cost {old['cost']:.2f} -> {record['cost']:.2f}"
+                )
+                regressions += 1
+            if record["seconds"] > old["seconds"] * (1 + time_tolerance):
+                print_warning(
+                    f"{run['scenario']} / {stage}: time {old['seconds']:.2f}s -> {record['seconds']:.2f}s"
+                )
+                regressions += 1
+    return regressions
+
+
+def print_summary(results: dict):
+    """Print one line per scenario stage."""
+    for run in results["runs"]:
+        for stage, record in run["stages"].items():
+            line = f"{run['scenario']:>8} {stage:<40} {record['seconds']:8.3f}s"
+            if "peak_mb" in record:
+                line += f" {record['peak_mb']:9.1f} MB"
+            if "cost" in record:
+                line += f"  cost {record['cost']:.2f}€"
+            if "cost_vs_dp" in record:
+                line += f" ({record['cost_vs_dp'] - 1:+.1%} vs DP)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the optimizer pipeline on synthetic listings",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark.py                                      # All preset scenarios
+  python benchmark.py --scenario small --engines numpy anytime --time-limit 10
+  python benchmark.py --cards 1000 --sellers 5000 --sparsity 0.97 --engines numpy greedy
+  python benchmark.py --cards 100 --sellers 2000 --sparsity 0.95 --distribution pareto
+  python benchmark.py --compare Resources/Benchmarks/benchmark_20260121_120000.json
+        """
+    )
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append",
+                        help="Preset scenario to run (repeatable, default: all)")
+    parser.add_argument("--cards", type=int, help="Number of cards (custom scenario)")
+    parser.add_argument("--sellers", type=int, help="Number of sellers (custom scenario)")
+    parser.add_argument("--countries", type=int, help="Number of seller countries (custom scenario)")
+    parser.add_argument("--sparsity", type=float,
+                        help="Probability that a seller does not offer a card (custom scenario)")
+    parser.add_argument("--distribution", choices=PRICE_DISTRIBUTIONS, default="lognormal",
+                        help="Card price distribution (default: lognormal)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--engines", nargs="+", choices=OPTIMIZER_ENGINES, default=[DEFAULT_ENGINE],
+                        help=f"Optimizer engines to run (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--time-limit", type=float, help="Time limit for the exact, anytime and greedy engines")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for the optimizer (default: 1, so memory is fully traced)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Do not trace memory (tracing slows down pure Python code)")
+    parser.add_argument("--output", "-o", help="Results file (default: Resources/Benchmarks/benchmark_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to check for regressions")
+
+    args = parser.parse_args()
+
+    custom = {
+        "num_cards": args.cards,
+        "num_sellers": args.sellers,
+        "num_countries": args.countries,
+        "sparsity": args.sparsity,
+    }
+    if any(value is not None for value in custom.values()):
+        parameters = dict(SCENARIOS["medium"])
+        parameters.update({key: value for key, value in custom.items() if value is not None})
+        scenarios = {"custom": parameters}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "engines": args.engines,
+        "time_limit": args.time_limit,
+        "workers": args.workers,
+        "runs": [
+            run_scenario(
+                name,
+                {**parameters, "price_distribution": args.distribution, "seed": args.seed},
+                args.engines,
+                args.time_limit,
+                args.workers,
+                not args.no_memory
+            )
+            for name, parameters in scenarios.items()
+        ],
+    }
+
+    output_path = args.output
+    if not output_path:
+        os.makedirs(BENCHMARKS_DIR, exist_ok=True)
+        output_path = os.path.join(
+            BENCHMARKS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print()
+    print_summary(results)
+    print_success(f"Results written to {output_path}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline)
+        if regressions:
+            print_warning(f"{regressions} regression(s) against {os.path.basename(args.compare)}")
+            sys.exit(1)
+        print_success(f"No regressions against {os.path.basename(args.compare)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import re
+from collections import defaultdict
 
+import numpy as np
+import pandas as pd
 import requests
 
 
@@ -22,6 +25,13 @@ MOXFIELD_HEADERS = {
 DECKLIST_LINE_PATTERN = re.compile(
     r"^\s*(\d+)x?\s+(.+?)(?:\s+\([A-Za-z0-9]+\)\s*\d*)?\s*$"
 )
+SET_SUFFIX_PATTERN = re.compile(r"\s+\([A-Za-z0-9]+\)\s*\d*\s*$")
+
+# Separates interchangeable printings in one card list entry:
+# "Lightning Bolt | Chain Lightning" is satisfied by either card
+ALTERNATIVE_SEPARATOR = "|"
+# Number of copies wanted, as a prefix of a card list entry: "4x Lightning Bolt"
+QUANTITY_PATTERN = re.compile(r"^\s*(\d+)x\s+(.+)$")
 
 BOARDS_TO_IMPORT = [
     "commanders",
@@ -36,7 +46,70 @@ class CardImportError(Exception):
     pass
 
 
-def parse_decklist(text: str) -> list[str]:
+def card_quantity(card: str) -> tuple[int, str]:
+    """Number of copies and card name of a card list entry ("4x A" -> (4, "A"))."""
+    match = QUANTITY_PATTERN.match(card)
+    if match and int(match.group(1)) > 0:
+        return int(match.group(1)), match.group(2).strip()
+    return 1, card.strip()
+
+
+def with_quantity(card: str, quantity: int) -> str:
+    """Card list entry for `quantity` copies of a card."""
+    return f"{quantity}x {card}" if quantity > 1 else card
+
+
+def card_variants(card: str) -> list[str]:
+    """Card names that satisfy a card list entry ("4x A | B" -> ["A", "B"])."""
+    _, name = card_quantity(card)
+    variants = [variant.strip() for variant in name.split(ALTERNATIVE_SEPARATOR)]
+    return [variant for variant in variants if variant]
+
+
+def expand_variants(cards: list[str]) -> list[str]:
+    """Every card name named by a card list, e.g. to gather listings for, without duplicates."""
+    names = []
+    seen = set()
+    for card in cards:
+        for variant in card_variants(card):
+            if variant.lower() not in seen:
+                names.append(variant)
+                seen.add(variant.lower())
+    return names
+
+
+def match_card_slots(card_names: pd.Series, slots: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Match listing card names against card list entries (slots).
+
+    A listing matches every slot that has its card as one of its variants,
+    compared case-insensitively; repeated slots only match at their first
+    index. Returns (row positions, slot indices) with one pair per match, in
+    listing order.
+    """
+    variant_slots = defaultdict(list)
+    seen_slots = set()
+    for index, slot in enumerate(slots):
+        if slot.lower() in seen_slots:
+            continue
+        seen_slots.add(slot.lower())
+        for variant in card_variants(slot.lower()):
+            if index not in variant_slots[variant]:
+                variant_slots[variant].append(index)
+
+    pairs = pd.DataFrame(
+        [(variant, index) for variant, indices in variant_slots.items() for index in indices],
+        columns=["key", "slot"]
+    )
+    # Match each distinct name once, then map the matches to rows by code
+    codes, names = pd.factorize(card_names)
+    names = pd.DataFrame({"key": pd.Index(names).astype(str).str.lower(), "code": np.arange(len(names))})
+    rows = pd.DataFrame({"code": codes, "row": np.arange(len(card_names))})
+    matched = rows.merge(names.merge(pairs, on="key"), on="code").sort_values("row", kind="stable")
+    return matched["row"].to_numpy(), matched["slot"].to_numpy()
+
+
+def parse_decklist(text: str, keep_quantities: bool = False) -> list[str]:
     """Parse a standard MTG decklist string into a list of card names.
 
     Supports the format: <quantity>[x] <card name> [(<set>) <collector#>]
@@ -44,8 +117,14 @@ def parse_decklist(text: str) -> list[str]:
         1 Springleaf Drum (LRW) 261
         4 Lightning Bolt
         1x Sol Ring
+        1 Lightning Bolt (M10) 146 | Chain Lightning (LEG)
+
+    Alternatives separated by "|" are kept as one entry, without their set codes.
+    Repeated cards are merged into one entry. By default each card is wanted
+    once, as in a card list; with `keep_quantities` a total above one becomes
+    an "<quantity>x " prefix (see card_quantity).
     """
-    cards = []
+    quantities = {}
     for line in text.strip().splitlines():
         line = line.strip()
         if not line:
@@ -54,14 +133,20 @@ def parse_decklist(text: str) -> list[str]:
         match = DECKLIST_LINE_PATTERN.match(line)
         if match:
             card_name = match.group(2).strip()
+            if ALTERNATIVE_SEPARATOR in card_name:
+                card_name = f" {ALTERNATIVE_SEPARATOR} ".join(
+                    SET_SUFFIX_PATTERN.sub("", variant) for variant in card_variants(card_name)
+                )
             if card_name:
-                cards.append(card_name)
+                quantities[card_name] = quantities.get(card_name, 0) + max(int(match.group(1)), 1)
         else:
             # Treat as bare card name (no quantity prefix)
             if line and not line.startswith("//") and not line.startswith("#"):
-                cards.append(line)
+                quantities[line] = quantities.get(line, 0) + 1
 
-    return cards
+    if not keep_quantities:
+        return list(quantities)
+    return [with_quantity(card, quantity) for card, quantity in quantities.items()]
 
 
 def extract_moxfield_deck_id(url: str) -> str:
@@ -75,11 +160,13 @@ def extract_moxfield_deck_id(url: str) -> str:
     return match.group(1)
 
 
-def import_from_moxfield(url: str) -> list[str]:
+def import_from_moxfield(url: str, keep_quantities: bool = False) -> list[str]:
     """Fetch a decklist from a Moxfield deck URL.
 
     Returns a list of unique card names from the deck's main boards
-    (commanders, mainboard, sideboard, companions, signature spells).
+    (commanders, mainboard, sideboard, companions, signature spells). With
+    `keep_quantities`, cards in the deck more than once get an
+    "<quantity>x " prefix.
     """
     deck_id = extract_moxfield_deck_id(url)
     api_url = f"{MOXFIELD_API_URL}/{deck_id}"
@@ -96,17 +183,17 @@ def import_from_moxfield(url: str) -> list[str]:
     data = response.json()
     boards = data.get("boards", {})
 
-    cards = []
-    seen = set()
+    quantities = {}
     for board_name in BOARDS_TO_IMPORT:
         board = boards.get(board_name, {})
         for entry in board.get("cards", {}).values():
             card_name = entry.get("card", {}).get("name", "")
-            if card_name and card_name not in seen:
-                cards.append(card_name)
-                seen.add(card_name)
+            if card_name:
+                quantities[card_name] = quantities.get(card_name, 0) + max(int(entry.get("quantity", 1) or 1), 1)
 
-    if not cards:
+    if not quantities:
         raise CardImportError(f"No cards found in deck: {url}")
 
-    return cards
+    if not keep_quantities:
+        return list(quantities)
+    return [with_quantity(card, quantity) for card, quantity in quantities.items()]
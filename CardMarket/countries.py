@@ -0,0 +1,43 @@
+from enum import Enum
+
+
+# Constants
+SHIPPING_MAX_VALUE = 1000
+
+# Enum for countries
+class Countries(Enum):
+   NONE = 0
+   AUSTRIA = 1
+   BELGIUM = 2
+   BULGARIA = 3
+   SWITZERLAND = 4
+   CYPRUS = 5
+   CZECH_REPUBLIC = 6
+   GERMANY = 7
+   DENMARK = 8
+   ESTONIA = 9
+   SPAIN = 10
+   FINLAND = 11
+   FRANCE = 12
+   UNITED_KINGDOM = 13
+   GREECE = 14
+   HUNGARY = 15
+   IRELAND = 16
+   ITALY = 17
+   LIECHTENSTEIN = 18
+   LITHUANIA = 19
+   LUXEMBOURG = 20
+   LATVIA = 21
+   MALTA = 22
+   NETHERLANDS = 23
+   NORWAY = 24
+   POLAND = 25
+   PORTUGAL = 26
+   ROMANIA = 27
+   SWEDEN = 28
+   SINGAPORE = 29
+   SLOVENIA = 30
+   SLOVAKIA = 31
+   CROATIA = 35
+   JAPAN = 36
+   ICELAND = 37
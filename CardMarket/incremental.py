@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from card_import import match_card_slots
+from optimizer import DPCheckpoint, build_price_matrix, dp_numpy_resumable
+from plan_export import seller_groups
+from shipping_table import ShippingTable
+
+
+# Bump when the snapshot layout or the DP changes
+SNAPSHOT_VERSION = 1
+# Above this share of changed cards a full solve is cheaper than resuming
+MAX_CHANGED_FRACTION = 0.25
+# Number of DP states stored per snapshot (plus the final one)
+SNAPSHOT_CHECKPOINTS = 8
+
+
+def card_listing_hashes(listings: pd.DataFrame, card_names: list[str]) -> dict:
+    """
+    Hash of each card's listings (seller, price, country), independent of row order.
+
+    A card whose hash differs from the previous run has new, removed or
+    repriced listings. For a card with alternatives ("A | B") the listings of
+    all its variants are hashed together.
+    """
+    rows, slot_indices = match_card_slots(listings['card_name'], card_names)
+    row_hashes = pd.util.hash_pandas_object(
+        listings[['seller', 'price', 'country']].iloc[rows], index=False
+    ).to_numpy()
+    card_codes, found_slots = pd.factorize(slot_indices)
+
+    order = np.lexsort((row_hashes, card_codes))
+    sorted_hashes = row_hashes[order]
+    bounds = np.searchsorted(card_codes[order], np.arange(len(found_slots) + 1))
+    return {
+        card_names[slot]: hashlib.sha256(sorted_hashes[bounds[i]:bounds[i + 1]].tobytes()).hexdigest()
+        for i, slot in enumerate(found_slots)
+    }
+
+
+def snapshot_key(card_names: list[str], shipping_dict: dict) -> str:
+    """Snapshot file name for a card list and shipping data."""
+    digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    digest.update(json.dumps(sorted({card.lower() for card in card_names})).encode())
+    digest.update(json.dumps(shipping_dict, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """
+    Persisted state of an incremental optimizer run.
+
+    `cards` is the DP column order, `sellers`/`countries` the matrix rows.
+    Keeps the price matrix, the DP backpointers and DP checkpoints so a later
+    run can resume after the last column before the first changed card.
+    """
+
+    def __init__(
+        self,
+        cards: list[str],
+        card_hashes: list[str],
+        sellers: list[str],
+        countries: list[str],
+        prices: np.ndarray,
+        backpointers: np.ndarray,
+        checkpoints: list[DPCheckpoint]
+    ):
+        self.cards = cards
+        self.card_hashes = card_hashes
+        self.sellers = sellers
+        self.countries = countries
+        self.prices = prices
+        self.backpointers = backpointers
+        self.checkpoints = checkpoints
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        num_sellers = len(self.sellers)
+        checkpoints = [checkpoint.padded(num_sellers) for checkpoint in self.checkpoints]
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "cards": self.cards,
+            "card_hashes": self.card_hashes,
+            "sellers": self.sellers,
+            "countries": self.countries,
+        }
+        # Paths only carry loads and shipping for the sellers they use, so the
+        # per-path matrices are stored sparsely as (path, seller) entries
+        entries = [np.nonzero(c.in_path) for c in checkpoints]
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            meta=np.array(json.dumps(meta)),
+            prices=self.prices,
+            backpointers=self.backpointers,
+            checkpoint_columns=np.array([c.column for c in checkpoints], dtype=np.int64),
+            checkpoint_costs=np.array([c.costs for c in checkpoints]).reshape(len(checkpoints), num_sellers),
+            checkpoint_sizes=np.array([len(rows) for rows, _ in entries], dtype=np.int64),
+            checkpoint_rows=np.concatenate([rows for rows, _ in entries] + [np.zeros(0, dtype=np.int64)]),
+            checkpoint_sellers=np.concatenate([cols for _, cols in entries] + [np.zeros(0, dtype=np.int64)]),
+            checkpoint_loads=np.concatenate(
+                [c.loads[rows, cols] for c, (rows, cols) in zip(checkpoints, entries)] + [np.zeros(0)]
+            ),
+            checkpoint_shipping=np.concatenate(
+                [c.shipping[rows, cols] for c, (rows, cols) in zip(checkpoints, entries)] + [np.zeros(0)]
+            ),
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        """Load a snapshot, or return None if it is missing or unreadable."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != SNAPSHOT_VERSION:
+                    return None
+                num_sellers = len(meta["sellers"])
+                bounds = np.concatenate([[0], np.cumsum(data["checkpoint_sizes"])])
+                rows, sellers = data["checkpoint_rows"], data["checkpoint_sellers"]
+                loads, shipping = data["checkpoint_loads"], data["checkpoint_shipping"]
+                checkpoints = []
+                for i, (column, costs) in enumerate(zip(data["checkpoint_columns"], data["checkpoint_costs"])):
+                    entries = slice(bounds[i], bounds[i + 1])
+                    checkpoint = DPCheckpoint(
+                        int(column),
+                        costs,
+                        np.zeros((num_sellers, num_sellers), dtype=bool),
+                        np.zeros((num_sellers, num_sellers)),
+                        np.zeros((num_sellers, num_sellers))
+                    )
+                    checkpoint.in_path[rows[entries], sellers[entries]] = True
+                    checkpoint.loads[rows[entries], sellers[entries]] = loads[entries]
+                    checkpoint.shipping[rows[entries], sellers[entries]] = shipping[entries]
+                    checkpoints.append(checkpoint)
+                return cls(
+                    meta["cards"],
+                    meta["card_hashes"],
+                    meta["sellers"],
+                    meta["countries"],
+                    data["prices"],
+                    data["backpointers"],
+                    checkpoints
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class IncrementalResult:
+    """Plan found by incremental_solve, and how much of the previous run was reused."""
+
+    def __init__(
+        self,
+        groups: dict,
+        cost: float,
+        card_prices: dict,
+        changed_cards: list[str],
+        resumed_column: int = None
+    ):
+        self.groups = groups
+        self.cost = cost
+        self.card_prices = card_prices
+        self.changed_cards = changed_cards
+        # Last reused DP column, or None after a full solve
+        self.resumed_column = resumed_column
+
+
+def _seller_prices(sellers_df: pd.DataFrame, sellers: list[str], cards: list[str]) -> np.ndarray:
+    """Prices of the given sellers (rows) for the given cards, inf where not offered."""
+    if not cards:
+        return np.zeros((len(sellers), 0))
+    by_seller = sellers_df.set_index('seller')[cards].reindex(sellers)
+    return build_price_matrix(by_seller, cards)
+
+
+def _plan(
+    cost: float,
+    path: list[int],
+    sellers: list[str],
+    cards: list[str],
+    prices: np.ndarray
+) -> tuple[dict, dict]:
+    """Seller groups and unit price per card (seller -> card -> price) for a DP path."""
+    card_prices = {}
+    if not np.isfinite(cost):
+        return {}, card_prices
+    for j, seller in enumerate(path):
+        card_prices.setdefault(sellers[seller], {})[cards[j]] = float(prices[seller, j])
+    return seller_groups([sellers[seller] for seller in path], cards), card_prices
+
+
+def incremental_solve(
+    listings: pd.DataFrame,
+    sellers_df: pd.DataFrame,
+    filtered_df: pd.DataFrame,
+    cards: list[str],
+    shipping_dict: dict,
+    snapshot_dir: str,
+    progress: bool = True,
+    counters: dict = None
+) -> IncrementalResult:
+    """
+    Re-optimize with the numpy DP, reusing the previous run's snapshot.
+
+    Cards whose listings changed since the snapshot (by card_listing_hashes)
+    are moved to the end of the card order. The DP resumes from the latest
+    checkpoint before the first changed card; matrix columns up to it are
+    taken from the snapshot and the rest are rebuilt from `sellers_df`.
+    Sellers that are new in `filtered_df` are added as rows, but only for the
+    recomputed columns, so the reused DP state stays valid.
+
+    Falls back to a full solve (over `filtered_df`, cards in sorted order)
+    when there is no usable snapshot or more than MAX_CHANGED_FRACTION of the
+    cards changed. Either way a new snapshot is written.
+    """
+    path = os.path.join(snapshot_dir, f"{snapshot_key(cards, shipping_dict)}.npz")
+    hashes = card_listing_hashes(listings, cards)
+    snapshot = Snapshot.load(path)
+
+    changed = sorted(cards)
+    checkpoint = None
+    if snapshot is not None:
+        previous = dict(zip(snapshot.cards, snapshot.card_hashes))
+        changed = sorted(card for card in cards if previous.get(card) != hashes.get(card))
+        stale = {card for card in snapshot.cards if card not in hashes or card in changed}
+        first_stale = min(
+            (j for j, card in enumerate(snapshot.cards) if card in stale),
+            default=len(snapshot.cards)
+        )
+        usable = [c for c in snapshot.checkpoints if c.column < first_stale]
+        if usable and len(changed) <= MAX_CHANGED_FRACTION * len(cards):
+            checkpoint = max(usable, key=lambda c: c.column)
+
+    if checkpoint is None:
+        # Full solve
+        order = sorted(cards)
+        sellers = filtered_df['seller'].tolist()
+        countries = filtered_df['country'].tolist()
+        prices = build_price_matrix(filtered_df, order)
+        kept_checkpoints = []
+        backpointers = None
+    else:
+        reused = checkpoint.column + 1
+        prefix = snapshot.cards[:reused]
+        unchanged_rest = [card for card in snapshot.cards[reused:] if card in hashes and card not in changed]
+        order = prefix + unchanged_rest + changed
+
+        known = set(snapshot.sellers)
+        new_rows = filtered_df[~filtered_df['seller'].isin(known)]
+        sellers = snapshot.sellers + new_rows['seller'].tolist()
+        countries = snapshot.countries + new_rows['country'].tolist()
+
+        prices = np.full((len(sellers), len(order)), np.inf)
+        prices[:len(snapshot.sellers), :reused] = snapshot.prices[:, :reused]
+        prices[:, reused:] = _seller_prices(sellers_df, sellers, order[reused:])
+
+        kept_checkpoints = [c for c in snapshot.checkpoints if c.column <= checkpoint.column]
+        checkpoint = checkpoint.padded(len(sellers))
+        backpointers = np.zeros((len(order), len(sellers)), dtype=np.int32)
+        backpointers[:reused, :len(snapshot.sellers)] = snapshot.backpointers[:reused]
+
+    shipping_table = ShippingTable.compile(shipping_dict, countries)
+    cost, dp_path, backpointers, new_checkpoints = dp_numpy_resumable(
+        prices,
+        shipping_table,
+        resume=checkpoint,
+        backpointers=backpointers,
+        checkpoint_step=max(1, len(order) // SNAPSHOT_CHECKPOINTS),
+        progress=progress,
+        counters=counters
+    )
+
+    Snapshot(
+        order,
+        [hashes.get(card, "") for card in order],
+        sellers,
+        countries,
+        prices,
+        backpointers,
+        kept_checkpoints + new_checkpoints
+    ).save(path)
+
+    groups, card_prices = _plan(cost, dp_path, sellers, order, prices)
+    return IncrementalResult(
+        groups,
+        cost,
+        card_prices,
+        changed,
+        None if checkpoint is None else checkpoint.column
+    )
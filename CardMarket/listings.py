@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+
+# Listing columns, in file order
+LISTING_COLUMNS = ["seller", "card_name", "price", "country", "quantity", "link", "hash"]
+# Columns stored dictionary-encoded: each distinct value is kept once (a
+# link is the page the listing was scraped from, shared by its neighbours)
+CATEGORY_COLUMNS = ["seller", "card_name", "country", "link"]
+# Price in cents of a listing without a price, or of a card a seller does not offer
+MISSING_PRICE = -1
+
+
+def to_cents(prices) -> np.ndarray:
+    """Convert euro prices (numbers or numeric strings) to int32 cents, MISSING_PRICE where invalid."""
+    euros = pd.to_numeric(pd.Series(prices), errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(euros) & (euros >= 0)
+    cents = np.full(len(euros), MISSING_PRICE, dtype=np.int32)
+    cents[valid] = np.round(euros[valid] * 100)
+    return cents
+
+
+def from_cents(cents, missing: float = np.nan) -> np.ndarray:
+    """Convert cents (any shape, NaN allowed) to float euros, `missing` for MISSING_PRICE and NaN."""
+    cents = np.asarray(cents, dtype=float)
+    return np.where(np.isnan(cents) | (cents == MISSING_PRICE), missing, cents / 100)
+
+
+def compact_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Internal listings representation used from loading to the optimizer.
+
+    Prices are int32 cents (MISSING_PRICE if absent), quantities int32 (at
+    least one copy), and sellers, card names, countries and links string
+    categoricals. Hashes stay strings. Listings without a quantity column
+    count as one copy each. Already compact columns are kept as they are.
+    """
+    df = df.copy()
+    if 'quantity' not in df.columns:
+        df.insert(df.columns.get_loc('link') if 'link' in df.columns else len(df.columns), 'quantity', 1)
+    if df['price'].dtype != np.int32:
+        df['price'] = to_cents(df['price'].to_numpy())
+    quantities = pd.to_numeric(df['quantity'], errors='coerce').fillna(1).to_numpy()
+    df['quantity'] = np.maximum(quantities, 1).astype(np.int32)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            values = df[column].astype('category')
+            if pd.api.types.infer_dtype(values.cat.categories) != "string":
+                # Names read as numbers are kept as text
+                values = df[column].where(df[column].isna(), df[column].astype(str)).astype('category')
+            df[column] = values
+    return df
+
+
+def ensure_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Return compact listings as they are, and compact any other listings frame."""
+    compact = df['price'].dtype == np.int32 and 'quantity' in df.columns and all(
+        isinstance(df[column].dtype, pd.CategoricalDtype)
+        for column in CATEGORY_COLUMNS if column in df.columns
+    )
+    return df if compact else compact_listings(df)
+
+
+def concat_listings(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compact listings, merging the category dictionaries."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return compact_listings(pd.DataFrame(columns=LISTING_COLUMNS))
+    categories = {
+        column: pd.api.types.union_categoricals([frame[column] for frame in frames]).categories
+        for column in CATEGORY_COLUMNS
+    }
+    frames = [
+        frame.assign(**{
+            column: frame[column].cat.set_categories(values)
+            for column, values in categories.items()
+        })
+        for frame in frames
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def export_listings(df: pd.DataFrame) -> pd.DataFrame:
+    """Listings in the CSV file format: euro prices (empty if missing) and plain string columns."""
+    df = df.copy()
+    df['price'] = from_cents(df['price'].to_numpy())
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(object)
+    return df
+
+
+def lower_names(column: pd.Series) -> np.ndarray:
+    """Lowercased values of a name column; categoricals are lowercased once per distinct name."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Missing values have code -1, which picks the trailing None
+        lowered = np.append(column.cat.categories.astype(str).str.lower().to_numpy(dtype=object), None)
+        return lowered[column.cat.codes.to_numpy()]
+    return column.astype(str).str.lower().to_numpy()
+
+
+def factorize_rows(column: pd.Series, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Codes and distinct values of a column over the given row positions.
+
+    Categorical columns are factorized on their integer codes, so the names
+    themselves are only looked up once per distinct value.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, uniques = pd.factorize(column.cat.codes.to_numpy()[rows])
+        return codes, column.cat.categories.to_numpy()[uniques]
+    codes, uniques = pd.factorize(column.to_numpy()[rows])
+    return codes, np.asarray(uniques)
@@ -1,17 +1,58 @@
 import hashlib
 import json
 import os
+import re
 import sys
 import glob
+import time
 import traceback
 from datetime import datetime
 from functools import wraps
 
-import tqdm
 from card_editor import edit_card_list
-from card_import import CardImportError, import_from_moxfield, parse_decklist
-from market_api import CardApi, ShippingApi
-from collections import defaultdict
+from card_import import (
+    CardImportError,
+    card_quantity,
+    expand_variants,
+    import_from_moxfield,
+    match_card_slots,
+    parse_decklist,
+)
+from incremental import incremental_solve
+from listings import (
+    CATEGORY_COLUMNS,
+    LISTING_COLUMNS,
+    MISSING_PRICE,
+    compact_listings,
+    concat_listings,
+    ensure_compact,
+    export_listings,
+    factorize_rows,
+    from_cents,
+)
+from metrics import PipelineMetrics
+from result_cache import ResultCache, result_key
+from plan_export import PLAN_FORMATS, ListingIndex, export_plan, plan_rows, seller_groups
+from optimizer import (
+    BatchTask,
+    branch_and_bound,
+    build_price_matrix,
+    build_stock_matrix,
+    card_components,
+    coverage_bitmasks,
+    dp_numpy_kbest,
+    dp_numpy_max_sellers,
+    dp_numpy_quantities,
+    marginal_costs,
+    solve_batch,
+    solve_decomposed,
+    stock_column,
+    superset_dominated,
+)
+from shipping_table import ShippingTable
+# market_api (Playwright, readchar) is imported where listings or shipping
+# prices are fetched, so the optimizer runs without the browser stack
+from collections.abc import Iterable, Iterator
 import pandas as pd
 import argparse
 import numpy as np
@@ -24,11 +65,22 @@ import numpy as np
 RESOURCES_DIR = os.path.join(os.path.dirname(__file__), "Resources")
 DESIRED_CARDS_DIR = os.path.join(RESOURCES_DIR, "DesiredCards")
 LISTINGS_DIR = os.path.join(RESOURCES_DIR, "Listings")
+RESULT_CACHE_DIR = os.path.join(RESOURCES_DIR, "Cache", "Results")
+SNAPSHOT_DIR = os.path.join(RESOURCES_DIR, "Cache", "Snapshots")
+BATCH_DIR = os.path.join(RESOURCES_DIR, "Batch")
 
 TO_COUNTRY = "sweden"
 LANGUAGE = "English"
 MAX_PRODUCT_VERSIONS_TO_CHECK = 1
 
+# Default time for the branch-and-bound search of seller limits the layered DP finds no plan for
+SELLER_LIMIT_TIME_LIMIT = 60.0
+
+OPTIMIZER_ENGINES = ("numpy", "python", "exact", "anytime", "greedy")
+DEFAULT_ENGINE = "numpy"
+
+LISTING_BATCH_SIZE = 10000
+
 
 # =============================================================================
 # Error Handling Utilities
@@ -164,21 +216,79 @@ def load_desired_cards(path: str) -> list[str]:
 
 @safe_execute
 def load_listings(path: str) -> pd.DataFrame:
-    """Load listings from a CSV file."""
+    """Load listings from a CSV file into the compact representation (see listings.compact_listings)."""
     if not os.path.exists(path):
         raise CardMarketError(f"Listings file not found: {path}")
 
-    df = pd.read_csv(path)
+    # Name columns are dictionary-encoded while reading
+    df = pd.read_csv(path, dtype={column: "category" for column in CATEGORY_COLUMNS})
     required_columns = {'seller', 'card_name', 'price', 'country', 'link'}
 
     if not required_columns.issubset(set(df.columns)):
         missing = required_columns - set(df.columns)
         raise CardMarketError(f"Listings file missing required columns: {missing}")
 
+    # Listings gathered before quantities were recorded count as one copy
+    df = compact_listings(df)
+
     print_success(f"Loaded {len(df)} listings from {os.path.basename(path)}")
     return df
 
 
+@safe_execute
+def load_batch_jobs(path: str, default_country: str = TO_COUNTRY) -> list[dict]:
+    """
+    Load batch jobs from a JSON file.
+
+    The file holds a list of jobs, each with a card list ("cards": CSV path,
+    or "decklist": decklist file path), an optional destination "country"
+    and an optional "name" (default: card list file name and country). A job
+    may also name a "shipping_dict" JSON file for its country. Paths are
+    relative to the jobs file. Returns dicts with "name", "cards", "country"
+    and "shipping_dict" (path or None).
+    """
+    if not os.path.exists(path):
+        raise CardMarketError(f"Batch jobs file not found: {path}")
+
+    with open(path, 'r') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise CardMarketError("Batch jobs file must contain a non-empty list of jobs")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    names = set()
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or not (entry.get('cards') or entry.get('decklist')):
+            raise CardMarketError(f"Batch job {number} needs a 'cards' or 'decklist' path")
+        if entry.get('cards'):
+            source = os.path.join(base_dir, entry['cards'])
+            cards = load_desired_cards(source)
+        else:
+            source = os.path.join(base_dir, entry['decklist'])
+            with open(source, 'r') as f:
+                cards = parse_decklist(f.read(), bool(entry.get('keep_quantities')))
+        if not cards:
+            raise CardMarketError(f"Batch job {number} has no cards: {source}")
+        shipping_path = entry.get('shipping_dict')
+
+        country = str(entry.get('country') or default_country).lower()
+        name = entry.get('name') or f"{os.path.splitext(os.path.basename(source))[0]}_{country}"
+        name = re.sub(r"[^\w.-]+", "_", str(name))
+        if name in names:
+            name = f"{name}_{number}"
+        names.add(name)
+        jobs.append({
+            "name": name,
+            "cards": [card.lower() for card in cards],
+            "country": country,
+            "shipping_dict": os.path.join(base_dir, shipping_path) if shipping_path else None,
+        })
+
+    print_success(f"Loaded {len(jobs)} batch jobs from {os.path.basename(path)}")
+    return jobs
+
+
 def save_listings(df: pd.DataFrame, name: str = None) -> str:
     """
     Save listings to a CSV file in the Listings directory.
@@ -197,7 +307,7 @@ def save_listings(df: pd.DataFrame, name: str = None) -> str:
     filepath = os.path.join(LISTINGS_DIR, filename)
 
     try:
-        df.to_csv(filepath, index=False)
+        export_listings(df).to_csv(filepath, index=False)
         print_success(f"Saved {len(df)} listings to {filename}")
         return filepath
     except Exception as e:
@@ -209,214 +319,371 @@ def save_listings(df: pd.DataFrame, name: str = None) -> str:
 # Core Algorithm Functions
 # =============================================================================
 
-def calculate_shipping_price(
+def find_cheapest_seller_group(
     filtered_df: pd.DataFrame,
     shipping_dict: dict,
-    previous_node_path: list,
-    current_node_index: int,
-    current_value: float,
-    value_increase: float
-) -> float:
+    desired_cards_set: set,
+    engine: str = DEFAULT_ENGINE,
+    time_limit: float = None,
+    workers: int = None,
+    orderings: int = 1,
+    metrics: PipelineMetrics = None,
+    compare_dp: bool = False
+) -> tuple[dict, float]:
     """
-    Calculate the shipping price or increase in shipping price for a given seller/node.
+    Find the optimal combination of sellers to minimize total cost.
+
+    Uses dynamic programming to find the minimum cost path through sellers
+    that covers all desired cards. The `engine` selects the implementation:
+    "numpy" computes each DP column with array operations, "python" is the
+    original loop-based reference. Both give the same result.
+
+    The "exact" engine instead runs a branch-and-bound search that proves the
+    plan optimal, or stops after `time_limit` seconds and reports the
+    remaining optimality gap. The "anytime" engine starts from a greedy plan,
+    prints every improvement as it is found and returns the best plan when
+    `time_limit` runs out. The "greedy" engine is a fast heuristic for very
+    large card lists: a shipping-aware greedy set cover improved by moving
+    single cards and closing sellers, with no optimality guarantee. With
+    `compare_dp` the numpy DP is run as well and its cost printed next to
+    the greedy plan's.
 
-    Since shipping price increases with card value at certain rates, we handle:
-    - Current seller already in path, value doesn't reach new threshold
-    - Current seller already in path, value reaches new threshold
-    - Current seller not in path (shipping = new threshold based on value_increase)
+    Groups of cards that no seller connects are solved independently on a
+    pool of `workers` processes (all cores by default) and merged. With
+    `orderings` > 1 the DP engines are run over that many card orderings
+    (scarcity-first, price-descending, random) and the cheapest plan is kept.
+
+    Cards wanted more than once ("4x A") are bought with the numpy DP for
+    quantities, within each seller's stock (see dp_numpy_quantities).
+
+    Seller groups map each seller to the cards bought there and the number
+    of copies of each (see plan_export.seller_groups).
+
+    Stage times, sizes and optimizer counters are recorded in `metrics` if given.
+
+    Returns:
+        tuple: (optimal_seller_groups dict, minimum_cost float)
     """
     try:
-        country = filtered_df.iloc[current_node_index]['country']
-        country_key = country.upper().replace(" ", "_")
+        if engine not in OPTIMIZER_ENGINES:
+            raise CardMarketError(
+                f"Unknown optimizer engine: {engine}. Choose from {', '.join(OPTIMIZER_ENGINES)}"
+            )
 
-        if country_key not in shipping_dict:
-            print_warning(f"No shipping data for country: {country}")
-            return 0.0
+        if metrics is None:
+            metrics = PipelineMetrics()
 
-        shipping_price_list = shipping_dict[country_key]
+        sorted_desired_cards_set = sorted(list(desired_cards_set))
+        filtered_df = filtered_df.reset_index(drop=True)
 
-        previous_shipping_price = shipping_price_list[0]['price']
-        new_shipping_price = previous_shipping_price
+        with metrics.stage("price_matrix", sellers=len(filtered_df), cards=len(sorted_desired_cards_set)):
+            # Create adjacency matrix: sellers x cards
+            adjacency_matrix = build_price_matrix(filtered_df, sorted_desired_cards_set)
 
-        for shipping_price in shipping_price_list:
-            if current_value > shipping_price['maxValue']:
-                previous_shipping_price = shipping_price['price']
-                new_shipping_price = shipping_price['price']
-            elif current_value + value_increase > shipping_price['maxValue']:
-                new_shipping_price = shipping_price['price']
-            else:
-                break
+            # Compile shipping tiers once for all sellers
+            shipping_table = ShippingTable.compile(shipping_dict, filtered_df['country'].tolist())
 
-        shipping_price_increase = new_shipping_price - previous_shipping_price
+        for country in shipping_table.missing_countries:
+            print_warning(f"No shipping data for country: {country}")
 
-        if current_node_index in previous_node_path:
-            return shipping_price_increase
+        # Cards wanted more than once are bought one copy per DP step
+        quantities = np.array([card_quantity(card)[0] for card in sorted_desired_cards_set], dtype=np.int64)
+        if (quantities > 1).any():
+            if engine != "numpy":
+                print_warning(f"Card quantities are handled by the numpy engine; using it instead of {engine}")
+            with metrics.stage("optimize (quantities)", copies=int(quantities.sum())) as record:
+                counters = {}
+                stock = build_stock_matrix(filtered_df, sorted_desired_cards_set)
+                min_cost, min_path = dp_numpy_quantities(
+                    adjacency_matrix, stock, quantities, shipping_table, counters=counters
+                )
+                record["cost"] = round(float(min_cost), 2)
+            metrics.count(**counters)
         else:
-            return new_shipping_price
+            components = card_components(adjacency_matrix)
+            if len(components) > 1:
+                print_info(f"Split into {len(components)} independent card groups.")
+
+            start_time = time.monotonic()
+
+            def report_progress(cost: float, assignment: np.ndarray):
+                elapsed = time.monotonic() - start_time
+                print_info(
+                    f"[{elapsed:6.1f}s] New best plan: {cost:.2f}€ "
+                    f"({len(set(assignment.tolist()))} sellers)"
+                )
+
+            with metrics.stage(f"optimize ({engine})", card_groups=len(components)) as record:
+                result = solve_decomposed(
+                    adjacency_matrix,
+                    shipping_table,
+                    engine,
+                    time_limit=time_limit,
+                    max_workers=workers,
+                    on_improvement=report_progress if engine == "anytime" else None,
+                    orderings=orderings
+                )
+                record["cost"] = round(float(result.cost), 2)
+            metrics.count(**result.counters)
+            min_cost = result.cost
+            min_path = result.assignment.tolist() if np.isfinite(result.cost) else []
+
+            if engine == "exact":
+                if result.optimal:
+                    print_info(f"Proven optimal after {result.nodes} nodes")
+                else:
+                    print_warning(
+                        f"Time limit reached after {result.nodes} nodes. "
+                        f"Lower bound: {result.lower_bound:.2f}, optimality gap: {result.gap:.1%}"
+                    )
+            elif engine == "anytime":
+                if result.optimal:
+                    print_info("Search finished before the time limit; plan is optimal")
+                else:
+                    print_info(f"Time limit reached. Optimality gap: {result.gap:.1%}")
+            elif engine == "greedy":
+                print_info(
+                    f"Greedy plan; gap to the card-price lower bound "
+                    f"({result.lower_bound:.2f}€): {result.gap:.1%}"
+                )
+                if compare_dp and np.isfinite(result.cost):
+                    with metrics.stage("optimize (numpy, comparison)") as record:
+                        dp_result = solve_decomposed(
+                            adjacency_matrix, shipping_table, "numpy",
+                            max_workers=workers, orderings=orderings
+                        )
+                        record["cost"] = round(float(dp_result.cost), 2)
+                    print_info(
+                        f"Greedy plan: {result.cost:.2f}€, numpy DP plan: {dp_result.cost:.2f}€ "
+                        f"(greedy {result.cost - dp_result.cost:+.2f}€)"
+                    )
+
+        print_info(f"Minimum cost: {min_cost:.2f}")
+        seller_names = filtered_df['seller'].to_numpy()
+        print_info(f"Sellers in optimal path: {[seller_names[i] for i in set(min_path)]}")
+
+        # The path has one seller per copy bought
+        path_cards = np.repeat(np.arange(len(sorted_desired_cards_set)), quantities)
+        optimal_seller_groups = seller_groups(
+            [seller_names[seller] for seller in min_path],
+            [sorted_desired_cards_set[card] for card in path_cards]
+        )
+
+        return optimal_seller_groups, min_cost
 
     except Exception as e:
-        print_error(f"Error calculating shipping price: {str(e)}")
-        return 0.0
+        print_error(f"Error in find_cheapest_seller_group: {str(e)}")
+        print_error(traceback.format_exc())
+        return {}, float('inf')
 
 
-def find_cheapest_seller_group(
+def find_alternative_plans(
     filtered_df: pd.DataFrame,
     shipping_dict: dict,
-    desired_cards_set: set
-) -> tuple[dict, float]:
+    desired_cards_set: set,
+    count: int,
+    metrics: PipelineMetrics = None
+) -> list[tuple[dict, float]]:
     """
-    Find the optimal combination of sellers to minimize total cost.
+    Find the `count` cheapest distinct seller combinations in one pass.
 
-    Uses dynamic programming to find the minimum cost path through sellers
-    that covers all desired cards.
+    Runs the K-best variant of the numpy DP, which keeps several paths per
+    seller in the same DP state instead of re-running the optimizer.
 
     Returns:
-        tuple: (optimal_seller_groups dict, minimum_cost float)
+        list: (seller_groups dict, cost float) per plan, cheapest first
     """
     try:
-        sorted_desired_cards_set = sorted(list(desired_cards_set))
-
-        # Create adjacency matrix: sellers x cards
-        adjacency_matrix = np.zeros((len(filtered_df), len(sorted_desired_cards_set)))
-        for i, row in filtered_df.iterrows():
-            for j, card in enumerate(sorted_desired_cards_set):
-                if pd.notna(row[card]):
-                    adjacency_matrix[i][j] = row[card]
-                else:
-                    adjacency_matrix[i][j] = float('inf')
-
-        # Path matrix: (cost, path) for each seller-card combination
-        path_matrix = [[(float('inf'), []) for _ in range(len(sorted_desired_cards_set))]
-                       for _ in range(len(filtered_df))]
-
-        # Initialize first column
-        for i in range(len(filtered_df)):
-            shipping_price = calculate_shipping_price(
-                filtered_df=filtered_df,
-                shipping_dict=shipping_dict,
-                previous_node_path=[],
-                current_node_index=i,
-                current_value=0,
-                value_increase=adjacency_matrix[i][0]
-            )
-            path_matrix[i][0] = (adjacency_matrix[i][0] + shipping_price, [i])
-
-        # Dynamic programming: iterate through cards
-        for j in tqdm.tqdm(range(1, len(sorted_desired_cards_set)), desc="Optimizing"):
-            for i in range(len(filtered_df)):
-                (previous_node_price, previous_node_path) = path_matrix[i][j-1]
-                for k in range(len(filtered_df)):
-                    (node_price, node_path) = path_matrix[k][j]
-                    if adjacency_matrix[k][j] == float('inf'):
-                        continue
+        if metrics is None:
+            metrics = PipelineMetrics()
 
-                    price = previous_node_price
-                    price += calculate_shipping_price(
-                        filtered_df=filtered_df,
-                        shipping_dict=shipping_dict,
-                        previous_node_path=previous_node_path,
-                        current_node_index=k,
-                        current_value=price,
-                        value_increase=adjacency_matrix[k][j]
-                    )
-                    price += adjacency_matrix[k][j]
+        sorted_desired_cards_set = sorted(list(desired_cards_set))
+        filtered_df = filtered_df.reset_index(drop=True)
 
-                    if price < node_price:
-                        path_matrix[k][j] = (price, previous_node_path + [k])
+        with metrics.stage("price_matrix", sellers=len(filtered_df), cards=len(sorted_desired_cards_set)):
+            adjacency_matrix = build_price_matrix(filtered_df, sorted_desired_cards_set)
+            shipping_table = ShippingTable.compile(shipping_dict, filtered_df['country'].tolist())
 
-        # Find minimum cost path
-        min_cost = float('inf')
-        min_path = []
-        for i in range(len(filtered_df)):
-            if path_matrix[i][-1][0] < min_cost:
-                min_cost = path_matrix[i][-1][0]
-                min_path = path_matrix[i][-1][1]
+        for country in shipping_table.missing_countries:
+            print_warning(f"No shipping data for country: {country}")
 
-        print_info(f"Minimum cost: {min_cost:.2f}")
-        print_info(f"Sellers in optimal path: {[filtered_df.iloc[i]['seller'] for i in set(min_path)]}")
+        counters = {}
+        with metrics.stage(f"optimize ({count} best)") as record:
+            paths = dp_numpy_kbest(adjacency_matrix, shipping_table, count, counters=counters)
+            record["plans"] = len(paths)
+        metrics.count(**counters)
 
-        # Build result dictionary
-        optimal_seller_groups = defaultdict(list)
-        for i in range(len(min_path)):
-            optimal_seller_groups[filtered_df.iloc[min_path[i]]['seller']].append(
-                sorted_desired_cards_set[i]
-            )
+        seller_names = filtered_df['seller'].to_numpy()
+        plans = []
+        for cost, path in paths:
+            groups = seller_groups(seller_names[path], sorted_desired_cards_set)
+            plans.append((groups, cost))
 
-        return optimal_seller_groups, min_cost
+        if plans:
+            print_info(f"Minimum cost: {plans[0][1]:.2f}")
+        return plans
 
     except Exception as e:
-        print_error(f"Error in find_cheapest_seller_group: {str(e)}")
+        print_error(f"Error in find_alternative_plans: {str(e)}")
         print_error(traceback.format_exc())
-        return {}, float('inf')
+        return []
 
 
-def filter_sellers_df(sellers_df: pd.DataFrame, card_names: list) -> pd.DataFrame:
+def find_plans_by_seller_count(
+    filtered_df: pd.DataFrame,
+    shipping_dict: dict,
+    desired_cards_set: set,
+    max_sellers: int,
+    metrics: PipelineMetrics = None,
+    time_limit: float = None
+) -> list[tuple[dict, float, bool]]:
     """
-    Filter out redundant sellers, keeping only the cheapest per card combination.
+    Find the cheapest plan using at most N sellers, for every N up to `max_sellers`.
+
+    Runs the numpy DP with paths layered by their number of sellers, so paths
+    needing more than `max_sellers` parcels are pruned during the search and
+    the whole cost-vs-seller-count curve comes from one pass. The layered DP
+    keeps more partial plans than the default numpy DP, which is a heuristic,
+    so its plans can be cheaper than an unlimited default run.
+
+    The layered DP keeps one path per (layer, seller) and can miss every plan
+    within a limit. Limits it finds no plan for are searched again with
+    branch-and-bound restricted to that many sellers, sharing `time_limit`
+    seconds (SELLER_LIMIT_TIME_LIMIT by default).
 
-    For each unique combination of cards a seller offers, keeps only the cheapest
-    seller per country.
+    Returns:
+        list: (seller_groups dict, cost float, searched bool) per limit
+              1..max_sellers; `searched` is False for a limit without a plan
+              whose search ran out of time, so it may still be feasible
     """
     try:
-        output_df = pd.DataFrame(columns=sellers_df.columns)
-
-        # Extract all unique card combinations
-        combinations = []
-        for _, row in sellers_df.iterrows():
-            cards_sold = [card for card in card_names if pd.notna(row[card])]
-            cards_sold.sort()
-            if cards_sold not in combinations:
-                combinations.append(cards_sold)
-
-        # Filter sellers for each combination
-        for combination in combinations:
-            if not combination:
-                continue
+        if metrics is None:
+            metrics = PipelineMetrics()
 
-            other_cards = [card for card in card_names if card not in combination]
-            cond_has_price = sellers_df[combination].notna().all(axis=1)
-            cond_null_others = sellers_df[other_cards].isna().all(axis=1)
-            mask = cond_has_price & cond_null_others
-            sellers_subset = sellers_df[mask].copy()
+        sorted_desired_cards_set = sorted(list(desired_cards_set))
+        filtered_df = filtered_df.reset_index(drop=True)
 
-            if sellers_subset.empty:
-                continue
+        with metrics.stage("price_matrix", sellers=len(filtered_df), cards=len(sorted_desired_cards_set)):
+            adjacency_matrix = build_price_matrix(filtered_df, sorted_desired_cards_set)
+            shipping_table = ShippingTable.compile(shipping_dict, filtered_df['country'].tolist())
 
-            # Sort by total price for this combination
-            sellers_subset = sellers_subset.sort_values(by=combination, ascending=True)
-
-            # Keep cheapest per country
-            temp_out_df = pd.DataFrame(columns=sellers_df.columns)
-            for _, row in sellers_subset.iterrows():
-                country_mask = temp_out_df['country'] == row['country']
-                if country_mask.any():
-                    existing_row = temp_out_df[country_mask].iloc[0]
-                    existing_total = sum(existing_row[card] for card in combination
-                                        if pd.notna(existing_row[card]))
-                    current_total = sum(row[card] for card in combination
-                                       if pd.notna(row[card]))
-
-                    if current_total < existing_total:
-                        temp_out_df = temp_out_df[~country_mask]
-                        new_row_df = pd.DataFrame([row])
-                        if temp_out_df.empty:
-                            temp_out_df = new_row_df
-                        else:
-                            temp_out_df = pd.concat([temp_out_df, new_row_df], ignore_index=True)
-                else:
-                    new_row_df = pd.DataFrame([row])
-                    if temp_out_df.empty:
-                        temp_out_df = new_row_df
-                    else:
-                        temp_out_df = pd.concat([temp_out_df, new_row_df], ignore_index=True)
+        for country in shipping_table.missing_countries:
+            print_warning(f"No shipping data for country: {country}")
 
-            if not temp_out_df.empty:
-                if output_df.empty:
-                    output_df = temp_out_df
+        counters = {}
+        with metrics.stage(f"optimize (max {max_sellers} sellers)") as record:
+            paths = dp_numpy_max_sellers(adjacency_matrix, shipping_table, max_sellers, counters=counters)
+            record["cost"] = round(float(paths[-1][0]), 2) if paths else None
+
+        deadline = time.monotonic() + (time_limit or SELLER_LIMIT_TIME_LIMIT)
+        assignments = []
+        best_cost, best_assignment = float('inf'), None
+        for limit, (cost, path) in enumerate(paths, start=1):
+            searched = True
+            if np.isfinite(cost):
+                if cost < best_cost:
+                    best_cost, best_assignment = cost, np.array(path)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    with metrics.stage(f"optimize (max {limit} sellers, branch-and-bound)") as record:
+                        result = branch_and_bound(
+                            adjacency_matrix, shipping_table, remaining, best_assignment,
+                            counters=counters, max_sellers=limit
+                        )
+                        record["cost"] = round(float(result.cost), 2)
+                    if result.cost < best_cost:
+                        best_cost, best_assignment = result.cost, result.assignment
+                    searched = result.optimal
                 else:
-                    output_df = pd.concat([output_df, temp_out_df], ignore_index=True)
+                    searched = False
+            assignments.append((best_cost, best_assignment, searched))
+        metrics.count(**counters)
+
+        seller_names = filtered_df['seller'].to_numpy()
+        plans = []
+        for cost, assignment, searched in assignments:
+            groups = {} if assignment is None else seller_groups(seller_names[assignment], sorted_desired_cards_set)
+            plans.append((groups, cost, searched))
+
+        if plans and np.isfinite(plans[-1][1]):
+            print_info(f"Minimum cost with at most {max_sellers} sellers: {plans[-1][1]:.2f}")
+        elif plans and not plans[-1][2]:
+            print_warning(f"No plan with at most {max_sellers} sellers found within the time limit")
+        else:
+            print_warning(f"No plan with at most {max_sellers} sellers covers all cards")
+        return plans
+
+    except Exception as e:
+        print_error(f"Error in find_plans_by_seller_count: {str(e)}")
+        print_error(traceback.format_exc())
+        return []
 
-        print_info(f"Filtered to {len(output_df)} unique sellers.")
+
+def plan_diff(best_groups: dict, other_groups: dict) -> list[tuple[str, str, str]]:
+    """Cards bought from a different seller than in the best plan, as (card, best seller, seller)."""
+    best_sellers = {card: seller for seller, cards in best_groups.items() for card in cards}
+    return sorted(
+        (card, best_sellers.get(card), seller)
+        for seller, cards in other_groups.items()
+        for card in cards
+        if best_sellers.get(card) != seller
+    )
+
+
+def copy_label(row: dict) -> str:
+    """Output text for a plan row: the copies of a card bought from one seller."""
+    if row['copies'] == 1:
+        return f"{row['listing']}: {row['price']:.2f}€"
+    return f"{row['copies']}x {row['listing']}: {row['price']:.2f}€ each ({row['cost']:.2f}€)"
+
+
+def _card_prices(filtered_df: pd.DataFrame, groups: dict) -> dict:
+    """Unit price (euros) paid per card in a plan, as seller -> card -> price."""
+    positions = pd.Index(filtered_df['seller']).get_indexer(list(groups))
+    return {
+        seller: {card: float(from_cents(filtered_df[card].iat[position])) for card in dict.fromkeys(cards)}
+        for (seller, cards), position in zip(groups.items(), positions)
+    }
+
+
+def filter_sellers_df(sellers_df: pd.DataFrame, card_names: list) -> pd.DataFrame:
+    """
+    Filter out redundant sellers before optimization.
+
+    Each seller's card coverage is encoded as a bitmask. For every unique
+    (coverage, country) pair only the cheapest seller is kept, then sellers
+    dominated by a same-country seller that offers a superset of their cards
+    at lower or equal prices are dropped as well.
+
+    Sellers offering a card wanted more than once are always kept, since
+    their stock may be needed next to the cheapest seller's.
+    """
+    try:
+        prices = build_price_matrix(sellers_df, card_names)
+        masks = coverage_bitmasks(np.isfinite(prices))
+        has_cards = masks.any(axis=1)
+        multiple_copies = np.array([card_quantity(card)[0] > 1 for card in card_names], dtype=bool)
+        stocked = np.isfinite(prices[:, multiple_copies]).any(axis=1)
+
+        # Group sellers by (coverage mask, country) and keep the cheapest of each group
+        _, mask_ids = np.unique(masks, axis=0, return_inverse=True)
+        country_ids, _ = pd.factorize(sellers_df['country'])
+        group_ids = mask_ids.ravel().astype(np.int64) * (country_ids.max(initial=0) + 1) + country_ids
+        totals = np.where(np.isfinite(prices), prices, 0.0).sum(axis=1)
+        by_group = np.lexsort((np.arange(len(totals)), totals, group_ids))
+        first_in_group = np.ones(len(by_group), dtype=bool)
+        first_in_group[1:] = group_ids[by_group][1:] != group_ids[by_group][:-1]
+        kept = np.sort(by_group[(first_in_group | stocked[by_group]) & has_cards[by_group]])
+
+        # Drop sellers dominated by a same-country seller with a superset of their cards
+        dominated = superset_dominated(prices[kept], country_ids[kept]) & ~stocked[kept]
+        output_df = sellers_df.iloc[kept[~dominated]].reset_index(drop=True)
+
+        print_info(
+            f"Filtered to {len(output_df)} unique sellers "
+            f"({int(dominated.sum())} dominated sellers removed)."
+        )
         return output_df
 
     except Exception as e:
@@ -431,89 +698,615 @@ def create_sellers_dataframe(
     """
     Transform listings into a seller-focused DataFrame.
 
-    Creates DataFrame where each row is a seller, and columns are card prices.
+    Creates DataFrame where each row is a seller, and columns are card prices
+    (int32 cents, listings.MISSING_PRICE where the seller does not offer the
+    card; see optimizer.build_price_matrix). Built column-wise in a single
+    pass over the compact listings (other frames are compacted first, see
+    listings.ensure_compact); if a seller lists the same card more than
+    once, the cheapest listing is kept.
+    Countries are categorical.
+
+    A card name may list alternatives ("A | B", see card_import.card_variants).
+    It gets one column holding each seller's cheapest listing of any variant,
+    so the optimizer treats the alternatives as a single card.
+
+    For a card wanted more than once ("4x A", see card_import.card_quantity)
+    an int32 stock column (see optimizer.stock_column) holds the quantity of
+    each seller's cheapest listing, so the plan never pays more than the
+    listed prices.
     """
     try:
-        found_cards = {}
-        for _, listing in listings.iterrows():
-            card_name = str(listing['card_name']).lower()
-            if card_name in card_names:
-                found_cards[card_name] = True
+        listings = ensure_compact(listings)
+        rows, slot_indices = match_card_slots(listings['card_name'], card_names)
 
-        found_cards = list(found_cards.keys())
+        card_codes, found_slots = pd.factorize(slot_indices)
+        found_cards = [card_names[index] for index in found_slots]
         print_info(f"Found {len(found_cards)} of {len(card_names)} desired cards in listings.")
 
-        sellers_df = pd.DataFrame(columns=["seller", "country", "link", *found_cards])
+        seller_codes, sellers = factorize_rows(listings['seller'], rows)
+        prices = listings['price'].to_numpy()[rows]
+        offered = prices != MISSING_PRICE
+
+        # Cheapest price per (seller, card) in cents, skipping missing prices
+        unset = np.iinfo(np.int32).max
+        price_matrix = np.full((len(sellers), len(found_cards)), unset, dtype=np.int32)
+        np.minimum.at(price_matrix, (seller_codes[offered], card_codes[offered]), prices[offered])
+        price_matrix[price_matrix == unset] = MISSING_PRICE
+
+        # Each seller's country is taken from its first listing
+        _, first_listing = np.unique(seller_codes, return_index=True)
+        countries = listings['country'].iloc[rows[first_listing]].to_numpy()
+
+        sellers_df = pd.DataFrame(price_matrix, columns=found_cards)
+        sellers_df.insert(0, "country", pd.Categorical(countries))
+        sellers_df.insert(0, "seller", sellers)
+
+        multiple_copies = [card_quantity(card)[0] > 1 for card in found_cards]
+        if any(multiple_copies):
+            quantities = listings['quantity'].to_numpy()[rows]
+            # Stock of the cheapest listing per (seller, card)
+            cheapest = offered & (prices == price_matrix[seller_codes, card_codes])
+            stock = np.zeros(price_matrix.shape, dtype=np.int32)
+            np.maximum.at(stock, (seller_codes[cheapest], card_codes[cheapest]), quantities[cheapest])
+            sellers_df = pd.concat([sellers_df, pd.DataFrame({
+                stock_column(card): stock[:, j]
+                for j, card in enumerate(found_cards) if multiple_copies[j]
+            })], axis=1)
 
-        for _, listing in listings.iterrows():
-            seller = listing['seller']
-            card_price = listing['price']
-            card_name = str(listing['card_name']).lower()
+        return sellers_df, found_cards
 
-            if card_name not in card_names:
-                continue
+    except Exception as e:
+        print_error(f"Error creating sellers dataframe: {str(e)}")
+        return pd.DataFrame(), []
+
+
+def _plan_items(groups: dict) -> set:
+    """(seller, card) pairs bought in a plan, to tell distinct plans apart."""
+    return {(seller, card) for seller, cards in groups.items() for card in cards}
+
+
+def find_cheapest_plan(
+    listings_df: pd.DataFrame,
+    card_names: list[str],
+    shipping_dict: dict,
+    engine: str = DEFAULT_ENGINE,
+    time_limit: float = None,
+    workers: int = None,
+    orderings: int = 1,
+    metrics: PipelineMetrics = None,
+    use_cache: bool = True,
+    incremental: bool = False,
+    alternatives: int = 1,
+    max_sellers: int = None,
+    compare_dp: bool = False
+) -> tuple[dict, float, dict, list[dict], list[dict]]:
+    """
+    Run the find-cheapest pipeline: build the sellers dataframe, filter
+    redundant sellers and find the cheapest seller groups.
 
-            if seller in sellers_df['seller'].values:
-                sellers_df.loc[sellers_df['seller'] == seller, card_name] = card_price
+    Results are cached on disk, keyed by a hash of the listings content, the
+    card list, the shipping data and the optimizer settings, so an identical
+    request returns the stored plan without running the pipeline.
+
+    With `incremental` (numpy engine only), the DP state of the previous run
+    for the same cards and shipping data is kept in a snapshot, and only the
+    cards whose listings changed are recomputed (see incremental_solve).
+
+    With `alternatives` > 1 the plan is still the configured engine's, and
+    the K-best DP (see find_alternative_plans) supplies up to
+    `alternatives` - 1 other distinct plans, cheapest first. They are
+    returned as dicts with "groups", "cost" and "card_prices". Unless the
+    engine proves its plan optimal, an alternative can be cheaper than it.
+
+    With `max_sellers` the plan may use at most that many sellers (see
+    find_plans_by_seller_count). The cost-vs-seller-count curve is returned
+    as dicts with "max_sellers", "cost" and "sellers" (sellers actually used),
+    one per limit from 1 to `max_sellers`.
+
+    With `compare_dp` and the greedy engine, the numpy DP's cost is printed
+    next to the greedy plan's (see find_cheapest_seller_group); such runs
+    bypass the result cache, which would skip the comparison.
+
+    Returns:
+        tuple: (optimal_seller_groups dict, minimum_cost float,
+                card_prices dict of seller -> card -> unit price paid,
+                alternative plans list,
+                seller curve list)
+    """
+    if metrics is None:
+        metrics = PipelineMetrics()
+
+    cache = ResultCache(RESULT_CACHE_DIR)
+    key = None
+    if use_cache and not (compare_dp and engine == "greedy"):
+        with metrics.stage("result_cache"):
+            settings = {
+                "engine": engine,
+                "time_limit": time_limit,
+                "orderings": orderings,
+                "incremental": incremental,
+                "alternatives": alternatives,
+                "max_sellers": max_sellers,
+            }
+            key = result_key(listings_df, card_names, shipping_dict, settings)
+            cached = cache.get(key)
+        if cached is not None:
+            print_success("Using cached result of an identical earlier run")
+            return (
+                cached["groups"], cached["cost"], cached["card_prices"],
+                cached.get("alternatives", []), cached.get("seller_curve", [])
+            )
+
+    # Create and filter sellers dataframe
+    with metrics.stage("create_sellers_dataframe", listings=len(listings_df)) as record:
+        sellers_df, found_cards = create_sellers_dataframe(listings_df, card_names)
+        record.update(cards=len(found_cards), sellers=len(sellers_df))
+
+    if sellers_df.empty:
+        print_error("No matching sellers found!")
+        return {}, float('inf'), {}, [], []
+
+    print_info(f"Found {len(sellers_df)} sellers with {len(found_cards)} cards.")
+
+    with metrics.stage("filter_sellers_df", sellers_before=len(sellers_df)) as record:
+        filtered_df = filter_sellers_df(sellers_df, found_cards)
+        record["sellers_after"] = len(filtered_df)
+
+    if any(card_quantity(card)[0] > 1 for card in found_cards) and (incremental or alternatives > 1 or max_sellers):
+        print_warning("Cards with several copies are optimized in a single full solve; "
+                      "ignoring incremental mode, alternatives and the seller limit")
+        incremental, alternatives, max_sellers = False, 1, None
+    if max_sellers and (engine != "numpy" or incremental or alternatives > 1):
+        print_warning("A seller limit is enforced by the numpy engine; running a full solve without alternatives")
+        engine, incremental, alternatives = "numpy", False, 1
+    if alternatives > 1 and incremental:
+        print_warning("Alternative plans need a full solve; ignoring incremental mode")
+        incremental = False
+    if incremental and engine != "numpy":
+        print_warning("Incremental mode only supports the numpy engine; running a full solve")
+        incremental = False
+
+    # Find optimal seller groups
+    print_info("Finding optimal seller combination...")
+    alternative_plans = []
+    seller_curve = []
+    if max_sellers:
+        plans = find_plans_by_seller_count(
+            filtered_df, shipping_dict, set(found_cards), max_sellers, metrics, time_limit
+        )
+        optimal_groups, min_cost, searched = plans[-1] if plans else ({}, float('inf'), True)
+        if not optimal_groups:
+            if searched:
+                print_error(f"No plan with at most {max_sellers} sellers covers all cards")
             else:
-                row = {
-                    "seller": seller,
-                    "country": listing['country'],
-                    **{card.lower(): None for card in found_cards}
-                }
-                row[card_name] = card_price
-                new_row_df = pd.DataFrame([row])
-                if sellers_df.empty:
-                    sellers_df = new_row_df
-                else:
-                    sellers_df = pd.concat([sellers_df, new_row_df], ignore_index=True)
+                print_error(f"No plan with at most {max_sellers} sellers found within the time limit; "
+                            f"a longer --time-limit may find one")
+        card_prices = _card_prices(filtered_df, optimal_groups)
+        seller_curve = [
+            {"max_sellers": limit, "cost": float(cost), "sellers": len(groups), "searched": searched}
+            for limit, (groups, cost, searched) in enumerate(plans, start=1)
+        ]
+    elif alternatives > 1:
+        # Plan 1 is the configured engine's plan; the K-best DP supplies the others
+        optimal_groups, min_cost = find_cheapest_seller_group(
+            filtered_df, shipping_dict, set(found_cards), engine, time_limit,
+            workers, orderings, metrics
+        )
+        card_prices = _card_prices(filtered_df, optimal_groups)
+        plans = find_alternative_plans(filtered_df, shipping_dict, set(found_cards), alternatives, metrics)
+        alternative_plans = [
+            {"groups": groups, "cost": float(cost), "card_prices": _card_prices(filtered_df, groups)}
+            for groups, cost in plans if _plan_items(groups) != _plan_items(optimal_groups)
+        ][:alternatives - 1]
+    elif incremental:
+        with metrics.stage("optimize (incremental)") as record:
+            counters = {}
+            result = incremental_solve(
+                listings_df, sellers_df, filtered_df, found_cards, shipping_dict, SNAPSHOT_DIR,
+                counters=counters
+            )
+            record.update(changed_cards=len(result.changed_cards), cost=round(float(result.cost), 2))
+        metrics.count(**counters)
+        if result.resumed_column is None:
+            print_info("No usable snapshot or too many changed cards; solved from scratch")
+        else:
+            print_info(
+                f"{len(result.changed_cards)} cards changed; reused the first "
+                f"{result.resumed_column + 1} of {len(found_cards)} DP columns"
+            )
+        print_info(f"Minimum cost: {result.cost:.2f}")
+        optimal_groups, min_cost, card_prices = result.groups, result.cost, result.card_prices
+    else:
+        optimal_groups, min_cost = find_cheapest_seller_group(
+            filtered_df, shipping_dict, set(found_cards), engine, time_limit,
+            workers, orderings, metrics, compare_dp
+        )
+        card_prices = _card_prices(filtered_df, optimal_groups)
 
-        return sellers_df, found_cards
+    if key is not None and optimal_groups:
+        try:
+            cache.put(key, {
+                "groups": optimal_groups,
+                "cost": float(min_cost),
+                "card_prices": card_prices,
+                "alternatives": alternative_plans,
+                "seller_curve": seller_curve,
+            })
+        except OSError as e:
+            print_warning(f"Failed to cache result: {str(e)}")
+
+    return optimal_groups, min_cost, card_prices, alternative_plans, seller_curve
+
+
+def card_marginal_costs(
+    listings_df: pd.DataFrame,
+    card_names: list[str],
+    shipping_dict: dict,
+    metrics: PipelineMetrics = None,
+    groups: dict = None,
+    max_sellers: int = None
+) -> tuple[float, list[tuple[str, float]]]:
+    """
+    How much each card adds to the total, shipping included.
+
+    The savings are relative to the plan in `groups` (seller groups as
+    returned by find_cheapest_plan), or to the numpy DP's own plan if not
+    given. Dropping a card from that plan re-costs its shipping; instead of
+    one optimizer run per dropped card, the numpy DP is also run forwards and
+    backwards once and the partial plans on either side of each card are
+    joined (see optimizer.marginal_costs), which can find a cheaper plan
+    without the card and takes about as long as two solves. With
+    `max_sellers` the plans without a card stay within that many sellers.
+
+    Returns:
+        tuple: (plan cost float, list of (card, saving if dropped) sorted by saving, largest first)
+    """
+    try:
+        if metrics is None:
+            metrics = PipelineMetrics()
+
+        if any(card_quantity(card)[0] > 1 for card in card_names):
+            print_warning("Marginal costs are not available for cards with several copies")
+            return float('inf'), []
+        sellers_df, found_cards = create_sellers_dataframe(listings_df, card_names)
+        if sellers_df.empty:
+            return float('inf'), []
+        filtered_df = filter_sellers_df(sellers_df, found_cards).reset_index(drop=True)
+        sorted_cards = sorted(found_cards)
+
+        assignment = None
+        if groups:
+            seller_rows = {seller: row for row, seller in enumerate(filtered_df['seller'])}
+            plan_sellers = {card: seller for seller, cards in groups.items() for card in cards}
+            if set(plan_sellers) != set(sorted_cards) or not set(groups) <= set(seller_rows):
+                print_warning("The plan does not match the listings; marginal costs are not available")
+                return float('inf'), []
+            assignment = np.array([seller_rows[plan_sellers[card]] for card in sorted_cards])
+
+        with metrics.stage("marginal_costs", sellers=len(filtered_df), cards=len(sorted_cards)):
+            adjacency_matrix = build_price_matrix(filtered_df, sorted_cards)
+            shipping_table = ShippingTable.compile(shipping_dict, filtered_df['country'].tolist())
+            counters = {}
+            cost, _, without = marginal_costs(
+                adjacency_matrix, shipping_table, counters=counters, assignment=assignment,
+                max_sellers=max_sellers
+            )
+        metrics.count(**counters)
+
+        if not np.isfinite(cost):
+            return cost, []
+        savings = [(card, float(cost - without[j])) for j, card in enumerate(sorted_cards)]
+        return cost, sorted(savings, key=lambda item: (-item[1], item[0]))
 
     except Exception as e:
-        print_error(f"Error creating sellers dataframe: {str(e)}")
-        return pd.DataFrame(), []
+        print_error(f"Error in card_marginal_costs: {str(e)}")
+        print_error(traceback.format_exc())
+        return float('inf'), []
+
+
+def format_marginal_costs(cost: float, savings: list[tuple[str, float]]) -> list[str]:
+    """Output lines for the per-card savings relative to the plan of `cost`, largest first."""
+    lines = [f"Saving per dropped card, shipping included (relative to the plan of {cost:.2f}€):"]
+    for card, saving in savings:
+        lines.append(f"  - drop {card}: save {saving:.2f}€")
+    return lines
+
+
+def format_alternatives(best_groups: dict, best_cost: float, alternative_plans: list[dict]) -> list[str]:
+    """Output lines for the runner-up plans: cost, difference to the chosen plan and changed cards."""
+    lines = []
+    if any(plan['cost'] < best_cost for plan in alternative_plans):
+        lines.append("Note: the K-best DP found cheaper plans than the engine's plan, which is not proven optimal")
+    for rank, plan in enumerate(alternative_plans, start=2):
+        lines.append(
+            f"Alternative {rank}: {plan['cost']:.2f}€ ({plan['cost'] - best_cost:+.2f}€, "
+            f"{len(plan['groups'])} sellers)"
+        )
+        for card, best_seller, seller in plan_diff(best_groups, plan['groups']):
+            lines.append(f"  - {card}: {best_seller} -> {seller} at {plan['card_prices'][seller][card]:.2f}€")
+    return lines
+
+
+def format_seller_curve(seller_curve: list[dict]) -> list[str]:
+    """
+    Output lines for the cost-vs-seller-count curve, with the saving of each extra seller.
+
+    The curve comes from the seller-layered DP, which keeps more partial plans
+    than the default numpy DP (a heuristic), so a limited plan can be cheaper
+    than the plan of a run without a seller limit; the lines say so. Limits
+    without a plan say whether the branch-and-bound fallback proved that none
+    exists or ran out of time.
+    """
+    lines = [
+        "Cost by maximum number of sellers:",
+        "  (seller-layered DP; it keeps more partial plans than the default numpy DP, which is a heuristic,",
+        "   so these costs can be lower than a run without --max-sellers; limits it finds no plan for",
+        "   are searched by branch-and-bound)",
+    ]
+    previous = None
+    for point in seller_curve:
+        if not np.isfinite(point['cost']):
+            if point.get('searched', True):
+                lines.append(f"  {point['max_sellers']:>3} sellers: no plan covers all cards")
+            else:
+                lines.append(f"  {point['max_sellers']:>3} sellers: no plan found within the time limit")
+            continue
+        line = f"  {point['max_sellers']:>3} sellers: {point['cost']:.2f}€ ({point['sellers']} used)"
+        if previous is not None:
+            line += f", saves {previous - point['cost']:.2f}€"
+        lines.append(line)
+        previous = point['cost']
+    return lines
+
+
+def format_plan(rows: list[dict], cost: float) -> list[str]:
+    """Output lines for a plan (see plan_export.plan_rows): one per row, then the totals."""
+    lines = []
+    for row in rows:
+        label = row['listing'] if row['copies'] == 1 else f"{row['copies']}x {row['listing']}"
+        lines.append(
+            f"  - {label}: buy from {row['seller']} at {row['price']:.2f}€"
+            + (f" (link: {row['link']})" if row['link'] else "")
+        )
+    lines.append("")
+    lines.append(f"Total card cost: {sum(row['cost'] for row in rows):.2f}€")
+    lines.append(f"Total with shipping: {cost:.2f}€")
+    return lines
+
+
+def run_batch(
+    listings_df: pd.DataFrame,
+    jobs: list[dict],
+    shipping_dicts: dict,
+    output_dir: str,
+    engine: str = DEFAULT_ENGINE,
+    time_limit: float = None,
+    workers: int = None,
+    orderings: int = 1,
+    metrics: PipelineMetrics = None
+) -> list[dict]:
+    """
+    Optimize many (card list, destination country) jobs over the same listings.
+
+    The seller dataframe and price matrix are built once for the union of all
+    card lists, seller pruning runs once per distinct card list (it only
+    compares sellers from the same country, so it does not depend on the
+    destination), and each destination's shipping table is compiled once for
+    all sellers and narrowed per job. The jobs are then solved concurrently on
+    a pool of `workers` processes (see optimizer.solve_batch).
+
+    `shipping_dicts` maps each job country to its shipping dictionary. Writes
+    one result file per job (<name>.txt, and <name>.json as written by
+    plan_export.export_plan) and a summary.csv to `output_dir`.
+
+    Returns:
+        list: one summary dict per job ("job", "country", "cards", "found",
+              "sellers", "card_cost", "shipping", "total")
+    """
+    if metrics is None:
+        metrics = PipelineMetrics()
+
+    all_cards = list(dict.fromkeys(card for job in jobs for card in job['cards']))
+    with metrics.stage("create_sellers_dataframe", listings=len(listings_df), jobs=len(jobs)) as record:
+        sellers_df, found_cards = create_sellers_dataframe(listings_df, all_cards)
+        record.update(cards=len(found_cards), sellers=len(sellers_df))
+
+    if sellers_df.empty:
+        print_error("No matching sellers found!")
+        return []
+
+    with metrics.stage("price_matrix", sellers=len(sellers_df), cards=len(found_cards)):
+        prices = build_price_matrix(sellers_df, found_cards)
+        seller_index = pd.Index(sellers_df['seller'])
+        card_index = pd.Index(found_cards)
+
+    with metrics.stage("shipping_tables", countries=len(shipping_dicts)):
+        shipping_tables = {
+            country: ShippingTable.compile(shipping_dict, sellers_df['country'].tolist())
+            for country, shipping_dict in shipping_dicts.items()
+        }
+    for country, table in shipping_tables.items():
+        for missing in table.missing_countries:
+            print_warning(f"No shipping data for country: {missing} (to {country})")
+
+    # Seller pruning runs once per distinct card list
+    found = set(found_cards)
+    pruned = {}
+    tasks = []
+    planned_jobs = {}
+    with metrics.stage("filter_sellers_df") as record:
+        for job in jobs:
+            cards = sorted({card for card in job['cards'] if card in found})
+            if not cards:
+                print_warning(f"Batch job {job['name']}: none of its cards have listings")
+                continue
+            if tuple(cards) not in pruned:
+                columns = ['seller', 'country'] + cards + [
+                    stock_column(card) for card in cards if stock_column(card) in sellers_df.columns
+                ]
+                pruned[tuple(cards)] = filter_sellers_df(sellers_df[columns], cards)
+            filtered_df = pruned[tuple(cards)]
+
+            rows = seller_index.get_indexer(filtered_df['seller'])
+            quantities = np.array([card_quantity(card)[0] for card in cards], dtype=np.int64)
+            multiple_copies = bool((quantities > 1).any())
+            if multiple_copies and engine != "numpy":
+                print_warning(f"Batch job {job['name']}: card quantities are handled by the numpy engine")
+            tasks.append(BatchTask(
+                rows,
+                card_index.get_indexer(cards),
+                shipping_tables[job['country']].subset(rows),
+                engine,
+                time_limit,
+                orderings,
+                build_stock_matrix(filtered_df, cards) if multiple_copies else None,
+                quantities if multiple_copies else None
+            ))
+            planned_jobs[job['name']] = (cards, filtered_df, quantities)
+        record.update(card_lists=len(pruned), jobs=len(tasks))
+
+    print_info(
+        f"Solving {len(tasks)} batch jobs ({len(pruned)} distinct card lists, "
+        f"{len(shipping_tables)} countries)..."
+    )
+    with metrics.stage("optimize (batch)", jobs=len(tasks)):
+        results = solve_batch(prices, tasks, max_workers=workers)
+    for result in results:
+        metrics.count(**result.counters)
+    results = dict(zip(planned_jobs, results))
+
+    summary = []
+    with metrics.stage("write_results", jobs=len(jobs)):
+        os.makedirs(output_dir, exist_ok=True)
+        listing_index = ListingIndex(listings_df)
+        for job in jobs:
+            cards, groups, card_prices, cost = [], {}, {}, float('inf')
+            if job['name'] in results:
+                cards, filtered_df, quantities = planned_jobs[job['name']]
+                result = results[job['name']]
+                if np.isfinite(result.cost):
+                    cost = float(result.cost)
+                    # The assignment has one seller per copy bought
+                    path_cards = np.repeat(np.arange(len(cards)), quantities)
+                    seller_names = filtered_df['seller'].to_numpy()[result.assignment]
+                    groups = seller_groups(seller_names, [cards[card] for card in path_cards])
+                    card_prices = _card_prices(filtered_df, groups)
+
+            rows = plan_rows(listing_index, groups, card_prices, shipping_dicts[job['country']])
+            card_cost = sum(row['cost'] for row in rows)
+            lines = [f"Job: {job['name']} (shipping to {job['country']})", ""]
+            lines += format_plan(rows, cost)
+            missing = sorted(set(job['cards']) - set(cards))
+            if missing:
+                lines += ["", f"Cards without listings ({len(missing)}): {', '.join(missing)}"]
+            with open(os.path.join(output_dir, f"{job['name']}.txt"), 'w') as f:
+                f.write("\n".join(lines) + "\n")
+            export_plan(rows, cost, os.path.join(output_dir, f"{job['name']}.json"))
+
+            summary.append({
+                "job": job['name'],
+                "country": job['country'],
+                "cards": len(job['cards']),
+                "found": len(cards),
+                "sellers": len(groups),
+                "card_cost": round(card_cost, 2),
+                "shipping": round(cost - card_cost, 2),
+                "total": round(cost, 2),
+            })
+        pd.DataFrame(summary).to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+
+    return summary
+
+
+def format_batch_summary(summary: list[dict]) -> list[str]:
+    """Output lines for the batch summary, one per job."""
+    lines = ["Batch summary:"]
+    for row in summary:
+        if not np.isfinite(row['total']):
+            lines.append(f"  - {row['job']} ({row['country']}): no plan found")
+            continue
+        lines.append(
+            f"  - {row['job']} ({row['country']}): {row['total']:.2f}€ "
+            f"({row['card_cost']:.2f}€ cards + {row['shipping']:.2f}€ shipping, "
+            f"{row['sellers']} sellers, {row['found']}/{row['cards']} cards found)"
+        )
+    return lines
+
+
+# Left out of listing hashes: the link varies between visits of the same
+# listing, and hashes stored before quantities were scraped must still match
+UNHASHED_LISTING_KEYS = ('link', 'quantity')
+
+
+def listing_hash(listing: dict) -> str:
+    """MD5 of a listing, excluding its link and quantity, used to detect duplicates."""
+    listing_for_hash = {k: v for k, v in listing.items() if k not in UNHASHED_LISTING_KEYS}
+    listing_str = json.dumps(listing_for_hash, sort_keys=True)
+    return hashlib.md5(listing_str.encode('utf-8')).hexdigest()
+
+
+def iter_new_listings(raw_data: Iterable[dict], seen_hashes: set) -> Iterator[dict]:
+    """
+    Yield listing rows (with their hash) that have not been seen before.
+
+    `seen_hashes` is updated as rows are yielded, so it can be shared across
+    calls and `raw_data` can be any iterable, e.g. scraper results as they arrive.
+    """
+    for listing in raw_data:
+        hash_value = listing_hash(listing)
+        if hash_value in seen_hashes:
+            continue
+        seen_hashes.add(hash_value)
+        yield {
+            "seller": listing['seller'],
+            "card_name": listing['card_name'],
+            "price": listing['price'],
+            "country": listing['country'],
+            "quantity": listing.get('quantity', 1),
+            "link": listing['link'],
+            "hash": hash_value
+        }
 
 
 def parse_raw_data(
-    raw_data: list[dict],
+    raw_data: Iterable[dict],
     previous_listings: pd.DataFrame = None
 ) -> pd.DataFrame:
     """
     Parse raw scraper data into a DataFrame with deduplication.
 
-    Uses MD5 hash of listing (excluding link) to detect duplicates.
+    Uses MD5 hash of listing (excluding link and quantity) to detect duplicates. The hash
+    index is seeded from the previous listings, new rows are buffered in
+    batches and the result is built with a single concat at the end. Returns
+    compact listings (see listings.compact_listings).
     """
     try:
         if previous_listings is not None and not previous_listings.empty:
-            listings = previous_listings.copy()
+            listings = compact_listings(previous_listings)
+            if 'hash' not in listings.columns:
+                # Hashes are computed on the file format, like those of scraped listings
+                hash_keys = [k for k in ('seller', 'card_name', 'price', 'country') if k in previous_listings.columns]
+                listings = listings.assign(hash=[
+                    listing_hash({k: row[k] for k in hash_keys})
+                    for row in export_listings(listings[hash_keys]).to_dict('records')
+                ])
         else:
-            listings = pd.DataFrame(columns=["seller", "card_name", "price", "country", "link", "hash"])
-
-        new_count = 0
-        for listing in raw_data:
-            listing_for_hash = {k: v for k, v in listing.items() if k != 'link'}
-            listing_str = json.dumps(listing_for_hash, sort_keys=True)
-            hash_value = hashlib.md5(listing_str.encode('utf-8')).hexdigest()
-
-            if hash_value in listings['hash'].values:
-                continue
-
-            row = {
-                "seller": listing['seller'],
-                "card_name": listing['card_name'],
-                "price": listing['price'],
-                "country": listing['country'],
-                "link": listing['link'],
-                "hash": hash_value
-            }
-
-            new_row_df = pd.DataFrame([row])
-            if listings.empty:
-                listings = new_row_df
-            else:
-                listings = pd.concat([listings, new_row_df], ignore_index=True)
-            new_count += 1
+            listings = compact_listings(pd.DataFrame(columns=LISTING_COLUMNS))
+
+        seen_hashes = set(listings['hash'])
+        batches = []
+        batch = []
+        for row in iter_new_listings(raw_data, seen_hashes):
+            batch.append(row)
+            if len(batch) >= LISTING_BATCH_SIZE:
+                batches.append(compact_listings(pd.DataFrame(batch, columns=LISTING_COLUMNS)))
+                batch = []
+        if batch:
+            batches.append(compact_listings(pd.DataFrame(batch, columns=LISTING_COLUMNS)))
+
+        new_count = sum(len(b) for b in batches)
+        if batches:
+            listings = concat_listings([listings, *batches])
 
         print_info(f"Added {new_count} new listings. Total: {len(listings)}")
         return listings
@@ -534,6 +1327,16 @@ class AppState:
         self.listings_df: pd.DataFrame = pd.DataFrame()
         self.shipping_dict: dict = None
         self.to_country: str = TO_COUNTRY
+        self.engine: str = DEFAULT_ENGINE
+        self.time_limit: float = None
+        self.workers: int = None
+        self.orderings: int = 1
+        self.use_cache: bool = True
+        self.incremental: bool = False
+        self.alternatives: int = 1
+        self.max_sellers: int = None
+        self.marginal_costs: bool = False
+        self.compare_dp: bool = False
 
 
 def clear_screen():
@@ -698,7 +1501,8 @@ def _menu_import_decklist(state: AppState):
         return
 
     text = "\n".join(lines)
-    cards = parse_decklist(text)
+    keep_quantities = input("Buy every copy listed, e.g. 4 of '4 Lightning Bolt'? (y/N): ").strip().lower() == 'y'
+    cards = parse_decklist(text, keep_quantities)
 
     if cards:
         state.desired_cards = cards
@@ -716,9 +1520,10 @@ def _menu_import_moxfield(state: AppState):
         input("\nPress Enter to continue...")
         return
 
+    keep_quantities = input("Buy every copy in the deck, not one of each card? (y/N): ").strip().lower() == 'y'
     try:
         print_info("Fetching deck from Moxfield...")
-        cards = import_from_moxfield(url)
+        cards = import_from_moxfield(url, keep_quantities)
         state.desired_cards = cards
         print_success(f"Imported {len(cards)} cards from Moxfield")
     except CardImportError as e:
@@ -809,11 +1614,11 @@ def menu_gather_listings(state: AppState):
     # Determine which cards still need scraping
     if not state.listings_df.empty:
         existing_cards = set(state.listings_df['card_name'].str.lower().unique())
-        cards_to_gather = [c for c in state.desired_cards
+        cards_to_gather = [c for c in expand_variants(state.desired_cards)
                           if c.lower() not in existing_cards]
         print(f"Cards needing data: {len(cards_to_gather)}")
     else:
-        cards_to_gather = state.desired_cards
+        cards_to_gather = expand_variants(state.desired_cards)
 
     print("\nOptions:")
     print("  1. Active mode (automatic scraping)")
@@ -830,6 +1635,8 @@ def menu_gather_listings(state: AppState):
     headless = choice == "3"
 
     try:
+        from market_api import CardApi
+
         print_info("Initializing CardApi...")
         api = CardApi(headless=headless)
 
@@ -881,26 +1688,16 @@ def menu_find_cheapest(state: AppState):
     card_names = [card.lower() for card in state.desired_cards]
 
     print_info(f"Processing {len(state.listings_df)} listings for {len(card_names)} cards...")
+    metrics = PipelineMetrics()
 
     try:
-        # Create sellers dataframe
-        sellers_df, found_cards = create_sellers_dataframe(state.listings_df, card_names)
-
-        if sellers_df.empty:
-            print_error("No matching sellers found!")
-            input("\nPress Enter to continue...")
-            return
-
-        print_info(f"Found {len(sellers_df)} sellers with {len(found_cards)} cards.")
-
-        # Filter redundant sellers
-        filtered_df = filter_sellers_df(sellers_df, found_cards)
-
         # Load or fetch shipping dictionary
         if state.shipping_dict is None:
             print_info(f"Fetching shipping prices for {state.to_country}...")
             try:
-                state.shipping_dict = ShippingApi.get_shipping_prices(state.to_country)
+                with metrics.stage("fetch_shipping"):
+                    from market_api import ShippingApi
+                    state.shipping_dict = ShippingApi.get_shipping_prices(state.to_country)
             except Exception as e:
                 print_error(f"Failed to fetch shipping prices: {str(e)}")
                 # Try to load from file
@@ -914,38 +1711,58 @@ def menu_find_cheapest(state: AppState):
                     input("\nPress Enter to continue...")
                     return
 
-        # Find optimal seller groups
-        print_info("Finding optimal seller combination...")
-        desired_cards_set = set(found_cards)
-        optimal_groups, min_cost = find_cheapest_seller_group(
-            filtered_df, state.shipping_dict, desired_cards_set
+        optimal_groups, min_cost, card_prices, alternative_plans, seller_curve = find_cheapest_plan(
+            state.listings_df, card_names, state.shipping_dict, state.engine, state.time_limit,
+            state.workers, state.orderings, metrics, state.use_cache, state.incremental,
+            state.alternatives, state.max_sellers, state.compare_dp
         )
+        marginal_lines = []
+        if state.marginal_costs:
+            plan_cost, savings = card_marginal_costs(
+                state.listings_df, card_names, state.shipping_dict, metrics, optimal_groups, state.max_sellers
+            ) if optimal_groups else (float('inf'), [])
+            marginal_lines = format_marginal_costs(plan_cost, savings) if savings else []
+        metrics.print_summary()
 
         if not optimal_groups:
+            if seller_curve:
+                print()
+                for line in format_seller_curve(seller_curve):
+                    print(line)
             print_error("Could not find a valid seller combination!")
             input("\nPress Enter to continue...")
             return
 
         # Display results
         print(f"\n{Colors.BOLD}{Colors.GREEN}=== Results ==={Colors.RESET}")
-        total_card_cost = 0
-
-        for seller, cards in optimal_groups.items():
-            print(f"\n{Colors.BOLD}Seller: {seller}{Colors.RESET}")
-            for card in cards:
-                price = filtered_df.loc[filtered_df['seller'] == seller, card].values[0]
-                link_values = state.listings_df.loc[
-                    (state.listings_df['seller'] == seller) &
-                    (state.listings_df['card_name'].str.lower() == card.lower()),
-                    'link'
-                ].values
-                link = link_values[0] if len(link_values) > 0 else None
-                print(f"  - {card}: {price:.2f}€" + (f" ({link})" if link else ""))
-                total_card_cost += price
+        plan = plan_rows(ListingIndex(state.listings_df), optimal_groups, card_prices, state.shipping_dict)
+        total_card_cost = sum(row['cost'] for row in plan)
+
+        seller = None
+        for row in plan:
+            if row['seller'] != seller:
+                seller = row['seller']
+                print(f"\n{Colors.BOLD}Seller: {seller}{Colors.RESET}")
+            print(f"  - {copy_label(row)}" + (f" ({row['link']})" if row['link'] else ""))
 
         print(f"\n{Colors.BOLD}Total card cost: {total_card_cost:.2f}€{Colors.RESET}")
         print(f"{Colors.BOLD}Total with shipping: {min_cost:.2f}€{Colors.RESET}")
 
+        if alternative_plans:
+            print()
+            for line in format_alternatives(optimal_groups, min_cost, alternative_plans):
+                print(line)
+
+        if seller_curve:
+            print()
+            for line in format_seller_curve(seller_curve):
+                print(line)
+
+        if marginal_lines:
+            print()
+            for line in marginal_lines:
+                print(line)
+
         # Offer to save results
         if input("\nSave results to file? (y/n): ").strip().lower() == 'y':
             output_path = input("Output file path (default: output.txt): ").strip() or "output.txt"
@@ -953,18 +1770,35 @@ def menu_find_cheapest(state: AppState):
                 with open(output_path, 'w') as f:
                     f.write("CardMarket Price Optimizer Results\n")
                     f.write("=" * 40 + "\n\n")
-                    for seller, cards in optimal_groups.items():
-                        f.write(f"Seller: {seller}\n")
-                        for card in cards:
-                            price = filtered_df.loc[filtered_df['seller'] == seller, card].values[0]
-                            f.write(f"  - {card}: {price:.2f}€\n")
-                        f.write("\n")
+                    seller = None
+                    for row in plan:
+                        if row['seller'] != seller:
+                            if seller is not None:
+                                f.write("\n")
+                            seller = row['seller']
+                            f.write(f"Seller: {seller}\n")
+                        f.write(f"  - {copy_label(row)}\n")
+                    f.write("\n")
                     f.write(f"Total card cost: {total_card_cost:.2f}€\n")
                     f.write(f"Total with shipping: {min_cost:.2f}€\n")
+                    if alternative_plans:
+                        f.write("\n" + "\n".join(format_alternatives(optimal_groups, min_cost, alternative_plans)) + "\n")
+                    if seller_curve:
+                        f.write("\n" + "\n".join(format_seller_curve(seller_curve)) + "\n")
+                    if marginal_lines:
+                        f.write("\n" + "\n".join(marginal_lines) + "\n")
                 print_success(f"Results saved to {output_path}")
             except Exception as e:
                 print_error(f"Failed to save results: {str(e)}")
 
+        export_path = input("Export plan as JSON/CSV (.json or .csv path, Enter to skip): ").strip()
+        if export_path:
+            try:
+                export_plan(plan, min_cost, export_path)
+                print_success(f"Plan exported to {export_path}")
+            except (OSError, ValueError) as e:
+                print_error(f"Failed to export plan: {str(e)}")
+
     except Exception as e:
         print_error(f"Error finding cheapest sellers: {str(e)}")
         print_error(traceback.format_exc())
@@ -981,6 +1815,13 @@ def menu_settings(state: AppState):
     print(f"\nCurrent settings:")
     print(f"  1. Target country: {state.to_country}")
     print(f"  2. Clear shipping cache")
+    print(f"  3. Optimizer engine: {state.engine}")
+    print(f"  4. Time limit: {f'{state.time_limit:g}s' if state.time_limit else 'none'}")
+    print(f"  5. Card orderings: {state.orderings}")
+    print(f"  6. Incremental re-optimization: {'on' if state.incremental else 'off'}")
+    print(f"  7. Plans to list (best + alternatives): {state.alternatives}")
+    print(f"  8. Maximum number of sellers: {state.max_sellers or 'no limit'}")
+    print(f"  9. Per-card marginal costs: {'on' if state.marginal_costs else 'off'}")
     print("  0. Back to main menu")
     print()
 
@@ -995,6 +1836,50 @@ def menu_settings(state: AppState):
     elif choice == "2":
         state.shipping_dict = None
         print_success("Shipping cache cleared")
+    elif choice == "3":
+        new_engine = input(f"Enter engine ({', '.join(OPTIMIZER_ENGINES)}): ").strip().lower()
+        if new_engine in OPTIMIZER_ENGINES:
+            state.engine = new_engine
+            print_success(f"Optimizer engine set to: {state.engine}")
+        elif new_engine:
+            print_warning(f"Unknown engine: {new_engine}")
+    elif choice == "4":
+        new_limit = input("Enter time limit in seconds (blank for none): ").strip()
+        try:
+            state.time_limit = float(new_limit) if new_limit else None
+            print_success(f"Time limit set to: {new_limit + 's' if new_limit else 'none'}")
+        except ValueError:
+            print_warning("Please enter a number")
+    elif choice == "5":
+        new_orderings = input("Enter number of card orderings to try: ").strip()
+        if new_orderings.isdigit() and int(new_orderings) > 0:
+            state.orderings = int(new_orderings)
+            print_success(f"Card orderings set to: {state.orderings}")
+        elif new_orderings:
+            print_warning("Please enter a positive number")
+    elif choice == "6":
+        state.incremental = not state.incremental
+        print_success(f"Incremental re-optimization {'enabled' if state.incremental else 'disabled'}")
+    elif choice == "7":
+        new_alternatives = input("Enter number of plans to list: ").strip()
+        if new_alternatives.isdigit() and int(new_alternatives) > 0:
+            state.alternatives = int(new_alternatives)
+            print_success(f"Plans to list set to: {state.alternatives}")
+        elif new_alternatives:
+            print_warning("Please enter a positive number")
+    elif choice == "8":
+        new_max_sellers = input("Enter maximum number of sellers (blank for no limit): ").strip()
+        if not new_max_sellers:
+            state.max_sellers = None
+            print_success("Seller limit removed")
+        elif new_max_sellers.isdigit() and int(new_max_sellers) > 0:
+            state.max_sellers = int(new_max_sellers)
+            print_success(f"Maximum number of sellers set to: {state.max_sellers}")
+        else:
+            print_warning("Please enter a positive number")
+    elif choice == "9":
+        state.marginal_costs = not state.marginal_costs
+        print_success(f"Per-card marginal costs {'enabled' if state.marginal_costs else 'disabled'}")
 
     input("\nPress Enter to continue...")
 
@@ -1057,6 +1942,12 @@ Examples:
         type=str,
         help="Moxfield deck URL to import cards from"
     )
+    parser.add_argument(
+        "--keep-quantities",
+        action="store_true",
+        help="Buy the card counts of a --decklist or --moxfield deck (e.g. 4 copies for '4 Lightning Bolt') "
+             "instead of one copy of each card"
+    )
     parser.add_argument(
         "--listings",
         type=str,
@@ -1072,6 +1963,18 @@ Examples:
         action="store_true",
         help="Run the browser in headless mode (no window)"
     )
+    parser.add_argument(
+        "--record-pages",
+        type=str,
+        metavar="DIR",
+        help="Save the HTML of every page visited while gathering to DIR"
+    )
+    parser.add_argument(
+        "--replay-pages",
+        type=str,
+        metavar="DIR",
+        help="Gather from pages saved with --record-pages instead of the live site (searches included)"
+    )
     parser.add_argument(
         "--find-cheapest",
         action="store_true",
@@ -1092,17 +1995,96 @@ Examples:
         type=str,
         help="File to write analysis results to"
     )
+    parser.add_argument(
+        "--plan-out",
+        type=str,
+        help="Export the plan (seller, card, price, link, shipping share per row) to a .json or .csv file"
+    )
     parser.add_argument(
         "--country",
         type=str,
         default=TO_COUNTRY,
         help=f"Target country for shipping (default: {TO_COUNTRY})"
     )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=OPTIMIZER_ENGINES,
+        default=DEFAULT_ENGINE,
+        help=f"Optimizer engine for --find-cheapest (default: {DEFAULT_ENGINE})"
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        help="Time limit in seconds for the exact, anytime and greedy engines (default: no limit)"
+    )
+    parser.add_argument(
+        "--compare-dp",
+        action="store_true",
+        help="With --engine greedy, also run the numpy DP and print its cost next to the greedy plan's"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Worker processes for solving independent card groups (default: all cores)"
+    )
+    parser.add_argument(
+        "--orderings",
+        type=int,
+        default=1,
+        help="Run the numpy/python engines over N card orderings in parallel and keep the cheapest plan"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse the previous run's DP state and only recompute cards whose listings changed (numpy engine)"
+    )
+    parser.add_argument(
+        "--alternatives",
+        type=int,
+        default=1,
+        metavar="K",
+        help="Also list the next cheapest plans, K plans in total, with their differences to the best one"
+    )
+    parser.add_argument(
+        "--max-sellers",
+        type=int,
+        metavar="N",
+        help="Use at most N sellers (parcels) and print the cheapest cost for every limit from 1 to N "
+             "(limits the DP finds no plan for are searched by branch-and-bound within --time-limit, default 60s)"
+    )
+    parser.add_argument(
+        "--marginal-costs",
+        action="store_true",
+        help="Also print how much dropping each card would save, shipping included"
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="JOBS",
+        help="Optimize every (card list, country) job in a JSON file against the --listings file"
+    )
+    parser.add_argument(
+        "--batch-out",
+        type=str,
+        help=f"Directory for the per-job results and summary.csv of --batch (default: {BATCH_DIR}/<timestamp>)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always run the optimizer instead of reusing a cached result"
+    )
+    parser.add_argument(
+        "--metrics-out",
+        help="Write per-stage timings, sizes and optimizer counters to a JSON file"
+    )
 
     args = parser.parse_args()
+    if args.plan_out and not args.plan_out.lower().endswith(PLAN_FORMATS):
+        parser.error("--plan-out must end in .json or .csv")
 
     # If no action arguments provided, run interactive menu
-    has_action = args.gather or args.find_cheapest
+    has_action = args.gather or args.find_cheapest or args.batch
     has_input = args.cards or args.decklist or args.moxfield or args.listings
     if not has_action and not has_input:
         run_interactive_menu()
@@ -1111,6 +2093,16 @@ Examples:
     # CLI mode
     state = AppState()
     state.to_country = args.country
+    state.engine = args.engine
+    state.time_limit = args.time_limit
+    state.workers = args.workers
+    state.orderings = max(args.orderings, 1)
+    state.use_cache = not args.no_cache
+    state.incremental = args.incremental
+    state.alternatives = max(args.alternatives, 1)
+    state.max_sellers = args.max_sellers if args.max_sellers and args.max_sellers > 0 else None
+    state.marginal_costs = args.marginal_costs
+    state.compare_dp = args.compare_dp
 
     # Load cards from one of the available sources
     if args.cards:
@@ -1124,7 +2116,7 @@ Examples:
         try:
             with open(args.decklist, 'r') as f:
                 text = f.read()
-            cards = parse_decklist(text)
+            cards = parse_decklist(text, args.keep_quantities)
             if cards:
                 state.desired_cards = cards
                 print_success(f"Imported {len(cards)} cards from decklist")
@@ -1136,7 +2128,7 @@ Examples:
             sys.exit(1)
     elif args.moxfield:
         try:
-            cards = import_from_moxfield(args.moxfield)
+            cards = import_from_moxfield(args.moxfield, args.keep_quantities)
             state.desired_cards = cards
             print_success(f"Imported {len(cards)} cards from Moxfield")
         except CardImportError as e:
@@ -1168,13 +2160,15 @@ Examples:
             # Determine cards to gather
             if not state.listings_df.empty:
                 existing_cards = set(state.listings_df['card_name'].str.lower().unique())
-                cards_to_gather = [c for c in state.desired_cards
+                cards_to_gather = [c for c in expand_variants(state.desired_cards)
                                   if c.lower() not in existing_cards]
             else:
-                cards_to_gather = state.desired_cards
+                cards_to_gather = expand_variants(state.desired_cards)
 
             print_info(f"Gathering listings for {len(cards_to_gather)} cards...")
-            api = CardApi(headless=args.headless)
+            from market_api import CardApi
+
+            api = CardApi(headless=args.headless, record_dir=args.record_pages, replay_dir=args.replay_pages)
             raw_data = api.gather_data(cards_to_gather)
             api.close()
 
@@ -1188,6 +2182,56 @@ Examples:
             print_error(f"Error during gathering: {str(e)}")
             sys.exit(1)
 
+    # Optimize a batch of jobs against the loaded listings
+    if args.batch:
+        if state.listings_df.empty:
+            print_error("Cannot run a batch without listings. Use --listings option.")
+            sys.exit(1)
+
+        jobs = load_batch_jobs(args.batch, state.to_country)
+        if not jobs:
+            sys.exit(1)
+
+        try:
+            metrics = PipelineMetrics()
+
+            # One shipping dictionary per destination country
+            shipping_dicts = {}
+            with metrics.stage("fetch_shipping"):
+                for job in jobs:
+                    country = job['country']
+                    if country in shipping_dicts:
+                        continue
+                    if job['shipping_dict']:
+                        with open(job['shipping_dict'], 'r') as f:
+                            shipping_dicts[country] = json.load(f)
+                    elif state.shipping_dict is not None and country == state.to_country.lower():
+                        shipping_dicts[country] = state.shipping_dict
+                    else:
+                        print_info(f"Fetching shipping prices for {country}...")
+                        from market_api import ShippingApi
+                        shipping_dicts[country] = ShippingApi.get_shipping_prices(country)
+
+            output_dir = args.batch_out or os.path.join(BATCH_DIR, datetime.now().strftime("%Y%m%d_%H%M%S"))
+            summary = run_batch(
+                state.listings_df, jobs, shipping_dicts, output_dir, state.engine, state.time_limit,
+                state.workers, state.orderings, metrics
+            )
+            metrics.print_summary()
+            if args.metrics_out:
+                metrics.save(args.metrics_out)
+                print_success(f"Metrics written to {args.metrics_out}")
+
+            print()
+            for line in format_batch_summary(summary):
+                print(line)
+            print_success(f"Batch results written to {output_dir}")
+
+        except Exception as e:
+            print_error(f"Error running batch: {str(e)}")
+            print_error(traceback.format_exc())
+            sys.exit(1)
+
     # Find cheapest sellers
     if args.find_cheapest:
         if not state.desired_cards:
@@ -1201,14 +2245,14 @@ Examples:
         try:
             card_names = [card.lower() for card in state.desired_cards]
 
-            # Create and filter sellers dataframe
-            sellers_df, found_cards = create_sellers_dataframe(state.listings_df, card_names)
-            filtered_df = filter_sellers_df(sellers_df, found_cards)
+            metrics = PipelineMetrics()
 
             # Load or fetch shipping dictionary
             if state.shipping_dict is None:
                 print_info(f"Fetching shipping prices for {state.to_country}...")
-                state.shipping_dict = ShippingApi.get_shipping_prices(state.to_country)
+                with metrics.stage("fetch_shipping"):
+                    from market_api import ShippingApi
+                    state.shipping_dict = ShippingApi.get_shipping_prices(state.to_country)
 
                 # Cache shipping dictionary
                 shipping_cache_path = os.path.join(os.path.dirname(__file__), "shipping_dict.json")
@@ -1216,43 +2260,67 @@ Examples:
                     json.dump(state.shipping_dict, f)
 
             # Find optimal groups
-            desired_cards_set = set(found_cards)
-            optimal_groups, min_cost = find_cheapest_seller_group(
-                filtered_df, state.shipping_dict, desired_cards_set
+            optimal_groups, min_cost, card_prices, alternative_plans, seller_curve = find_cheapest_plan(
+                state.listings_df, card_names, state.shipping_dict, state.engine, state.time_limit,
+                state.workers, state.orderings, metrics, state.use_cache, state.incremental,
+                state.alternatives, state.max_sellers, state.compare_dp
             )
+            if state.marginal_costs and optimal_groups:
+                plan_cost, savings = card_marginal_costs(
+                    state.listings_df, card_names, state.shipping_dict, metrics, optimal_groups,
+                    state.max_sellers
+                )
+            metrics.print_summary()
+            if args.metrics_out:
+                metrics.save(args.metrics_out)
+                print_success(f"Metrics written to {args.metrics_out}")
+
+            if not optimal_groups:
+                # Without a plan there is nothing to print or export
+                if seller_curve:
+                    print("\n" + "\n".join(format_seller_curve(seller_curve)))
+                print_error("Could not find a valid seller combination!")
+                sys.exit(1)
 
             # Output results
             output_file = None
             if args.output:
                 output_file = open(args.output, 'w')
 
-            total_card_cost = 0
             print(f"\n{Colors.BOLD}=== Results ==={Colors.RESET}")
 
-            for seller, cards in optimal_groups.items():
-                for card in cards:
-                    price = filtered_df.loc[filtered_df['seller'] == seller, card].values[0]
-                    link_values = state.listings_df.loc[
-                        (state.listings_df['seller'] == seller) &
-                        (state.listings_df['card_name'].str.lower() == card.lower()),
-                        'link'
-                    ].values
-                    link = link_values[0] if len(link_values) > 0 else None
-
-                    output_string = f"  - {card}: buy from {seller} at {price:.2f}€" + \
-                                   (f" (link: {link})" if link else "")
-                    print(output_string)
-                    if output_file:
-                        output_file.write(output_string + "\n")
-                    total_card_cost += price
-
-            summary = f"\nTotal card cost: {total_card_cost:.2f}€\nTotal with shipping: {min_cost:.2f}€"
-            print(summary)
+            plan = plan_rows(ListingIndex(state.listings_df), optimal_groups, card_prices, state.shipping_dict)
+            plan_text = "\n".join(format_plan(plan, min_cost))
+            print(plan_text)
+            if output_file:
+                output_file.write(plan_text + "\n")
+
+            if alternative_plans:
+                alternatives_text = "\n" + "\n".join(format_alternatives(optimal_groups, min_cost, alternative_plans))
+                print(alternatives_text)
+                if output_file:
+                    output_file.write(alternatives_text + "\n")
+
+            if seller_curve:
+                curve_text = "\n" + "\n".join(format_seller_curve(seller_curve))
+                print(curve_text)
+                if output_file:
+                    output_file.write(curve_text + "\n")
+
+            if state.marginal_costs and savings:
+                marginal_text = "\n" + "\n".join(format_marginal_costs(plan_cost, savings))
+                print(marginal_text)
+                if output_file:
+                    output_file.write(marginal_text + "\n")
+
             if output_file:
-                output_file.write(summary + "\n")
                 output_file.close()
                 print_success(f"Results written to {args.output}")
 
+            if args.plan_out:
+                export_plan(plan, min_cost, args.plan_out)
+                print_success(f"Plan exported to {args.plan_out}")
+
         except Exception as e:
             print_error(f"Error finding cheapest sellers: {str(e)}")
             print_error(traceback.format_exc())
@@ -1,4 +1,3 @@
-from enum import Enum
 import json
 import math
 import time
@@ -11,46 +10,17 @@ import readchar
 import threading
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
-# Constants
-SHIPPING_MAX_VALUE = 1000
-
-# Enum for countries
-class Countries(Enum):
-   NONE = 0
-   AUSTRIA = 1
-   BELGIUM = 2
-   BULGARIA = 3
-   SWITZERLAND = 4
-   CYPRUS = 5
-   CZECH_REPUBLIC = 6
-   GERMANY = 7
-   DENMARK = 8
-   ESTONIA = 9
-   SPAIN = 10
-   FINLAND = 11
-   FRANCE = 12
-   UNITED_KINGDOM = 13
-   GREECE = 14
-   HUNGARY = 15
-   IRELAND = 16
-   ITALY = 17
-   LIECHTENSTEIN = 18
-   LITHUANIA = 19
-   LUXEMBOURG = 20
-   LATVIA = 21
-   MALTA = 22
-   NETHERLANDS = 23
-   NORWAY = 24
-   POLAND = 25
-   PORTUGAL = 26
-   ROMANIA = 27
-   SWEDEN = 28
-   SINGAPORE = 29
-   SLOVENIA = 30
-   SLOVAKIA = 31
-   CROATIA = 35
-   JAPAN = 36
-   ICELAND = 37
+from countries import Countries, SHIPPING_MAX_VALUE
+from page_parser import (
+    ARTICLE_ROW_FIELDS_JS,
+    PageSnapshots,
+    add_listings,
+    is_listings_page,
+    parse_article_rows,
+    parse_country,
+    parse_price,
+    parse_quantity,
+)
 
 
 class CaptchaError(Exception):
@@ -248,13 +218,34 @@ class ShippingApi:
 
 
 class CardApi:
-    def __init__(self, language: str = "English", headless: bool = False):
-        """Initialize the API with Playwright."""
+    def __init__(
+        self,
+        language: str = "English",
+        headless: bool = False,
+        record_dir: str = None,
+        replay_dir: str = None
+    ):
+        """
+        Initialize the API with Playwright.
+
+        With `record_dir`, the HTML of every page visited is saved there, under
+        its URL and the URL requested if it was redirected (see
+        page_parser.PageSnapshots). With `replay_dir`, pages recorded earlier
+        are served to the browser instead of the live site, redirects
+        included; pages never recorded are answered with "not recorded" and
+        other requests blocked.
+        """
         print("Initializing CardMarket API with Playwright...")
         self.base_url = "https://www.cardmarket.com/en/Magic"
         self.listings_data = {}
         self.language = language.lower()
         self.headless = headless
+        self.recorder = PageSnapshots(record_dir) if record_dir else None
+        self.replay_pages = None
+        if replay_dir:
+            snapshots = PageSnapshots(replay_dir)
+            self.replay_pages, self.replay_redirects = snapshots.latest(), snapshots.redirects()
+            print(f"Replaying {len(self.replay_pages)} recorded pages from {replay_dir}")
         self._start_playwright()
 
     def _start_playwright(self):
@@ -272,8 +263,10 @@ class CardApi:
         self._setup_url_modifier()
         
         # Navigate to the base URL
+        self._recorded_url = None
         self.page.goto(self.base_url)
         self._wait_for_captcha()
+        self._record_page(self.base_url)
 
     def _is_captcha_page(self) -> bool:
         """Check if the current page is a Cloudflare challenge/captcha."""
@@ -327,10 +320,47 @@ class CardApi:
         kwargs.setdefault("timeout", 60000)
         self.page.goto(url, **kwargs)
         self._wait_for_captcha()
+        self._record_page(url)
+
+    def _record_page(self, requested_url: str = None):
+        """
+        Save the current page's HTML in record mode.
+
+        After a navigation the page is saved under its URL and the
+        `requested_url` it may have been redirected from. Without one (a page
+        reached by a click or by the user) it is saved unless it is the page
+        recorded last.
+        """
+        if not self.recorder:
+            return
+        url = self.page.url
+        if requested_url is None and url == self._recorded_url:
+            return
+        self.recorder.record(url, self.page.content(), [requested_url] if requested_url else [])
+        self._recorded_url = url
+
+    def _replay_request(self, route):
+        """Serve a page document or redirect from the recording; block everything else."""
+        request = route.request
+        if request.resource_type != "document":
+            route.abort()
+            return
+        target = self.replay_redirects.get(request.url) or self.replay_redirects.get(self._modify_url(request.url))
+        if target is not None:
+            route.fulfill(status=302, headers={"Location": target})
+            return
+        path = self.replay_pages.get(request.url) or self.replay_pages.get(self._modify_url(request.url))
+        if path is None:
+            route.fulfill(status=404, content_type="text/plain", body=f"Page not recorded: {request.url}")
+            return
+        route.fulfill(status=200, content_type="text/html; charset=utf-8", body=PageSnapshots.read(path))
 
     def _setup_url_modifier(self):
         """Set up the route handler to modify URLs based on patterns."""
         def route_handler(route):
+            if self.replay_pages is not None:
+                self._replay_request(route)
+                return
             url = route.request.url
             modified_url = self._modify_url(url)
             
@@ -378,34 +408,17 @@ class CardApi:
 
 
     def parse_price(self, price_text):
-        """Parse price string like '25,00 €' to float."""
-        # Remove currency symbols and whitespace
-        text = price_text.replace('€', '').replace('EUR', '').strip()
-        
-        # Match European format with comma as decimal separator
-        euro_pattern = r'(\d{1,3}(?:\.\d{3})*,\d+)|(\d+,\d+)'
-        euro_match = re.search(euro_pattern, text)
-        
-        if euro_match:
-            num_str = euro_match.group(0)
-            # Convert to standard float format
-            standard_format = num_str.replace('.', '').replace(',', '.')
-            try:
-                return float(standard_format)
-            except ValueError:
-                pass
-                
-        return None
-    
+        """Parse price string like '25,00 €' to float (see page_parser.parse_price)."""
+        return parse_price(price_text)
+
+    def parse_quantity(self, quantity_text):
+        """Parse an available quantity like '4' to int, 1 if it cannot be read."""
+        return parse_quantity(quantity_text)
+
     def parse_country(self, location_text):
         """Extract country from location text like 'Item location: Germany'."""
-        if location_text and ":" in location_text:
-            try:
-                return location_text.split(":")[1].strip()
-            except IndexError:
-                pass
-        return "Unknown"
-    
+        return parse_country(location_text)
+
     def _collect_listings(self):
         """
         Collects all listings that are currently on the page.
@@ -413,7 +426,7 @@ class CardApi:
         current_url = self.page.url
 
         # First we make sure we are on a listings page.
-        if '/Products/Singles/' not in current_url and '/Offers/Singles/' not in current_url:
+        if not is_listings_page(current_url):
             return None
 
         try:
@@ -427,79 +440,14 @@ class CardApi:
                 human_scroll(self.page, "down")
                 human_delay(0.3, 0.8)
 
-            # Find and process all listing rows
-            article_elements = self.page.query_selector_all(article_rows_selector)
-            article_count = len(article_elements)
-            print(f"Found {article_count} listings on current page.")
-            new_listings = []
-            
-            for row_element in article_elements:
-                # Extract card name
-                card_name = None
-                card_name_element = row_element.query_selector("a[href*='/Products/Singles/']")
-                if card_name_element:
-                    card_name = card_name_element.text_content().strip()
-
-                if not card_name:
-                    card_name = self.page.url.split("?")[0].split("/")[-1].replace("-", " ").replace("_", " ")
-                    
-                if '/Products/Singles/' in current_url:
-                    # Extract seller name
-                    seller_element = row_element.query_selector("div.col-sellerProductInfo span.seller-name a[href*='/Users/']")
-                    if not seller_element:
-                        print(f"No seller element found for {card_name}")
-                        continue
-                    seller_name = seller_element.text_content().strip()
-                elif '/Users/' in current_url and '/Offers/Singles/' in current_url:
-                    seller_name = self.page.url.split("/")[-3]
-                
-                # Extract price
-                price_element = row_element.query_selector("div.price-container span")
-                
-                if not price_element:
-                    print(f"No price element found for {card_name}")
-                    continue
-                
-                price_text = price_element.text_content().strip()
-                price = self.parse_price(price_text)
-                
-                # Extract language
-                language = "Unknown"
-                language_element = row_element.query_selector("div.product-attributes span.icon[aria-label]")
-                if language_element:
-                    language = language_element.get_attribute('aria-label') or ""
-                    if not language:
-                        language = language_element.get_attribute('data-original-title') or "Unknown"
-                
-                if language.lower() != self.language:
-                    print(f"Language mismatch for {card_name}: {language} != {self.language}")
-                    continue
+            self._record_page()
 
-                # Extract country
-                country = "Unknown"
-                location_element = row_element.query_selector("span.seller-info span[aria-label^='Item location:'][data-bs-toggle='tooltip']")
-                if location_element:
-                    location_text = location_element.get_attribute('aria-label') or ""
-                    country = self.parse_country(location_text)
-                else:
-                    # Try alternative format
-                    alt_location_element = row_element.query_selector("span.seller-info span[data-bs-original-title^='Item location:'][data-bs-toggle='tooltip']")
-                    if alt_location_element:
-                        location_text = alt_location_element.get_attribute('data-bs-original-title') or ""
-                        country = self.parse_country(location_text)
-                
-                new_listing = {
-                    "price": price,
-                    "country": country,
-                    "link": current_url
-                }
-                
-                if card_name not in self.listings_data:
-                    self.listings_data[card_name] = {}
-                new_listings.append(new_listing)
-                self.listings_data[card_name][seller_name] = new_listing
-            
-            return self.listings_data
+            # Read every listing row in one round trip, then parse in Python
+            article_rows = self.page.eval_on_selector_all(article_rows_selector, ARTICLE_ROW_FIELDS_JS)
+            print(f"Found {len(article_rows)} listings on current page.")
+
+            parsed = parse_article_rows(article_rows, current_url, self.language, log=print)
+            return add_listings(self.listings_data, parsed)
                 
         except Exception as e:
             print(f"Error gathering data: {e}")
@@ -741,7 +689,7 @@ class CardApi:
         """Formats the listings data into a list of dictionaries."""
         listings = []
         for parsed_card_name, sellers in self.listings_data.items():
-            for seller, data in sellers.items():
+            for seller, seller_listings in sellers.items():
                 unparsed_card_name = None
                 for original_card_name in card_names:
                     if self._parse_card_name_dict(original_card_name) == self._parse_card_name_dict(parsed_card_name):
@@ -750,13 +698,15 @@ class CardApi:
 
                 if not unparsed_card_name:
                     print(f"Warning: No unparsed card name found for {parsed_card_name}")
-                listings.append({
-                    "seller": seller,
-                    "card_name": unparsed_card_name,
-                    "price": data["price"],
-                    "country": data["country"],
-                    "link": data["link"]
-                })
+                for data in seller_listings:
+                    listings.append({
+                        "seller": seller,
+                        "card_name": unparsed_card_name,
+                        "price": data["price"],
+                        "country": data["country"],
+                        "quantity": data["quantity"],
+                        "link": data["link"]
+                    })
         return listings
     
     def close(self):
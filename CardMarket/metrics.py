@@ -0,0 +1,59 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class PipelineMetrics:
+    """
+    Wall time, sizes and hot-path counters for the find-cheapest pipeline.
+
+    Stages are timed with `stage()`, which also stores input/output sizes.
+    Counters come from the optimizer:
+    - shipping_evaluations: parcel prices looked up
+    - relaxations: (path, seller) extensions compared
+    - improvements: better partial plans stored (DP cells, new incumbents, local search moves)
+    - nodes: branch-and-bound nodes expanded
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str, **sizes):
+        """Time a stage; the yielded record can be updated with output sizes."""
+        record = self.stages.setdefault(name, {"seconds": 0.0})
+        record.update(sizes)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+
+    def count(self, **counters):
+        """Add to the hot-path counters."""
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": sum(record["seconds"] for record in self.stages.values()),
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+    def print_summary(self):
+        """Print the time and sizes of each stage, then the counters."""
+        total = sum(record["seconds"] for record in self.stages.values())
+        print("\nPipeline metrics:")
+        for name, record in self.stages.items():
+            share = record["seconds"] / total if total > 0 else 0.0
+            sizes = ", ".join(f"{key}={value}" for key, value in record.items() if key != "seconds")
+            print(f"  {name:<26} {record['seconds']:8.3f}s {share:6.1%}  {sizes}")
+        for name, value in self.counters.items():
+            print(f"  {name:<26} {value:>12,}")
+
+    def save(self, path: str):
+        """Write the metrics to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,1557 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import tqdm
+
+from listings import from_cents
+from shipping_table import ShippingTable
+
+
+# Cheapest DP paths per column joined by the marginal cost analysis
+MARGINAL_STATES = 8
+
+
+def build_price_matrix(filtered_df: pd.DataFrame, cards: list[str]) -> np.ndarray:
+    """
+    Build a sellers x cards price matrix in euros from the sellers dataframe
+    (prices in cents), with inf where a card is not offered.
+    """
+    return from_cents(filtered_df[cards].to_numpy(dtype=float, na_value=np.nan), missing=np.inf)
+
+
+def stock_column(card: str) -> str:
+    """Sellers dataframe column with each seller's stock of a card wanted more than once."""
+    return f"{card} (stock)"
+
+
+def build_stock_matrix(filtered_df: pd.DataFrame, cards: list[str]) -> np.ndarray:
+    """
+    Build a sellers x cards int32 matrix of copies each seller can supply.
+
+    Cards without a stock column count one copy per seller offering them.
+    """
+    stock = np.isfinite(build_price_matrix(filtered_df, cards)).astype(np.int32)
+    for j, card in enumerate(cards):
+        if stock_column(card) in filtered_df.columns:
+            stock[:, j] = filtered_df[stock_column(card)].fillna(0).to_numpy(dtype=np.int32)
+    return stock
+
+
+def add_counters(counters: dict, **values):
+    """Add to a hot-path counter dictionary, if the caller passed one."""
+    if counters is None:
+        return
+    for name, value in values.items():
+        counters[name] = counters.get(name, 0) + int(value)
+
+
+def calculate_shipping_price(
+    shipping_table: ShippingTable,
+    previous_loads: dict,
+    current_node_index: int,
+    value_increase: float
+) -> float:
+    """
+    Calculate the shipping price or increase in shipping price for a given seller/node.
+
+    `previous_loads` maps each seller on the previous path to the value it
+    carries. Since shipping price increases with card value at certain rates, we handle:
+    - Current seller already in path, value doesn't reach new threshold
+    - Current seller already in path, value reaches new threshold
+    - Current seller not in path (shipping = new threshold based on value_increase)
+    """
+    in_path = current_node_index in previous_loads
+    current_value = previous_loads.get(current_node_index, 0.0)
+    return shipping_table.delta_for(current_node_index, current_value, value_increase, in_path)
+
+
+def _trace_path(backpointers: np.ndarray, last_seller: int) -> list[int]:
+    """Rebuild a DP path from its backpointers, starting at the seller of the last card."""
+    path = [last_seller]
+    for j in range(len(backpointers) - 1, 0, -1):
+        path.append(int(backpointers[j, path[-1]]))
+    return path[::-1]
+
+
+def dp_python(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    progress: bool = True,
+    counters: dict = None
+) -> tuple[float, list[int]]:
+    """
+    Reference implementation of the seller/card dynamic program, with plain
+    Python loops over (previous seller, next seller) pairs.
+
+    The state per seller is the cost of the best path ending there and a dict
+    of the value each seller on that path carries; backpointers[j, k] is the
+    seller of card j - 1 on the best path assigning card j to seller k.
+    Relaxations and improvements are added to `counters` if given.
+
+    Returns (minimum_cost, path) where path[j] is the seller row used for card j.
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    backpointers = np.zeros((num_cards, num_sellers), dtype=np.int32)
+    relaxations = 0
+    improvements = 0
+
+    # Initialize first column
+    costs = []
+    path_loads = []
+    for i in range(num_sellers):
+        shipping_price = calculate_shipping_price(
+            shipping_table=shipping_table,
+            previous_loads={},
+            current_node_index=i,
+            value_increase=adjacency_matrix[i][0]
+        )
+        costs.append(adjacency_matrix[i][0] + shipping_price)
+        path_loads.append({i: adjacency_matrix[i][0]})
+
+    # Dynamic programming: iterate through cards
+    for j in tqdm.tqdm(range(1, num_cards), desc="Optimizing", disable=not progress):
+        new_costs = [float('inf')] * num_sellers
+        for i in range(num_sellers):
+            previous_node_price = costs[i]
+            previous_loads = path_loads[i]
+            for k in range(num_sellers):
+                if adjacency_matrix[k][j] == float('inf'):
+                    continue
+
+                relaxations += 1
+                price = previous_node_price
+                price += calculate_shipping_price(
+                    shipping_table=shipping_table,
+                    previous_loads=previous_loads,
+                    current_node_index=k,
+                    value_increase=adjacency_matrix[k][j]
+                )
+                price += adjacency_matrix[k][j]
+
+                if price < new_costs[k]:
+                    new_costs[k] = price
+                    backpointers[j, k] = i
+                    improvements += 1
+
+        # Copy the loads of each chosen predecessor once per column
+        new_loads = [{} for _ in range(num_sellers)]
+        for k in range(num_sellers):
+            if new_costs[k] < float('inf'):
+                new_loads[k] = dict(path_loads[backpointers[j, k]])
+                new_loads[k][k] = new_loads[k].get(k, 0.0) + adjacency_matrix[k][j]
+
+        costs = new_costs
+        path_loads = new_loads
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+
+    # Find minimum cost path
+    min_cost = float('inf')
+    min_seller = None
+    for i in range(num_sellers):
+        if costs[i] < min_cost:
+            min_cost = costs[i]
+            min_seller = i
+
+    if min_seller is None:
+        return float('inf'), []
+    return min_cost, _trace_path(backpointers, min_seller)
+
+
+def dp_numpy(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    progress: bool = True,
+    counters: dict = None
+) -> tuple[float, list[int]]:
+    """
+    Vectorized version of the seller/card dynamic program.
+
+    Each DP column is computed for all (previous seller, next seller) pairs at
+    once instead of in a Python double loop. Produces the same costs and paths
+    as the reference loop, including its tie-breaking (first predecessor wins).
+    Like the loop it is a heuristic: only the cheapest path ending at each
+    seller is kept per column, so a plan whose partial path was not the
+    cheapest one is missed.
+
+    Only the per-path state for the current column is kept (sellers x sellers
+    matrices), plus a cards x sellers int32 backpointer array; the path is
+    rebuilt at the end, so memory grows by one row per card. Relaxations
+    (seller pairs compared) and improvements (DP cells filled) are added to
+    `counters` if given.
+
+    Returns (minimum_cost, path) where path[j] is the seller row used for card j.
+    """
+    min_cost, path, _, _ = dp_numpy_resumable(
+        adjacency_matrix, shipping_table, progress=progress, counters=counters
+    )
+    return min_cost, path
+
+
+class DPCheckpoint:
+    """State of the numpy DP after `column`, enough to continue with the next card."""
+
+    def __init__(
+        self,
+        column: int,
+        costs: np.ndarray,
+        in_path: np.ndarray,
+        loads: np.ndarray,
+        shipping: np.ndarray
+    ):
+        self.column = column
+        self.costs = costs
+        self.in_path = in_path
+        self.loads = loads
+        self.shipping = shipping
+
+    def padded(self, num_sellers: int) -> "DPCheckpoint":
+        """Checkpoint with extra sellers appended that no path ends at or uses."""
+        extra = num_sellers - len(self.costs)
+        return DPCheckpoint(
+            self.column,
+            np.concatenate([self.costs, np.full(extra, np.inf)]),
+            np.pad(self.in_path, ((0, extra), (0, extra))),
+            np.pad(self.loads, ((0, extra), (0, extra))),
+            np.pad(self.shipping, ((0, extra), (0, extra)))
+        )
+
+
+def dp_numpy_resumable(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    resume: DPCheckpoint = None,
+    backpointers: np.ndarray = None,
+    checkpoint_step: int = 0,
+    progress: bool = True,
+    counters: dict = None,
+    on_column=None
+) -> tuple[float, list[int], np.ndarray, list[DPCheckpoint]]:
+    """
+    The numpy DP (see dp_numpy), able to continue from a checkpoint.
+
+    With `resume`, columns up to `resume.column` are not recomputed; their
+    rows of `backpointers` (cards x sellers) must already be filled in. With
+    `checkpoint_step` > 0 the state is recorded every `checkpoint_step`
+    columns and after the last one. `on_column(state)` is called with the
+    DPCheckpoint of every computed column; its arrays are the DP's own and
+    must not be modified.
+
+    Returns (minimum_cost, path, backpointers, new checkpoints).
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    if num_sellers == 0 or num_cards == 0:
+        return float('inf'), [], np.zeros((num_cards, num_sellers), dtype=np.int32), []
+
+    diagonal = np.arange(num_sellers)
+    relaxations = 0
+    if resume is None:
+        # First column: every seller starts a new path
+        first_prices = adjacency_matrix[:, 0]
+        first_shipping = shipping_table.delta(np.zeros(num_sellers), first_prices, False)
+        costs = first_prices + first_shipping
+        backpointers = np.zeros((num_cards, num_sellers), dtype=np.int32)
+        improvements = int(np.isfinite(costs).sum())
+        start = 0
+
+        # Per path: which sellers it uses, the value each carries and the shipping paid
+        in_path = np.eye(num_sellers, dtype=bool)
+        loads = np.diag(first_prices)
+        shipping = np.diag(first_shipping)
+    else:
+        costs = resume.costs.copy()
+        in_path = resume.in_path.copy()
+        loads = resume.loads.copy()
+        shipping = resume.shipping.copy()
+        improvements = 0
+        start = resume.column
+
+    checkpoints = []
+
+    def record_checkpoint(column: int):
+        if on_column is not None:
+            on_column(DPCheckpoint(column, costs, in_path, loads, shipping))
+        if checkpoint_step > 0 and (column % checkpoint_step == 0 or column == num_cards - 1):
+            checkpoints.append(DPCheckpoint(column, costs.copy(), in_path.copy(), loads.copy(), shipping.copy()))
+
+    if resume is None:
+        record_checkpoint(0)
+
+    for j in tqdm.tqdm(range(start + 1, num_cards), desc="Optimizing", disable=not progress):
+        card_prices = adjacency_matrix[:, j]
+
+        # candidate[i, k]: extend the best path ending at seller i with seller k
+        new_shipping = shipping_table.parcel_price(loads + card_prices[None, :])
+        candidates = (costs[:, None] + (new_shipping - shipping)) + card_prices[None, :]
+
+        best_previous = np.argmin(candidates, axis=0)
+        best_costs = candidates[best_previous, diagonal]
+        improved = best_costs < np.inf
+        backpointers[j] = best_previous
+        relaxations += num_sellers * int(np.isfinite(card_prices).sum())
+        improvements += int(improved.sum())
+
+        in_path = in_path[best_previous]
+        in_path[diagonal, diagonal] = True
+        in_path[~improved] = False
+        loads = loads[best_previous]
+        loads[diagonal, diagonal] += card_prices
+        loads[~improved] = 0.0
+        shipping = shipping[best_previous]
+        shipping[diagonal, diagonal] = new_shipping[best_previous, diagonal]
+        shipping[~improved] = 0.0
+
+        costs = np.where(improved, best_costs, np.inf)
+        record_checkpoint(j)
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+
+    best = int(np.argmin(costs))
+    if not costs[best] < np.inf:
+        return float('inf'), [], backpointers, checkpoints
+    return float(costs[best]), _trace_path(backpointers, best), backpointers, checkpoints
+
+
+def dp_numpy_kbest(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    count: int,
+    progress: bool = True,
+    counters: dict = None
+) -> list[tuple[float, list[int]]]:
+    """
+    K-best version of the numpy DP, for alternative plans.
+
+    Keeps the `count` cheapest paths ending at each seller instead of one
+    (states are indexed rank * sellers + seller) and returns up to `count`
+    (cost, path) pairs, cheapest first. Every kept state extends a different
+    path, so the returned plans are all distinct.
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    if num_sellers == 0 or num_cards == 0 or count < 1:
+        return []
+
+    num_states = count * num_sellers
+    states = np.arange(num_states)
+    state_sellers = states % num_sellers
+
+    # First column: only the first rank is used, every seller starts a new path
+    first_prices = adjacency_matrix[:, 0]
+    first_shipping = shipping_table.delta(np.zeros(num_sellers), first_prices, False)
+    costs = np.full(num_states, np.inf)
+    costs[:num_sellers] = first_prices + first_shipping
+    in_path = np.zeros((num_states, num_sellers), dtype=bool)
+    in_path[:num_sellers] = np.eye(num_sellers, dtype=bool)
+    loads = np.zeros((num_states, num_sellers))
+    loads[:num_sellers] = np.diag(first_prices)
+    shipping = np.zeros((num_states, num_sellers))
+    shipping[:num_sellers] = np.diag(first_shipping)
+    backpointers = np.zeros((num_cards, num_states), dtype=np.int32)
+    relaxations = 0
+    improvements = int(np.isfinite(costs).sum())
+
+    for j in tqdm.tqdm(range(1, num_cards), desc="Optimizing", disable=not progress):
+        card_prices = adjacency_matrix[:, j]
+
+        # candidate[s, k]: extend the path of state s with seller k
+        new_shipping = shipping_table.parcel_price(loads + card_prices[None, :])
+        candidates = (costs[:, None] + (new_shipping - shipping)) + card_prices[None, :]
+
+        # The `count` cheapest predecessors of every seller, cheapest first
+        best = np.argpartition(candidates, count - 1, axis=0)[:count]
+        best_costs = np.take_along_axis(candidates, best, axis=0)
+        by_cost = np.argsort(best_costs, axis=0, kind="stable")
+        predecessors = np.take_along_axis(best, by_cost, axis=0).ravel()
+        new_costs = np.take_along_axis(best_costs, by_cost, axis=0).ravel()
+        improved = new_costs < np.inf
+        backpointers[j] = predecessors
+        relaxations += num_states * int(np.isfinite(card_prices).sum())
+        improvements += int(improved.sum())
+
+        in_path = in_path[predecessors]
+        in_path[states, state_sellers] = True
+        in_path[~improved] = False
+        loads = loads[predecessors]
+        loads[states, state_sellers] += card_prices[state_sellers]
+        loads[~improved] = 0.0
+        shipping = shipping[predecessors]
+        shipping[states, state_sellers] = new_shipping[predecessors, state_sellers]
+        shipping[~improved] = 0.0
+
+        costs = np.where(improved, new_costs, np.inf)
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+
+    plans = []
+    for state in np.argsort(costs, kind="stable")[:count]:
+        if not costs[state] < np.inf:
+            break
+        path = [int(state)]
+        for j in range(num_cards - 1, 0, -1):
+            path.append(int(backpointers[j, path[-1]]))
+        plans.append((float(costs[state]), [s % num_sellers for s in path[::-1]]))
+    return plans
+
+
+def dp_numpy_max_sellers(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    max_sellers: int,
+    progress: bool = True,
+    counters: dict = None
+) -> list[tuple[float, list[int]]]:
+    """
+    Numpy DP with a limit on the number of sellers (parcels) in a plan.
+
+    Paths are layered by how many sellers they use: states are indexed
+    layer * sellers + seller, where a path in layer l uses l + 1 sellers.
+    Buying from a seller already in the path stays in the layer, a new seller
+    moves the path one layer up, and paths that would need more than
+    `max_sellers` sellers are never created.
+
+    Returns one (cost, path) pair per limit 1..max_sellers, the cheapest plan
+    found with at most that many sellers ((inf, []) if there is none), so the
+    cost-vs-seller-count curve comes from a single run.
+
+    Keeping a path per (layer, seller) instead of per seller means more
+    partial plans survive than in dp_numpy, so with a loose limit the plan
+    found is often cheaper than dp_numpy's; the two costs are not a
+    like-for-like comparison.
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    if num_sellers == 0 or num_cards == 0 or max_sellers < 1:
+        return []
+
+    # A plan never uses more sellers than it has cards
+    num_layers = min(max_sellers, num_sellers, num_cards)
+    num_states = num_layers * num_sellers
+    states = np.arange(num_states)
+    state_sellers = states % num_sellers
+    state_layers = states // num_sellers
+
+    # First column: every seller starts a one-seller path
+    first_prices = adjacency_matrix[:, 0]
+    first_shipping = shipping_table.delta(np.zeros(num_sellers), first_prices, False)
+    costs = np.full(num_states, np.inf)
+    costs[:num_sellers] = first_prices + first_shipping
+    in_path = np.zeros((num_states, num_sellers), dtype=bool)
+    in_path[:num_sellers] = np.eye(num_sellers, dtype=bool)
+    loads = np.zeros((num_states, num_sellers))
+    loads[:num_sellers] = np.diag(first_prices)
+    shipping = np.zeros((num_states, num_sellers))
+    shipping[:num_sellers] = np.diag(first_shipping)
+    backpointers = np.zeros((num_cards, num_states), dtype=np.int32)
+    relaxations = 0
+    improvements = int(np.isfinite(costs).sum())
+
+    for j in tqdm.tqdm(range(1, num_cards), desc="Optimizing", disable=not progress):
+        card_prices = adjacency_matrix[:, j]
+
+        # Only reached states can be extended, and only with sellers offering the card
+        live = np.flatnonzero(costs < np.inf)
+        offered = np.flatnonzero(np.isfinite(card_prices))
+        offered_prices = card_prices[offered]
+        live_loads = loads[np.ix_(live, offered)]
+
+        # candidate[s, k]: extend the path of live state s with offering seller k
+        new_shipping = shipping_table.parcel_price(live_loads + offered_prices[None, :], offered)
+        candidates = costs[live, None] + (new_shipping - shipping[np.ix_(live, offered)]) + offered_prices
+        # A seller already in the path keeps the layer, a new seller moves one up
+        live_layers = state_layers[live]
+        target_layers = live_layers[:, None] + ~in_path[np.ix_(live, offered)]
+        relaxations += candidates.size
+
+        predecessors = np.zeros(num_states, dtype=np.int32)
+        new_costs = np.full(num_states, np.inf)
+        added_shipping = np.zeros(num_states)
+        columns = np.arange(len(offered))
+        for layer in range(num_layers):
+            rows = np.flatnonzero((live_layers == layer) | (live_layers == layer - 1))
+            if len(rows) == 0 or len(offered) == 0:
+                continue
+            block = np.where(target_layers[rows] == layer, candidates[rows], np.inf)
+            best = np.argmin(block, axis=0)
+            layer_states = layer * num_sellers + offered
+            predecessors[layer_states] = live[rows[best]]
+            new_costs[layer_states] = block[best, columns]
+            added_shipping[layer_states] = new_shipping[rows[best], columns]
+        improved = new_costs < np.inf
+        backpointers[j] = predecessors
+        improvements += int(improved.sum())
+
+        in_path = in_path[predecessors]
+        in_path[states, state_sellers] = True
+        in_path[~improved] = False
+        loads = loads[predecessors]
+        loads[improved, state_sellers[improved]] += card_prices[state_sellers[improved]]
+        loads[~improved] = 0.0
+        shipping = shipping[predecessors]
+        shipping[states, state_sellers] = added_shipping
+        shipping[~improved] = 0.0
+
+        costs = np.where(improved, new_costs, np.inf)
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+
+    plans = []
+    best_state = None
+    for limit in range(max_sellers):
+        if limit < num_layers:
+            layer_costs = costs[limit * num_sellers:(limit + 1) * num_sellers]
+            state = limit * num_sellers + int(np.argmin(layer_costs))
+            if costs[state] < np.inf and (best_state is None or costs[state] < costs[best_state]):
+                best_state = state
+        if best_state is None:
+            plans.append((float('inf'), []))
+            continue
+        path = [best_state]
+        for j in range(num_cards - 1, 0, -1):
+            path.append(int(backpointers[j, path[-1]]))
+        plans.append((float(costs[best_state]), [s % num_sellers for s in path[::-1]]))
+    return plans
+
+
+def dp_numpy_quantities(
+    adjacency_matrix: np.ndarray,
+    stock: np.ndarray,
+    quantities: np.ndarray,
+    shipping_table: ShippingTable,
+    progress: bool = True,
+    counters: dict = None
+) -> tuple[float, list[int]]:
+    """
+    Numpy DP for card quantities with per-seller stock limits.
+
+    Card j is bought `quantities[j]` times, in as many consecutive DP steps
+    over the same price column, so the price and `stock` matrices (sellers x
+    cards) stay one column per card. Per path, the copies of the current card
+    taken from each seller are counted, and a seller is not extended once it
+    reaches its stock.
+
+    Returns (minimum_cost, path) where path has one seller row per copy, in
+    card order.
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    steps = np.repeat(np.arange(num_cards), quantities)
+    if num_sellers == 0 or len(steps) == 0:
+        return float('inf'), []
+
+    diagonal = np.arange(num_sellers)
+    backpointers = np.zeros((len(steps), num_sellers), dtype=np.int32)
+
+    # First copy: every seller with stock starts a new path
+    first_prices = np.where(stock[:, steps[0]] > 0, adjacency_matrix[:, steps[0]], np.inf)
+    first_shipping = shipping_table.delta(np.zeros(num_sellers), first_prices, False)
+    costs = first_prices + first_shipping
+    in_path = np.eye(num_sellers, dtype=bool)
+    loads = np.diag(np.where(np.isfinite(first_prices), first_prices, 0.0))
+    shipping = np.diag(np.where(np.isfinite(first_prices), first_shipping, 0.0))
+    # Copies of the current card each path takes from each seller
+    taken = np.eye(num_sellers, dtype=np.int32)
+    relaxations = 0
+    improvements = int(np.isfinite(costs).sum())
+
+    for t in tqdm.tqdm(range(1, len(steps)), desc="Optimizing", disable=not progress):
+        j = steps[t]
+        if j != steps[t - 1]:
+            taken[:] = 0
+        card_prices = adjacency_matrix[:, j]
+
+        # candidate[i, k]: extend the best path ending at seller i with seller k
+        new_shipping = shipping_table.parcel_price(loads + card_prices[None, :])
+        candidates = (costs[:, None] + (new_shipping - shipping)) + card_prices[None, :]
+        candidates[taken >= stock[None, :, j]] = np.inf
+
+        best_previous = np.argmin(candidates, axis=0)
+        best_costs = candidates[best_previous, diagonal]
+        improved = best_costs < np.inf
+        backpointers[t] = best_previous
+        relaxations += num_sellers * int((stock[:, j] > 0).sum())
+        improvements += int(improved.sum())
+
+        in_path = in_path[best_previous]
+        in_path[diagonal, diagonal] = True
+        in_path[~improved] = False
+        loads = loads[best_previous]
+        loads[diagonal, diagonal] += card_prices
+        loads[~improved] = 0.0
+        shipping = shipping[best_previous]
+        shipping[diagonal, diagonal] = new_shipping[best_previous, diagonal]
+        shipping[~improved] = 0.0
+        taken = taken[best_previous]
+        taken[diagonal, diagonal] += 1
+        taken[~improved] = 0
+
+        costs = np.where(improved, best_costs, np.inf)
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+
+    best = int(np.argmin(costs))
+    if not costs[best] < np.inf:
+        return float('inf'), []
+    return float(costs[best]), _trace_path(backpointers, best)
+
+
+def _cheapest_states(state: DPCheckpoint, count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(card cost, sellers used, loads) of the `count` cheapest paths of a DP column."""
+    kept = np.argsort(state.costs, kind="stable")[:count]
+    kept = kept[np.isfinite(state.costs[kept])]
+    card_costs = state.costs[kept] - state.shipping[kept].sum(axis=1)
+    return card_costs, state.in_path[kept], state.loads[kept]
+
+
+def _join_states(shipping_table: ShippingTable, first: tuple, second: tuple, max_sellers: int = None) -> float:
+    """
+    Cheapest plan made of a path from `first` and one from `second`, shipping
+    recomputed, using at most `max_sellers` sellers if given.
+    """
+    first_costs, first_used, first_loads = first
+    second_costs, second_used, second_loads = second
+    if len(first_costs) == 0 or len(second_costs) == 0:
+        return float('inf')
+    used = first_used[:, None, :] | second_used[None, :, :]
+    loads = first_loads[:, None, :] + second_loads[None, :, :]
+    shipping = np.where(used, shipping_table.parcel_price(loads), 0.0).sum(axis=-1)
+    if max_sellers is not None:
+        shipping[used.sum(axis=-1) > max_sellers] = np.inf
+    return float((first_costs[:, None] + second_costs[None, :] + shipping).min())
+
+
+def marginal_costs(
+    adjacency_matrix: np.ndarray,
+    shipping_table: ShippingTable,
+    num_states: int = MARGINAL_STATES,
+    progress: bool = True,
+    counters: dict = None,
+    assignment: np.ndarray = None,
+    max_sellers: int = None
+) -> tuple[float, list[int], np.ndarray]:
+    """
+    Cost of a plan without each card, from one forward and one backward DP pass.
+
+    The backward pass runs the numpy DP over the cards in reverse order and
+    keeps the `num_states` cheapest paths over cards j+1.. for every j. The
+    forward pass then joins its cheapest paths over cards ..j-1 with them,
+    recomputing the shipping of the merged parcels, which gives a plan that
+    skips card j. Dropping card j from the forward plan is also considered,
+    so no card is reported as saving less than that.
+
+    With `assignment` (card -> seller, e.g. another engine's plan) that plan
+    is the reference instead of the forward plan: dropping card j from it is
+    considered, and its cost and path are returned. With `max_sellers`,
+    joined plans using more sellers are not considered.
+
+    Returns (plan cost, plan path, cost without each card).
+    """
+    num_sellers, num_cards = adjacency_matrix.shape
+    if num_sellers == 0 or num_cards == 0:
+        return float('inf'), [], np.full(num_cards, np.inf)
+
+    empty = (np.zeros(1), np.zeros((1, num_sellers), dtype=bool), np.zeros((1, num_sellers)))
+    # after[j]: cheapest paths over cards j..num_cards-1
+    after = [None] * num_cards + [empty]
+
+    def keep_backward(state: DPCheckpoint):
+        after[num_cards - 1 - state.column] = _cheapest_states(state, num_states)
+
+    dp_numpy_resumable(
+        adjacency_matrix[:, ::-1], shipping_table, progress=progress, counters=counters, on_column=keep_backward
+    )
+
+    without = np.full(num_cards, np.inf)
+    without[0] = _join_states(shipping_table, empty, after[1], max_sellers)
+
+    def join_forward(state: DPCheckpoint):
+        if state.column + 1 < num_cards:
+            before = _cheapest_states(state, num_states)
+            without[state.column + 1] = _join_states(shipping_table, before, after[state.column + 2], max_sellers)
+
+    cost, path, _, _ = dp_numpy_resumable(
+        adjacency_matrix, shipping_table, progress=progress, counters=counters, on_column=join_forward
+    )
+
+    if assignment is not None:
+        assignment = np.asarray(assignment)
+        cost, path = plan_cost(adjacency_matrix, shipping_table, assignment), assignment.tolist()
+    if path and num_cards > 1:
+        assignment = np.array(path)
+        for j in range(num_cards):
+            kept = np.arange(num_cards) != j
+            without[j] = min(without[j], plan_cost(adjacency_matrix[:, kept], shipping_table, assignment[kept]))
+    return cost, path, without
+
+
+class SolverResult:
+    """Outcome of a search-based optimizer run."""
+
+    def __init__(
+        self,
+        assignment: np.ndarray,
+        cost: float,
+        lower_bound: float,
+        optimal: bool,
+        nodes: int = 0,
+        counters: dict = None
+    ):
+        self.assignment = assignment
+        self.cost = cost
+        self.lower_bound = lower_bound
+        self.optimal = optimal
+        self.nodes = nodes
+        self.counters = counters if counters is not None else {}
+
+    @property
+    def gap(self) -> float:
+        """Relative gap between the plan cost and the proven lower bound."""
+        if self.optimal:
+            return 0.0
+        if not np.isfinite(self.cost) or self.cost <= 0:
+            return float('inf')
+        return max(self.cost - self.lower_bound, 0.0) / self.cost
+
+
+def plan_cost(prices: np.ndarray, shipping_table: ShippingTable, assignment: np.ndarray) -> float:
+    """Total cost (cards plus one parcel per used seller) of a card -> seller assignment."""
+    num_sellers, num_cards = prices.shape
+    if num_cards == 0 or np.any(assignment < 0):
+        return float('inf')
+    card_prices = prices[assignment, np.arange(num_cards)]
+    loads = np.bincount(assignment, weights=card_prices, minlength=num_sellers)
+    used = np.bincount(assignment, minlength=num_sellers) > 0
+    return float(card_prices.sum() + shipping_table.plan_shipping(loads, used).sum())
+
+
+def scarcity_order(prices: np.ndarray) -> np.ndarray:
+    """Card order with the fewest offering sellers first, then the most expensive."""
+    offered = np.isfinite(prices)
+    seller_counts = offered.sum(axis=0)
+    cheapest = np.where(offered, prices, np.inf).min(axis=0, initial=np.inf)
+    return np.lexsort((-cheapest, seller_counts))
+
+
+def greedy_assignment(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    order: np.ndarray = None
+) -> np.ndarray:
+    """
+    Assign cards one at a time to the seller with the lowest marginal cost
+    (card price plus shipping increase given what is already in the plan).
+
+    Cards no seller offers are left at -1.
+    """
+    num_sellers, num_cards = prices.shape
+    if order is None:
+        order = scarcity_order(prices)
+
+    loads = np.zeros(num_sellers)
+    used = np.zeros(num_sellers, dtype=bool)
+    assignment = np.full(num_cards, -1)
+    for j in order:
+        marginal = prices[:, j] + shipping_table.delta(loads, prices[:, j], used)
+        k = int(np.argmin(marginal))
+        if not np.isfinite(marginal[k]):
+            continue
+        assignment[j] = k
+        loads[k] += prices[k, j]
+        used[k] = True
+    return assignment
+
+
+def coverage_bitmasks(offered: np.ndarray) -> np.ndarray:
+    """
+    Encode each seller's card coverage as a bitmask.
+
+    Returns a (sellers, words) uint64 array; bit j of a row is set when the
+    seller offers card j.
+    """
+    num_sellers, num_cards = offered.shape
+    num_words = max(1, -(-num_cards // 64))
+    packed = np.zeros((num_sellers, num_words * 8), dtype=np.uint8)
+    packed[:, :-(-num_cards // 8)] = np.packbits(offered, axis=1, bitorder='little')
+    return packed.view(np.uint64)
+
+
+def superset_dominated(prices: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Mark sellers dominated by another seller in the same group.
+
+    A seller is dominated when another seller offers every card it offers
+    (a coverage superset) at a lower or equal price. Among identical sellers
+    the first one is kept. Coverage is compared on bitmasks first, so prices
+    are only compared against sellers whose coverage is a superset.
+    """
+    offered = np.isfinite(prices)
+    masks = coverage_bitmasks(offered)
+    dominated = np.zeros(prices.shape[0], dtype=bool)
+
+    for group in np.unique(groups):
+        members = np.flatnonzero(groups == group)
+        if len(members) < 2:
+            continue
+        member_masks = masks[members]
+        for position, seller in enumerate(members):
+            mask = member_masks[position]
+            superset = np.all((member_masks & mask) == mask, axis=1)
+            superset[position] = False
+            if not superset.any():
+                continue
+            candidates = members[superset]
+            cards = offered[seller]
+            candidate_prices = prices[candidates][:, cards]
+            seller_prices = prices[seller, cards]
+            no_worse = np.all(candidate_prices <= seller_prices, axis=1)
+            better = (np.any(candidate_prices < seller_prices, axis=1)
+                      | np.any(member_masks[superset] != mask, axis=1))
+            dominated[seller] = np.any(no_worse & (better | (candidates < seller)))
+    return dominated
+
+
+def dominated_sellers(prices: np.ndarray, shipping_table: ShippingTable) -> np.ndarray:
+    """
+    Mark sellers that can be dropped without making the best plan worse.
+
+    A seller is dominated by another seller from the same country that offers
+    every card it offers at a lower or equal price (identical sellers keep the
+    first one). Moving all of its cards to the dominating seller never costs
+    more, provided the country's shipping is subadditive, so only those
+    countries are pruned.
+    """
+    subadditive = shipping_table.is_subadditive()
+    groups = np.where(subadditive[shipping_table.country_index], shipping_table.country_index, -1)
+    # Sellers from other countries each get a group of their own
+    unpruned = np.flatnonzero(groups < 0)
+    groups[unpruned] = len(subadditive) + np.arange(len(unpruned))
+    return superset_dominated(prices, groups)
+
+
+def branch_and_bound(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    time_limit: float = None,
+    initial_assignment: np.ndarray = None,
+    on_improvement=None,
+    counters: dict = None,
+    max_sellers: int = None
+) -> SolverResult:
+    """
+    Exact seller selection by depth-first branch-and-bound.
+
+    Cards are branched on in scarcity order, trying sellers cheapest-first.
+    The incumbent starts from a greedy plan (or `initial_assignment` if it is
+    cheaper). Nodes are pruned with a lower bound made of the cost so far, the
+    cheapest price of every remaining card, and the cheapest way to buy the
+    most expensive remaining card that no seller already in the plan offers.
+    Dominated sellers are removed up front.
+
+    The bounds assume shipping never gets cheaper as a parcel's value grows,
+    which holds for CardMarket's tiers. If `time_limit` (seconds) runs out, the
+    best plan so far is returned together with the lowest bound of the
+    unexplored nodes, so the optimality gap is known.
+
+    `on_improvement(cost, assignment)` is called for every new best plan found
+    by the search. Children evaluated and incumbent updates are added to
+    `counters` as relaxations and improvements.
+
+    With `max_sellers` only plans with at most that many sellers are searched:
+    once the limit is reached, cards can only go to sellers already in the
+    plan. Warm starts over the limit are discarded, and an infinite cost with
+    `optimal` set proves that no plan fits the limit.
+    """
+    deadline = time.monotonic() + time_limit if time_limit else None
+    num_sellers, num_cards = prices.shape
+    offered = np.isfinite(prices)
+    if num_sellers == 0 or num_cards == 0 or not offered.any(axis=0).all():
+        return SolverResult(np.zeros(0, dtype=int), float('inf'), float('inf'), True)
+
+    # Work on the non-dominated sellers only
+    kept = np.flatnonzero(~dominated_sellers(prices, shipping_table))
+    sub_prices = prices[kept]
+    table = shipping_table.subset(kept)
+    order = scarcity_order(sub_prices)
+
+    def within_limit(plan: np.ndarray) -> bool:
+        return max_sellers is None or len(np.unique(plan)) <= max_sellers
+
+    # Warm start (assignments are kept in the original seller indices)
+    best_assignment = kept[greedy_assignment(sub_prices, table, order)]
+    best_cost = plan_cost(prices, shipping_table, best_assignment)
+    if not within_limit(best_assignment):
+        best_cost = float('inf')
+    if initial_assignment is not None and within_limit(np.asarray(initial_assignment)):
+        initial_cost = plan_cost(prices, shipping_table, np.asarray(initial_assignment))
+        if initial_cost < best_cost:
+            best_assignment, best_cost = np.asarray(initial_assignment), initial_cost
+
+    # Per depth: candidate (price, seller) lists and the cheapest price
+    ordered_prices = sub_prices[:, order]
+    offered = np.isfinite(ordered_prices)
+    candidates = []
+    for depth in range(num_cards):
+        sellers = np.flatnonzero(offered[:, depth])
+        candidates.append(sorted(zip(ordered_prices[sellers, depth].tolist(), sellers.tolist())))
+    cheapest = np.where(offered, ordered_prices, np.inf).min(axis=0)
+    remaining_bound = np.concatenate([np.cumsum(cheapest[::-1])[::-1], [0.0]]).tolist()
+
+    # Lower bound per remaining card if bought from a seller not yet in the plan:
+    # its price plus the seller's cheapest parcel shared over every remaining
+    # card that seller offers. closed_bound[d][e] is that bound for the card at
+    # depth e once the cards before depth d have been placed. It is computed at
+    # a few checkpoint depths only; counting offers from an earlier depth gives
+    # smaller shares, so the bound stays valid.
+    first_tier = np.array([table.price_for(k, 0.0) for k in range(len(kept))])
+    remaining_offers = np.cumsum(offered[:, ::-1], axis=1)[:, ::-1]
+    checkpoint_step = max(1, num_cards // 16)
+    closed_bound = []
+    for depth in range(num_cards):
+        if depth % checkpoint_step == 0:
+            share = first_tier[:, None] / np.maximum(remaining_offers[:, depth:depth + 1], 1)
+            checkpoint_bound = np.min(ordered_prices + share, axis=0).tolist()
+        closed_bound.append(checkpoint_bound)
+
+    # Depths of the cards each seller offers, to track the cheapest open seller per card
+    seller_depths = [[] for _ in range(len(kept))]
+    for depth, card_candidates in enumerate(candidates):
+        for p, k in card_candidates:
+            seller_depths[k].append((depth, p))
+
+    epsilon = 1e-9
+    loads = [0.0] * len(kept)
+    used = [False] * len(kept)
+    used_count = 0
+    open_best = [float('inf')] * num_cards
+    assignment = [0] * num_cards
+    nodes = 0
+    relaxations = 0
+    improvements = 0
+    timed_out = False
+
+    def children(depth: int, cost: float) -> list:
+        nonlocal relaxations
+        relaxations += len(candidates[depth])
+        full = max_sellers is not None and used_count >= max_sellers
+        result = []
+        for p, k in candidates[depth]:
+            if full and not used[k]:
+                continue
+            result.append((cost + p + table.delta_for(k, loads[k], p, used[k]), k, p))
+        result.sort()
+        return result
+
+    def node_bound(depth: int, cost: float) -> float:
+        bound = closed_bound[depth]
+        return cost + sum(min(bound[d], open_best[d]) for d in range(depth, num_cards))
+
+    # Stack frames: [depth, children, next child, applied move to undo, node bound]
+    stack = [[0, children(0, 0.0), 0, None, node_bound(0, 0.0)]]
+    while stack:
+        frame = stack[-1]
+        depth, kids, index, applied, _ = frame
+        if applied is not None:
+            k, previous_load, replaced = applied
+            loads[k] = previous_load
+            if replaced is not None:
+                used[k] = False
+                used_count -= 1
+                for d, previous_best in replaced:
+                    open_best[d] = previous_best
+            frame[3] = None
+
+        if deadline is not None and nodes % 256 == 0 and time.monotonic() > deadline:
+            timed_out = True
+            break
+
+        if index >= len(kids):
+            stack.pop()
+            continue
+        child_cost, k, p = kids[index]
+        frame[2] = index + 1
+        if child_cost + remaining_bound[depth + 1] >= best_cost - epsilon:
+            # Children are sorted by cost, so the rest are pruned too
+            stack.pop()
+            continue
+
+        nodes += 1
+        replaced = None
+        if not used[k]:
+            used[k] = True
+            used_count += 1
+            replaced = []
+            for d, offer_price in seller_depths[k]:
+                if d > depth and offer_price < open_best[d]:
+                    replaced.append((d, open_best[d]))
+                    open_best[d] = offer_price
+        frame[3] = (k, loads[k], replaced)
+        loads[k] += p
+        assignment[depth] = k
+
+        if depth + 1 == num_cards:
+            best_cost = child_cost
+            best_assignment = np.zeros(num_cards, dtype=int)
+            best_assignment[order] = kept[assignment]
+            improvements += 1
+            if on_improvement is not None:
+                on_improvement(best_cost, best_assignment)
+            continue
+
+        bound = node_bound(depth + 1, child_cost)
+        if bound >= best_cost - epsilon:
+            continue
+        stack.append([depth + 1, children(depth + 1, child_cost), 0, None, bound])
+
+    lower_bound = best_cost
+    if timed_out:
+        for depth, kids, index, _, bound in stack:
+            if index < len(kids):
+                pending = max(bound, kids[index][0] + remaining_bound[depth + 1])
+                lower_bound = min(lower_bound, pending)
+
+    add_counters(counters, nodes=nodes, relaxations=relaxations, improvements=improvements)
+    return SolverResult(best_assignment, best_cost, lower_bound, not timed_out, nodes)
+
+
+def improve_assignment(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    assignment: np.ndarray,
+    deadline: float = None,
+    on_improvement=None,
+    counters: dict = None
+) -> np.ndarray:
+    """
+    Local search: repeatedly relocate single cards to the seller where they
+    are cheapest given the rest of the plan, until no move saves money.
+
+    Stops early at `deadline` (a time.monotonic() value). `on_improvement(cost,
+    assignment)` is called after every pass that improved the plan. Moves
+    considered and made are added to `counters` as relaxations and improvements.
+    """
+    num_sellers, num_cards = prices.shape
+    assignment = np.array(assignment)
+    if num_cards == 0 or np.any(assignment < 0):
+        return assignment
+
+    cards = np.arange(num_cards)
+    loads = np.bincount(assignment, weights=prices[assignment, cards], minlength=num_sellers)
+    counts = np.bincount(assignment, minlength=num_sellers)
+    epsilon = 1e-9
+
+    # Per card: the sellers offering it, and its cost from each of them as a
+    # new parcel (which does not change while the seller is not in the plan)
+    offer_cards, offer_sellers = np.nonzero(np.isfinite(prices.T))
+    offer_prices = prices[offer_sellers, offer_cards]
+    offer_costs = offer_prices + shipping_table.parcel_price(offer_prices, offer_sellers)
+    bounds = np.searchsorted(offer_cards, np.arange(num_cards + 1))
+    offering = [offer_sellers[bounds[j]:bounds[j + 1]] for j in cards]
+    new_parcel_costs = [offer_costs[bounds[j]:bounds[j + 1]] for j in cards]
+
+    relaxations = 0
+    improvements = 0
+    improved = True
+    while improved:
+        improved = False
+        for j in cards:
+            if deadline is not None and time.monotonic() > deadline:
+                add_counters(counters, relaxations=relaxations, improvements=improvements)
+                return assignment
+            current = assignment[j]
+            price = prices[current, j]
+            # Saving from taking the card away from its current seller
+            if counts[current] == 1:
+                saving = price + shipping_table.price_for(current, loads[current])
+            else:
+                saving = price + (shipping_table.price_for(current, loads[current])
+                                  - shipping_table.price_for(current, loads[current] - price))
+            # Cost of adding it to every other seller offering it
+            sellers = offering[j]
+            adding = new_parcel_costs[j].copy()
+            in_plan = counts[sellers] > 0
+            open_sellers = sellers[in_plan]
+            adding[in_plan] = prices[open_sellers, j] + shipping_table.delta(
+                loads[open_sellers], prices[open_sellers, j], True, open_sellers
+            )
+            adding[sellers == current] = np.inf
+            best = int(np.argmin(adding))
+            k = int(sellers[best])
+            relaxations += len(sellers)
+            if adding[best] < saving - epsilon:
+                assignment[j] = k
+                loads[current] -= price
+                counts[current] -= 1
+                loads[k] += prices[k, j]
+                counts[k] += 1
+                improvements += 1
+                improved = True
+        if improved and on_improvement is not None:
+            on_improvement(plan_cost(prices, shipping_table, assignment), assignment)
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+    return assignment
+
+
+def anytime_search(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    time_limit: float = None,
+    on_improvement=None,
+    counters: dict = None
+) -> SolverResult:
+    """
+    Optimize with bounded latency.
+
+    Emits a greedy plan immediately, improves it by local search, then keeps
+    searching with branch-and-bound until `time_limit` seconds have passed.
+    Every new best plan is passed to `on_improvement(cost, assignment)`; the
+    best plan found by the deadline is returned.
+    """
+    deadline = time.monotonic() + time_limit if time_limit else None
+    num_sellers, num_cards = prices.shape
+    if num_sellers == 0 or num_cards == 0 or not np.isfinite(prices).any(axis=0).all():
+        return SolverResult(np.zeros(0, dtype=int), float('inf'), float('inf'), True)
+
+    best = {"cost": float('inf')}
+
+    def report(cost: float, assignment: np.ndarray):
+        if cost < best["cost"]:
+            best["cost"] = cost
+            if on_improvement is not None:
+                on_improvement(cost, assignment)
+
+    assignment = greedy_assignment(prices, shipping_table)
+    report(plan_cost(prices, shipping_table, assignment), assignment)
+    assignment = improve_assignment(prices, shipping_table, assignment, deadline, report, counters)
+    cost = plan_cost(prices, shipping_table, assignment)
+
+    remaining = deadline - time.monotonic() if deadline is not None else None
+    if remaining is not None and remaining <= 0:
+        cheapest_prices = np.where(np.isfinite(prices), prices, np.inf).min(axis=0).sum()
+        return SolverResult(assignment, cost, float(cheapest_prices), False)
+
+    return branch_and_bound(
+        prices,
+        shipping_table,
+        time_limit=remaining,
+        initial_assignment=assignment,
+        on_improvement=report,
+        counters=counters
+    )
+
+
+def greedy_set_cover(prices: np.ndarray, shipping_table: ShippingTable) -> np.ndarray:
+    """
+    Shipping-aware greedy set cover.
+
+    Repeatedly opens the seller with the lowest cost per newly covered card,
+    counting the parcel for those cards: (value + shipping(value)) / cards,
+    where value is the price of the still uncovered cards the seller offers.
+    Those cards are assigned to it. Cards no seller offers are left at -1.
+    """
+    num_sellers, num_cards = prices.shape
+    offered = np.isfinite(prices)
+    finite_prices = np.where(offered, prices, 0.0)
+    uncovered = offered.any(axis=0)
+    uncovered_value = finite_prices.sum(axis=1)
+    uncovered_count = offered.sum(axis=1).astype(float)
+    assignment = np.full(num_cards, -1)
+
+    while uncovered.any():
+        value = np.maximum(uncovered_value, 0.0)
+        ratio = np.full(num_sellers, np.inf)
+        np.divide(value + shipping_table.parcel_price(value), uncovered_count,
+                  out=ratio, where=uncovered_count > 0.5)
+        seller = int(np.argmin(ratio))
+        cards = np.flatnonzero(offered[seller] & uncovered)
+        assignment[cards] = seller
+        uncovered[cards] = False
+        uncovered_value -= finite_prices[:, cards].sum(axis=1)
+        uncovered_count -= offered[:, cards].sum(axis=1)
+    return assignment
+
+
+def close_sellers(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    assignment: np.ndarray,
+    deadline: float = None,
+    counters: dict = None
+) -> np.ndarray:
+    """
+    Local search: close a seller and move each of its cards to the cheapest
+    other seller already in the plan, whenever that saves money.
+
+    Sellers are tried from the smallest parcel up, repeating until no seller
+    can be closed or `deadline` (a time.monotonic() value) passes.
+    """
+    num_sellers, num_cards = prices.shape
+    assignment = np.array(assignment)
+    if num_cards == 0 or np.any(assignment < 0):
+        return assignment
+
+    cards = np.arange(num_cards)
+    loads = np.bincount(assignment, weights=prices[assignment, cards], minlength=num_sellers)
+    epsilon = 1e-9
+    relaxations = 0
+    improvements = 0
+
+    is_open = np.bincount(assignment, minlength=num_sellers) > 0
+    improved = True
+    while improved:
+        improved = False
+        open_sellers = np.flatnonzero(is_open)
+        for seller in open_sellers[np.argsort(loads[open_sellers], kind="stable")]:
+            if deadline is not None and time.monotonic() > deadline:
+                improved = False
+                break
+            is_open[seller] = False
+            others = np.flatnonzero(is_open)
+            seller_cards = np.flatnonzero(assignment == seller)
+            if len(others) == 0:
+                is_open[seller] = True
+                continue
+
+            # Move the cards one by one, most expensive first, tracking the other parcels
+            saving = loads[seller] + shipping_table.price_for(seller, loads[seller])
+            moved_loads = loads[others].copy()
+            targets = []
+            for j in seller_cards[np.argsort(-prices[seller, seller_cards], kind="stable")]:
+                adding = prices[others, j] + shipping_table.delta(
+                    moved_loads, prices[others, j], True, others
+                )
+                relaxations += len(others)
+                target = int(np.argmin(adding))
+                saving -= adding[target]
+                if not saving > epsilon:
+                    break
+                moved_loads[target] += prices[others[target], j]
+                targets.append((j, others[target]))
+
+            if saving > epsilon and len(targets) == len(seller_cards):
+                for j, target in targets:
+                    assignment[j] = target
+                    loads[target] += prices[target, j]
+                loads[seller] = 0.0
+                improvements += 1
+                improved = True
+            else:
+                is_open[seller] = True
+
+    add_counters(counters, relaxations=relaxations, improvements=improvements)
+    return assignment
+
+
+def greedy_search(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    time_limit: float = None,
+    counters: dict = None
+) -> SolverResult:
+    """
+    Fast heuristic for very large card lists.
+
+    Builds a plan by shipping-aware greedy set cover, then alternates local
+    search moves until neither improves the plan: relocating single cards to
+    another seller (improve_assignment) and closing sellers (close_sellers).
+    The lower bound is the card-only cost, every card at its cheapest price.
+    """
+    deadline = time.monotonic() + time_limit if time_limit else None
+    num_sellers, num_cards = prices.shape
+    if num_sellers == 0 or num_cards == 0 or not np.isfinite(prices).any(axis=0).all():
+        return SolverResult(np.zeros(0, dtype=int), float('inf'), float('inf'), True)
+
+    assignment = greedy_set_cover(prices, shipping_table)
+    cost = plan_cost(prices, shipping_table, assignment)
+    while True:
+        assignment = improve_assignment(prices, shipping_table, assignment, deadline, counters=counters)
+        assignment = close_sellers(prices, shipping_table, assignment, deadline, counters)
+        new_cost = plan_cost(prices, shipping_table, assignment)
+        if not new_cost < cost - 1e-9 or deadline is not None and time.monotonic() > deadline:
+            cost = min(cost, new_cost)
+            break
+        cost = new_cost
+
+    cheapest_prices = np.where(np.isfinite(prices), prices, np.inf).min(axis=0).sum()
+    return SolverResult(assignment, cost, float(cheapest_prices), False)
+
+
+def card_components(prices: np.ndarray) -> list[np.ndarray]:
+    """
+    Split the cards into groups that no seller connects.
+
+    Cards are linked when some seller offers both, i.e. the connected
+    components of the seller-card bipartite graph. Shipping only couples cards
+    within a component, so each one can be optimized on its own.
+    """
+    num_cards = prices.shape[1]
+    parent = list(range(num_cards))
+
+    def find(card: int) -> int:
+        while parent[card] != card:
+            parent[card] = parent[parent[card]]
+            card = parent[card]
+        return card
+
+    for row in np.isfinite(prices):
+        cards = np.flatnonzero(row)
+        if len(cards) < 2:
+            continue
+        root = find(cards[0])
+        for card in cards[1:]:
+            other = find(card)
+            if other != root:
+                parent[other] = root
+
+    roots = np.array([find(card) for card in range(num_cards)], dtype=int)
+    _, labels = np.unique(roots, return_inverse=True)
+    return [np.flatnonzero(labels == label) for label in range(labels.max(initial=-1) + 1)]
+
+
+def solve(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    engine: str = "numpy",
+    time_limit: float = None,
+    on_improvement=None,
+    progress: bool = True
+) -> SolverResult:
+    """
+    Run one optimizer engine on a price matrix.
+
+    The result's counters hold the engine's relaxations and improvements and
+    the number of shipping price lookups.
+    """
+    counters = {}
+    evaluations = shipping_table.evaluations
+    if engine == "greedy":
+        result = greedy_search(prices, shipping_table, time_limit, counters=counters)
+    elif engine == "exact":
+        result = branch_and_bound(
+            prices, shipping_table, time_limit, on_improvement=on_improvement, counters=counters
+        )
+    elif engine == "anytime":
+        result = anytime_search(
+            prices, shipping_table, time_limit, on_improvement=on_improvement, counters=counters
+        )
+    else:
+        dp = dp_python if engine == "python" else dp_numpy
+        cost, path = dp(prices, shipping_table, progress=progress, counters=counters)
+        result = SolverResult(np.array(path, dtype=int), cost, 0.0, False)
+
+    add_counters(counters, shipping_evaluations=shipping_table.evaluations - evaluations)
+    result.counters = counters
+    return result
+
+
+def card_orderings(prices: np.ndarray, count: int, seed: int = 0) -> list[np.ndarray]:
+    """
+    Up to `count` card orderings for the DP engines: the given order,
+    scarcity-first, price-descending (by cheapest offer), then random
+    permutations drawn from `seed`.
+    """
+    num_cards = prices.shape[1]
+    cheapest = np.where(np.isfinite(prices), prices, np.inf).min(axis=0, initial=np.inf)
+    orderings = [np.arange(num_cards), scarcity_order(prices), np.argsort(-cheapest, kind="stable")]
+    rng = np.random.default_rng(seed)
+    while len(orderings) < count:
+        orderings.append(rng.permutation(num_cards))
+    return orderings[:max(count, 1)]
+
+
+def _solve_task(prices: np.ndarray, task: tuple) -> SolverResult:
+    """Solve the (sellers, ordered cards) sub-matrix of a task before its deadline."""
+    _, sellers, cards, shipping_table, engine, deadline = task
+    time_limit = None if deadline is None else max(deadline - time.monotonic(), 1e-3)
+    return solve(prices[np.ix_(sellers, cards)], shipping_table, engine, time_limit, progress=False)
+
+
+def _solve_shared(args: tuple) -> SolverResult:
+    """Process pool entry point: solve a task against the price matrix in shared memory."""
+    name, shape, task = args
+    shared = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray(shape, dtype=float, buffer=shared.buf)
+    try:
+        return _solve_task(prices, task)
+    finally:
+        del prices
+        shared.close()
+
+
+def solve_decomposed(
+    prices: np.ndarray,
+    shipping_table: ShippingTable,
+    engine: str = "numpy",
+    time_limit: float = None,
+    max_workers: int = None,
+    on_improvement=None,
+    orderings: int = 1,
+    progress: bool = True
+) -> SolverResult:
+    """
+    Solve each independent card component separately and merge the plans.
+
+    With `orderings` > 1 the DP engines also run each component over several
+    card orderings (see card_orderings) and keep the cheapest plan; the exact,
+    anytime and greedy engines do their own ordering and ignore it.
+
+    Tasks run on a process pool with `max_workers` processes (all cores by
+    default) that read the price matrix from shared memory instead of getting
+    a pickled copy per task. With a single task `on_improvement` is passed
+    through; with `max_workers=1` everything runs in this process. The time
+    limit is a shared deadline for all tasks. The greedy engine always runs in
+    this process, as starting the pool would take longer than the search.
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    num_sellers, num_cards = prices.shape
+    components = card_components(prices)
+    if engine in ("exact", "anytime", "greedy"):
+        orderings = 1
+    if engine == "greedy":
+        max_workers = 1
+    if len(components) <= 1 and orderings <= 1:
+        return solve(prices, shipping_table, engine, time_limit, on_improvement, progress)
+
+    deadline = time.monotonic() + time_limit if time_limit else None
+    tasks = []
+    for component, cards in enumerate(components):
+        sellers = np.flatnonzero(np.isfinite(prices[:, cards]).any(axis=1))
+        component_table = shipping_table.subset(sellers)
+        for order in card_orderings(prices[:, cards], orderings):
+            tasks.append((component, sellers, cards[order], component_table, engine, deadline))
+
+    if max_workers == 1:
+        results = [
+            _solve_task(prices, task) for task in tqdm.tqdm(tasks, desc="Optimizing", disable=not progress)
+        ]
+    else:
+        shared = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+        try:
+            np.ndarray(prices.shape, dtype=float, buffer=shared.buf)[:] = prices
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                results = list(tqdm.tqdm(
+                    pool.map(_solve_shared, [(shared.name, prices.shape, task) for task in tasks]),
+                    total=len(tasks),
+                    desc="Optimizing",
+                    disable=not progress
+                ))
+        finally:
+            shared.close()
+            shared.unlink()
+
+    # Keep the cheapest plan per component
+    best = {}
+    for task, result in zip(tasks, results):
+        if task[0] not in best or result.cost < best[task[0]][1].cost:
+            best[task[0]] = (task, result)
+
+    assignment = np.full(num_cards, -1)
+    for (_, sellers, cards, *_), result in best.values():
+        if len(result.assignment) == len(cards):
+            assignment[cards] = sellers[result.assignment]
+
+    # Counters cover every task, including the orderings that were not kept
+    counters = {}
+    for result in results:
+        add_counters(counters, **result.counters)
+
+    results = [result for _, result in best.values()]
+    return SolverResult(
+        assignment,
+        sum(result.cost for result in results),
+        sum(result.lower_bound for result in results),
+        all(result.optimal for result in results),
+        sum(result.nodes for result in results),
+        counters
+    )
+
+
+class BatchTask:
+    """
+    One job of a batch solve: a (sellers, cards) sub-matrix of the shared
+    price matrix and the job's shipping table (for those sellers).
+
+    With `stock` (sellers x cards) and `quantities` the job is solved with
+    the quantity DP; otherwise with `engine`, component by component.
+    """
+
+    def __init__(
+        self,
+        sellers: np.ndarray,
+        cards: np.ndarray,
+        shipping_table: ShippingTable,
+        engine: str = "numpy",
+        time_limit: float = None,
+        orderings: int = 1,
+        stock: np.ndarray = None,
+        quantities: np.ndarray = None
+    ):
+        self.sellers = sellers
+        self.cards = cards
+        self.shipping_table = shipping_table
+        self.engine = engine
+        self.time_limit = time_limit
+        self.orderings = orderings
+        self.stock = stock
+        self.quantities = quantities
+
+
+def _solve_batch_task(prices: np.ndarray, task: BatchTask) -> SolverResult:
+    """Solve one batch job against the shared price matrix, in this process."""
+    job_prices = prices[np.ix_(task.sellers, task.cards)]
+    if task.stock is None:
+        return solve_decomposed(
+            job_prices,
+            task.shipping_table,
+            task.engine,
+            time_limit=task.time_limit,
+            max_workers=1,
+            orderings=task.orderings,
+            progress=False
+        )
+    counters = {}
+    evaluations = task.shipping_table.evaluations
+    cost, path = dp_numpy_quantities(
+        job_prices, task.stock, task.quantities, task.shipping_table, progress=False, counters=counters
+    )
+    add_counters(counters, shipping_evaluations=task.shipping_table.evaluations - evaluations)
+    return SolverResult(np.array(path, dtype=int), cost, 0.0, False, counters=counters)
+
+
+def _solve_batch_shared(args: tuple) -> SolverResult:
+    """Process pool entry point: solve a batch job against the price matrix in shared memory."""
+    name, shape, task = args
+    shared = shared_memory.SharedMemory(name=name)
+    prices = np.ndarray(shape, dtype=float, buffer=shared.buf)
+    try:
+        return _solve_batch_task(prices, task)
+    finally:
+        del prices
+        shared.close()
+
+
+def solve_batch(prices: np.ndarray, tasks: list[BatchTask], max_workers: int = None) -> list[SolverResult]:
+    """
+    Solve many jobs over one price matrix (all sellers x all cards of the batch).
+
+    Jobs run concurrently on a process pool with `max_workers` processes (all
+    cores by default) that read the matrix from shared memory, one job per
+    process; with `max_workers=1` or a single job everything runs in this
+    process. Results are in task order, and assignments index the task's
+    sellers (one entry per copy for quantity jobs).
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    if max_workers == 1 or len(tasks) <= 1:
+        return [_solve_batch_task(prices, task) for task in tqdm.tqdm(tasks, desc="Batch jobs")]
+
+    shared = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    try:
+        np.ndarray(prices.shape, dtype=float, buffer=shared.buf)[:] = prices
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return list(tqdm.tqdm(
+                pool.map(_solve_batch_shared, [(shared.name, prices.shape, task) for task in tasks]),
+                total=len(tasks),
+                desc="Batch jobs"
+            ))
+    finally:
+        shared.close()
+        shared.unlink()
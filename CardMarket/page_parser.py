@@ -0,0 +1,290 @@
+import json
+import os
+import re
+from typing import Callable
+
+from lxml import etree, html as lxml_html
+
+
+# Raw fields of each listing row (div[id^='articleRow']), read in the page
+# with one evaluation; a field is null if its element is missing
+ARTICLE_ROW_FIELDS_JS = """
+rows => rows.map(row => {
+    const element = selector => row.querySelector(selector);
+    const text = selector => element(selector)?.textContent ?? null;
+    const attribute = (selector, name) => {
+        const found = element(selector);
+        return found ? found.getAttribute(name) ?? "" : null;
+    };
+    return {
+        card_name: text("a[href*='/Products/Singles/']"),
+        seller: text("div.col-sellerProductInfo span.seller-name a[href*='/Users/']"),
+        price: text("div.price-container span"),
+        language: attribute("div.product-attributes span.icon[aria-label]", "aria-label"),
+        language_title: attribute("div.product-attributes span.icon[aria-label]", "data-original-title"),
+        location: attribute("span.seller-info span[aria-label^='Item location:'][data-bs-toggle='tooltip']", "aria-label"),
+        alt_location: attribute("span.seller-info span[data-bs-original-title^='Item location:'][data-bs-toggle='tooltip']", "data-bs-original-title"),
+        quantity: text("div.amount-container span.item-count"),
+    };
+})
+"""
+
+
+def _has_class(name: str) -> str:
+    """XPath test for an element with the given class (CSS `.name`)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# The selectors of ARTICLE_ROW_FIELDS_JS as XPath, for parsing saved HTML.
+# Each field is (first element matching, attribute to read or None for its text).
+ARTICLE_ROWS_XPATH = etree.XPath("//div[starts-with(@id, 'articleRow')]")
+_LANGUAGE_XPATH = f"(.//div[{_has_class('product-attributes')}]//span[{_has_class('icon')}][@aria-label])[1]"
+ARTICLE_ROW_FIELDS_XPATH = {
+    "card_name": ("(.//a[contains(@href, '/Products/Singles/')])[1]", None),
+    "seller": (
+        f"(.//div[{_has_class('col-sellerProductInfo')}]//span[{_has_class('seller-name')}]"
+        "//a[contains(@href, '/Users/')])[1]",
+        None,
+    ),
+    "price": (f"(.//div[{_has_class('price-container')}]//span)[1]", None),
+    "language": (_LANGUAGE_XPATH, "aria-label"),
+    "language_title": (_LANGUAGE_XPATH, "data-original-title"),
+    "location": (
+        f"(.//span[{_has_class('seller-info')}]//span[starts-with(@aria-label, 'Item location:')]"
+        "[@data-bs-toggle='tooltip'])[1]",
+        "aria-label",
+    ),
+    "alt_location": (
+        f"(.//span[{_has_class('seller-info')}]//span[starts-with(@data-bs-original-title, 'Item location:')]"
+        "[@data-bs-toggle='tooltip'])[1]",
+        "data-bs-original-title",
+    ),
+    "quantity": (f"(.//div[{_has_class('amount-container')}]//span[{_has_class('item-count')}])[1]", None),
+}
+_FIELD_XPATHS = {field: (etree.XPath(path), attribute) for field, (path, attribute) in ARTICLE_ROW_FIELDS_XPATH.items()}
+
+_HTML_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+
+def is_listings_page(url: str) -> bool:
+    """Whether a URL is a product page or a seller's offers page."""
+    return '/Products/Singles/' in url or '/Offers/Singles/' in url
+
+
+def parse_price(price_text: str) -> float | None:
+    """Parse price string like '25,00 €' to float."""
+    # Remove currency symbols and whitespace
+    text = price_text.replace('€', '').replace('EUR', '').strip()
+
+    # Match European format with comma as decimal separator
+    euro_pattern = r'(\d{1,3}(?:\.\d{3})*,\d+)|(\d+,\d+)'
+    euro_match = re.search(euro_pattern, text)
+
+    if euro_match:
+        num_str = euro_match.group(0)
+        # Convert to standard float format
+        standard_format = num_str.replace('.', '').replace(',', '.')
+        try:
+            return float(standard_format)
+        except ValueError:
+            pass
+
+    return None
+
+
+def parse_quantity(quantity_text: str) -> int:
+    """Parse an available quantity like '4' to int, 1 if it cannot be read."""
+    match = re.search(r'\d+', quantity_text or "")
+    return max(int(match.group(0)), 1) if match else 1
+
+
+def parse_country(location_text: str) -> str:
+    """Extract country from location text like 'Item location: Germany'."""
+    if location_text and ":" in location_text:
+        try:
+            return location_text.split(":")[1].strip()
+        except IndexError:
+            pass
+    return "Unknown"
+
+
+def extract_article_rows(page_html: str | bytes) -> list[dict]:
+    """
+    Raw fields of the listing rows in a page's HTML.
+
+    The offline counterpart of evaluating ARTICLE_ROW_FIELDS_JS in the
+    browser: same fields, None where the browser would return null.
+    """
+    if isinstance(page_html, str):
+        page_html = page_html.encode("utf-8")
+    if not page_html.strip():
+        return []
+    document = lxml_html.document_fromstring(page_html, parser=_HTML_PARSER)
+
+    article_rows = []
+    for row in ARTICLE_ROWS_XPATH(document):
+        fields = {}
+        for field, (xpath, attribute) in _FIELD_XPATHS.items():
+            found = xpath(row)
+            if not found:
+                fields[field] = None
+            elif attribute is None:
+                fields[field] = found[0].text_content()
+            else:
+                fields[field] = found[0].get(attribute, "")
+        article_rows.append(fields)
+    return article_rows
+
+
+def parse_article_rows(
+    article_rows: list[dict],
+    page_url: str,
+    language: str,
+    log: Callable[[str], None] = None
+) -> list[tuple[str, str, dict]]:
+    """
+    Parse the raw fields of a page's listing rows (see ARTICLE_ROW_FIELDS_JS).
+
+    Returns (card name, seller, listing) for every row in the wanted
+    language that has a seller and a price. Skipped rows are reported
+    through `log` if given.
+    """
+    language = language.lower()
+    log = log or (lambda message: None)
+    parsed = []
+    for row in article_rows:
+        card_name = (row.get("card_name") or "").strip()
+        if not card_name:
+            card_name = page_url.split("?")[0].split("/")[-1].replace("-", " ").replace("_", " ")
+
+        # On a seller's offers page every row is from that seller
+        if '/Users/' in page_url and '/Offers/Singles/' in page_url:
+            seller_name = page_url.split("/")[-3]
+        else:
+            seller_name = (row.get("seller") or "").strip()
+        if not seller_name:
+            log(f"No seller element found for {card_name}")
+            continue
+
+        if row.get("price") is None:
+            log(f"No price element found for {card_name}")
+            continue
+        price = parse_price(row["price"].strip())
+
+        row_language = "Unknown"
+        if row.get("language") is not None:
+            row_language = row["language"] or row.get("language_title") or "Unknown"
+        if row_language.lower() != language:
+            log(f"Language mismatch for {card_name}: {row_language} != {language}")
+            continue
+
+        country = "Unknown"
+        location_text = row.get("location")
+        if location_text is None:
+            location_text = row.get("alt_location")
+        if location_text is not None:
+            country = parse_country(location_text)
+
+        quantity = 1
+        if row.get("quantity") is not None:
+            quantity = parse_quantity(row["quantity"])
+
+        parsed.append((card_name, seller_name, {
+            "price": price,
+            "country": country,
+            "quantity": quantity,
+            "link": page_url
+        }))
+    return parsed
+
+
+def add_listings(listings_data: dict, parsed: list[tuple[str, str, dict]]) -> dict:
+    """Add parsed listings to a {card name: {seller: [listing]}} dictionary, skipping repeats."""
+    for card_name, seller_name, listing in parsed:
+        # A seller can list a card several times (e.g. in different conditions)
+        seller_listings = listings_data.setdefault(card_name, {}).setdefault(seller_name, [])
+        if listing not in seller_listings:
+            seller_listings.append(listing)
+    return listings_data
+
+
+def parse_page(page_html: str | bytes, page_url: str, language: str, listings_data: dict = None) -> dict | None:
+    """
+    Listings on a saved page, as CardApi._collect_listings collects them.
+
+    Returns the {card name: {seller: [listing]}} dictionary (`listings_data`
+    with the page's listings added, if given), or None if the URL is not a
+    listings page.
+    """
+    if not is_listings_page(page_url):
+        return None
+    parsed = parse_article_rows(extract_article_rows(page_html), page_url, language)
+    return add_listings(listings_data if listings_data is not None else {}, parsed)
+
+
+class PageSnapshots:
+    """
+    Recorded pages: one HTML file per visit and a pages.jsonl manifest.
+
+    Each manifest line holds the page URL, its file and the URLs that were
+    requested and redirected to it, in visiting order. A page visited more
+    than once is recorded each time.
+    """
+
+    MANIFEST = "pages.jsonl"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._count = len(self.pages())
+
+    def record(self, url: str, page_html: str, redirected_from: list[str] = ()) -> str:
+        """Save a visited page, returning the path of its HTML file."""
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{self._count:05d}.html"
+        with open(os.path.join(self.directory, file_name), 'w', encoding='utf-8') as f:
+            f.write(page_html)
+        with open(os.path.join(self.directory, self.MANIFEST), 'a', encoding='utf-8') as f:
+            entry = {"url": url, "file": file_name}
+            redirected_from = [requested for requested in redirected_from if requested != url]
+            if redirected_from:
+                entry["redirected_from"] = redirected_from
+            f.write(json.dumps(entry) + "\n")
+        self._count += 1
+        return os.path.join(self.directory, file_name)
+
+    def _entries(self) -> list[dict]:
+        manifest = os.path.join(self.directory, self.MANIFEST)
+        if not os.path.exists(manifest):
+            return []
+        with open(manifest, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def pages(self) -> list[tuple[str, str]]:
+        """(URL, HTML file path) of every recorded visit, in order."""
+        return [(entry["url"], os.path.join(self.directory, entry["file"])) for entry in self._entries()]
+
+    def latest(self) -> dict[str, str]:
+        """HTML file path of the last visit to each URL."""
+        return dict(self.pages())
+
+    def redirects(self) -> dict[str, str]:
+        """Page URL each requested URL last redirected to."""
+        return {
+            requested: entry["url"]
+            for entry in self._entries()
+            for requested in entry.get("redirected_from", [])
+        }
+
+    @staticmethod
+    def read(path: str) -> bytes:
+        """Contents of a recorded HTML file."""
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def parse_snapshots(snapshots: PageSnapshots, language: str) -> dict:
+    """Listings of every recorded listings page, merged as CardApi gathers them."""
+    listings_data = {}
+    for url, path in snapshots.pages():
+        parse_page(PageSnapshots.read(path), url, language, listings_data)
+    return listings_data
@@ -0,0 +1,132 @@
+import json
+import numpy as np
+import pandas as pd
+
+from card_import import card_quantity, card_variants
+from listings import ensure_compact, from_cents, lower_names
+from shipping_table import ShippingTable
+
+
+# One exported row per card bought from a seller (all its copies)
+PLAN_COLUMNS = ["seller", "country", "card", "listing", "copies", "price", "cost", "shipping_share", "link"]
+PLAN_FORMATS = (".json", ".csv")
+
+
+class ListingIndex:
+    """
+    Cheapest listing per (seller, card name) and country per seller.
+
+    Built once from the listings, so materializing a plan takes a dictionary
+    lookup per card instead of a scan over all listings.
+    """
+
+    def __init__(self, listings: pd.DataFrame):
+        listings = ensure_compact(listings)
+        sellers = listings['seller'].to_numpy()
+        names = lower_names(listings['card_name'])
+        self._prices = from_cents(listings['price'].to_numpy(), missing=np.inf)
+        self._names = listings['card_name'].to_numpy()
+        self._links = listings['link'].to_numpy() if 'link' in listings.columns else np.full(len(listings), None)
+
+        # Cheapest listing first; ties keep the earlier one
+        order = np.argsort(self._prices, kind="stable")
+        first = ~pd.DataFrame({'seller': sellers[order], 'name': names[order]}).duplicated().to_numpy()
+        self._rows = dict(zip(zip(sellers[order][first], names[order][first]), order[first].tolist()))
+
+        # Each seller's country is taken from its first listing
+        first_listing = ~pd.Series(sellers).duplicated().to_numpy()
+        self._countries = dict(zip(sellers[first_listing], listings['country'].to_numpy()[first_listing]))
+
+    def country(self, seller: str) -> str | None:
+        """Country a seller ships from, or None if it has no listings."""
+        return self._countries.get(seller)
+
+    def listing(self, seller: str, card: str) -> tuple[str, str]:
+        """
+        Label and link of the listing bought for a card from a seller.
+
+        For a card with alternatives ("A | B") this is the seller's cheapest
+        listing of any variant, and the label names the variant bought. The
+        label leaves out the number of copies ("4x").
+        """
+        _, name = card_quantity(card)
+        variants = {variant.lower() for variant in card_variants(card)}
+        rows = [self._rows[(seller, variant)] for variant in variants if (seller, variant) in self._rows]
+        if not rows:
+            return name, None
+        row = min(rows, key=lambda r: self._prices[r])
+        link = self._links[row] if isinstance(self._links[row], str) else None
+        label = name if len(variants) == 1 else f"{self._names[row]} (for {name})"
+        return label, link
+
+
+def seller_groups(sellers, cards) -> dict:
+    """
+    Seller groups of a plan: seller -> {card: copies bought}.
+
+    `sellers` and `cards` give the seller and card of every copy bought, in
+    the same order, so a card wanted several times appears once per copy.
+    """
+    groups = {}
+    for seller, card in zip(sellers, cards):
+        bought = groups.setdefault(seller, {})
+        bought[card] = bought.get(card, 0) + 1
+    return groups
+
+
+def plan_rows(index: ListingIndex, groups: dict, card_prices: dict, shipping_dict: dict) -> list[dict]:
+    """
+    Materialize a plan as one row per card bought from a seller (see PLAN_COLUMNS).
+
+    Each seller's parcel price is split over its cards in proportion to their
+    cost, so the shipping shares of a plan add up to its shipping cost.
+    """
+    sellers = list(groups)
+    shipping_table = ShippingTable.compile(shipping_dict, [index.country(seller) for seller in sellers])
+    rows = []
+    for i, seller in enumerate(sellers):
+        bought = groups[seller]
+        costs = {card: card_prices[seller][card] * copies for card, copies in bought.items()}
+        load = sum(costs.values())
+        shipping = shipping_table.price_for(i, load)
+        for card, copies in bought.items():
+            label, link = index.listing(seller, card)
+            rows.append({
+                "seller": seller,
+                "country": index.country(seller),
+                "card": card_quantity(card)[1],
+                "listing": label,
+                "copies": copies,
+                "price": card_prices[seller][card],
+                "cost": costs[card],
+                "shipping_share": shipping * costs[card] / load if load > 0 else shipping / len(bought),
+                "link": link,
+            })
+    return rows
+
+
+def export_plan(rows: list[dict], cost: float, path: str):
+    """
+    Write a plan to a .json file (totals and rows) or a .csv file (rows only).
+
+    Prices are rounded to cents.
+    """
+    if not path.lower().endswith(PLAN_FORMATS):
+        raise ValueError(f"Plan export path must end in {' or '.join(PLAN_FORMATS)}: {path}")
+
+    frame = pd.DataFrame(rows, columns=PLAN_COLUMNS).round({"price": 2, "cost": 2, "shipping_share": 2})
+    if path.lower().endswith(".csv"):
+        frame.to_csv(path, index=False)
+        return
+
+    card_cost = float(sum(row["cost"] for row in rows))
+    finite = bool(np.isfinite(cost))
+    plan = {
+        "total": round(float(cost), 2) if finite else None,
+        "card_cost": round(card_cost, 2),
+        "shipping": round(float(cost) - card_cost, 2) if finite else None,
+        "sellers": int(frame['seller'].nunique()),
+        "items": frame.astype(object).where(frame.notna(), None).to_dict(orient="records"),
+    }
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=2)
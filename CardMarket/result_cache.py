@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+
+# Bump when the optimizer changes in a way that invalidates stored plans
+CACHE_VERSION = 5
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# Listing columns that affect the plan (links only affect the output)
+KEY_COLUMNS = ["seller", "card_name", "price", "country", "quantity"]
+
+
+def result_key(
+    listings: pd.DataFrame,
+    card_names: list[str],
+    shipping_dict: dict,
+    settings: dict
+) -> str:
+    """
+    Content hash identifying an optimizer request.
+
+    Covers the listings content, the normalized (lowercased, deduplicated,
+    sorted) card list, the shipping data and the optimizer settings.
+    """
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    columns = [column for column in KEY_COLUMNS if column in listings.columns]
+    digest.update(json.dumps(columns).encode())
+    digest.update(pd.util.hash_pandas_object(listings[columns], index=False).to_numpy().tobytes())
+    digest.update(json.dumps(sorted({card.lower() for card in card_names})).encode())
+    digest.update(json.dumps(shipping_dict, sort_keys=True).encode())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Optimizer results stored as one JSON file per key in a directory.
+
+    Reads refresh an entry's modification time; when the directory grows
+    past `max_bytes`, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored result for a key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable entry: drop it and recompute
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, key: str, value: dict):
+        """Store a result and evict old entries if the cache is over its size."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
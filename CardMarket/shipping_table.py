@@ -0,0 +1,186 @@
+from bisect import bisect_left
+
+import numpy as np
+
+
+def country_key(country) -> str:
+    """Normalize a listing country name to a ShippingApi dictionary key."""
+    return str(country).upper().replace(" ", "_")
+
+
+class ShippingTable:
+    """
+    ShippingApi tiers compiled into arrays for fast lookups.
+
+    Each seller is mapped to an integer country index, and each country has
+    sorted tier breakpoint (maxValue) and price arrays. A parcel of value v
+    costs the price of the last tier whose maxValue is below v, or the first
+    tier's price if there is none. Countries without shipping data ship for free.
+
+    `evaluations` counts the parcel prices looked up, shared with subset tables.
+    """
+
+    def __init__(
+        self,
+        countries: list[str],
+        breakpoints: list[np.ndarray],
+        prices: list[np.ndarray],
+        country_index: np.ndarray,
+        missing_countries: list[str],
+        evaluations: list[int] = None
+    ):
+        self.countries = countries
+        self.breakpoints = breakpoints
+        self.prices = prices
+        self.country_index = country_index
+        self.missing_countries = missing_countries
+        self._evaluations = evaluations if evaluations is not None else [0]
+
+        # Python copies of the tiers for scalar lookups
+        self._breakpoint_lists = [b.tolist() for b in breakpoints]
+        self._price_lists = [p.tolist() for p in prices]
+        # Tiers expanded per seller (tiers x sellers) for batched lookups.
+        # Breakpoints are padded with inf so padded tiers are never reached.
+        num_tiers = max((len(b) for b in breakpoints), default=0)
+        padded_breakpoints = np.full((len(countries), max(num_tiers, 1)), np.inf)
+        padded_prices = np.zeros((len(countries), max(num_tiers, 1)))
+        for c in range(len(countries)):
+            padded_breakpoints[c, :len(breakpoints[c])] = breakpoints[c]
+            padded_prices[c, :len(prices[c])] = prices[c]
+        self._seller_breakpoints = padded_breakpoints[country_index].T
+        self._seller_prices = padded_prices[country_index].T
+
+    @classmethod
+    def compile(cls, shipping_dict: dict, seller_countries: list[str]) -> "ShippingTable":
+        """Compile a ShippingApi dictionary for the given per-seller countries."""
+        countries = []
+        positions = {}
+        country_index = np.zeros(len(seller_countries), dtype=np.int32)
+        for i, country in enumerate(seller_countries):
+            key = country_key(country)
+            if key not in positions:
+                positions[key] = len(countries)
+                countries.append(key)
+            country_index[i] = positions[key]
+
+        breakpoints = []
+        prices = []
+        missing_countries = []
+        for key in countries:
+            tiers = shipping_dict.get(key)
+            if not isinstance(tiers, list) or not tiers:
+                missing_countries.append(key)
+                breakpoints.append(np.zeros(0))
+                prices.append(np.zeros(1))
+                continue
+            tiers = sorted((tier['maxValue'], tier['price']) for tier in tiers)
+            breakpoints.append(np.array([t[0] for t in tiers], dtype=float))
+            prices.append(np.array([t[1] for t in tiers], dtype=float))
+
+        return cls(countries, breakpoints, prices, country_index, missing_countries)
+
+    def __len__(self) -> int:
+        return len(self.country_index)
+
+    @property
+    def evaluations(self) -> int:
+        """Number of parcel prices looked up so far."""
+        return self._evaluations[0]
+
+    def subset(self, sellers: np.ndarray) -> "ShippingTable":
+        """Return a table for a subset of the sellers, sharing the country tiers."""
+        return ShippingTable(
+            self.countries,
+            self.breakpoints,
+            self.prices,
+            self.country_index[sellers],
+            self.missing_countries,
+            self._evaluations
+        )
+
+    def price_for(self, seller: int, value: float) -> float:
+        """Shipping price for a single parcel of the given value from a seller."""
+        self._evaluations[0] += 1
+        c = self.country_index[seller]
+        tier = bisect_left(self._breakpoint_lists[c], value) - 1
+        return self._price_lists[c][max(tier, 0)]
+
+    def delta_for(self, seller: int, carried: float, added: float, in_plan: bool) -> float:
+        """Shipping increase for adding value to a seller carrying `carried` already."""
+        if in_plan:
+            return self.price_for(seller, carried + added) - self.price_for(seller, carried)
+        return self.price_for(seller, carried + added)
+
+    def parcel_price(self, values: np.ndarray, sellers: np.ndarray = None) -> np.ndarray:
+        """
+        Batched shipping price lookup.
+
+        `values` has shape (..., sellers); the last axis is aligned with the
+        sellers of this table, or with `sellers` (seller indices) if given.
+        """
+        values = np.asarray(values, dtype=float)
+        self._evaluations[0] += values.size
+        if sellers is not None:
+            # Small lookups from local search: breakpoints are sorted, so the
+            # tier is the number of breakpoints above tier 0 that are exceeded
+            tiers = (values[..., None] > self._seller_breakpoints[1:, sellers].T).sum(axis=-1)
+            return self._seller_prices[tiers, sellers]
+        result = np.broadcast_to(self._seller_prices[0], values.shape)
+        for tier in range(1, self._seller_breakpoints.shape[0]):
+            result = np.where(values > self._seller_breakpoints[tier], self._seller_prices[tier], result)
+        return np.array(result, dtype=float)
+
+    def delta(
+        self,
+        carried: np.ndarray,
+        added: np.ndarray,
+        in_plan: np.ndarray = None,
+        sellers: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Batched shipping delta for adding `added` to sellers carrying `carried`.
+
+        Sellers not yet in the plan pay the full price of a new parcel. If
+        `in_plan` is not given, sellers carrying a positive value are in the
+        plan. `sellers` restricts the lookup to those seller indices.
+        """
+        carried = np.asarray(carried, dtype=float)
+        if in_plan is None:
+            in_plan = carried > 0
+        new_price = self.parcel_price(carried + added, sellers)
+        return np.where(in_plan, new_price - self.parcel_price(carried, sellers), new_price)
+
+    def plan_shipping(self, loads: np.ndarray, in_plan: np.ndarray = None) -> np.ndarray:
+        """Shipping paid per seller for the given carried values (zero if unused)."""
+        if in_plan is None:
+            in_plan = loads > 0
+        return np.where(in_plan, self.parcel_price(loads), 0.0)
+
+    def is_subadditive(self) -> np.ndarray:
+        """
+        Per country: whether shipping never decreases with value and one parcel
+        never costs more than splitting it in two (price(a + b) <= price(a) + price(b)).
+
+        Checked exactly on the tier ranges: for tiers s and t, the worst case is
+        both values at the top of their range.
+        """
+        result = np.ones(len(self.countries), dtype=bool)
+        for c in range(len(self.countries)):
+            breakpoints = self._breakpoint_lists[c]
+            prices = self._price_lists[c]
+            if np.any(np.diff(prices) < 0):
+                result[c] = False
+                continue
+            # Tier s covers values up to breakpoints[s + 1] (the last tier is unbounded)
+            tops = [breakpoints[s + 1] if s + 1 < len(breakpoints) else float('inf')
+                    for s in range(len(prices))]
+            for s in range(len(prices)):
+                for t in range(s, len(prices)):
+                    top = tops[s] + tops[t]
+                    tier = bisect_left(breakpoints, top) - 1 if top < float('inf') else len(prices) - 1
+                    if prices[max(tier, 0)] > prices[s] + prices[t]:
+                        result[c] = False
+                        break
+                if not result[c]:
+                    break
+        return result
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The modules live next to main.py rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_listings, generate_shipping_dict  # noqa: E402
+from main import create_sellers_dataframe  # noqa: E402
+from optimizer import build_price_matrix  # noqa: E402
+from shipping_table import ShippingTable  # noqa: E402
+
+
+class Instance:
+    """A synthetic card list: listings, shipping data, and the unfiltered price matrix over all sellers."""
+
+    def __init__(self, num_cards: int, num_sellers: int, sparsity: float, seed: int):
+        self.listings = generate_listings(num_cards, num_sellers, 4, sparsity, seed=seed)
+        self.shipping_dict = generate_shipping_dict(seed)
+        self.card_names = sorted(self.listings['card_name'].str.lower().unique())
+        sellers_df, found_cards = create_sellers_dataframe(self.listings, self.card_names)
+        self.sellers_df = sellers_df.reset_index(drop=True)
+        self.cards = sorted(found_cards)
+        self.prices = build_price_matrix(self.sellers_df, self.cards)
+        self.shipping_table = ShippingTable.compile(self.shipping_dict, self.sellers_df['country'].tolist())
+
+
+@pytest.fixture(params=[0, 1, 2])
+def tiny(request) -> Instance:
+    """5 cards and 10 sellers: small enough to enumerate every plan."""
+    return Instance(5, 10, 0.5, request.param)
+
+
+@pytest.fixture(params=[0, 1, 2])
+def small(request) -> Instance:
+    """8 cards and 40 sellers: small enough for the loop-based DP."""
+    return Instance(8, 40, 0.7, request.param)
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generate_listings, generate_shipping_dict
+from incremental import Snapshot, incremental_solve, snapshot_key
+from listings import export_listings
+from main import create_sellers_dataframe, filter_sellers_df
+from optimizer import dp_numpy, plan_cost
+from shipping_table import ShippingTable
+
+
+@pytest.fixture
+def listings() -> pd.DataFrame:
+    return export_listings(generate_listings(24, 150, 4, 0.8, seed=5))
+
+
+def run(listings: pd.DataFrame, snapshot_dir: str):
+    """Incremental solve, the snapshot it wrote, and the cost of a full numpy DP over that snapshot."""
+    shipping_dict = generate_shipping_dict(5)
+    card_names = sorted(listings['card_name'].str.lower().unique())
+    sellers_df, cards = create_sellers_dataframe(listings, card_names)
+    filtered_df = filter_sellers_df(sellers_df, cards)
+    result = incremental_solve(listings, sellers_df, filtered_df, cards, shipping_dict, snapshot_dir, progress=False)
+
+    snapshot = Snapshot.load(os.path.join(snapshot_dir, f"{snapshot_key(cards, shipping_dict)}.npz"))
+    table = ShippingTable.compile(shipping_dict, snapshot.countries)
+    full_cost, _ = dp_numpy(snapshot.prices, table, progress=False)
+
+    # The plan's own cost, from its seller groups and unit prices
+    rows = {seller: i for i, seller in enumerate(snapshot.sellers)}
+    columns = {card: j for j, card in enumerate(snapshot.cards)}
+    assignment = np.zeros(len(snapshot.cards), dtype=int)
+    for seller, bought in result.groups.items():
+        for card in bought:
+            assignment[columns[card]] = rows[seller]
+            assert result.card_prices[seller][card] == pytest.approx(snapshot.prices[rows[seller], columns[card]])
+    assert result.cost == pytest.approx(plan_cost(snapshot.prices, table, assignment))
+    return result, snapshot, full_cost
+
+
+def test_resumed_solve_matches_full_solve(listings, tmp_path):
+    first, _, full_cost = run(listings, str(tmp_path))
+    assert first.resumed_column is None
+    assert first.cost == pytest.approx(full_cost)
+
+    unchanged, _, full_cost = run(listings, str(tmp_path))
+    assert unchanged.changed_cards == []
+    assert unchanged.cost == pytest.approx(first.cost)
+
+    # Reprice two cards and add a seller with a cheap copy of one of them
+    changed = listings.copy()
+    repriced = changed['card_name'].isin(["Synthetic Card 3", "Synthetic Card 17"])
+    changed.loc[repriced, 'price'] = (changed.loc[repriced, 'price'] * 0.7).round(2)
+    newcomer = {"seller": "newcomer", "card_name": "Synthetic Card 17", "price": 0.01, "country": "Germany", "link": "x"}
+    changed = pd.concat([changed, pd.DataFrame([newcomer])], ignore_index=True)
+
+    resumed, snapshot, full_cost = run(changed, str(tmp_path))
+    assert resumed.resumed_column is not None
+    assert resumed.changed_cards == ["synthetic card 17", "synthetic card 3"]
+    assert resumed.cost == pytest.approx(full_cost)
+    assert "newcomer" in snapshot.sellers
+
+
+def test_many_changes_fall_back_to_full_solve(listings, tmp_path):
+    run(listings, str(tmp_path))
+    changed = listings.copy()
+    changed['price'] = changed['price'] + 1
+    result, _, full_cost = run(changed, str(tmp_path))
+    assert result.resumed_column is None
+    assert result.cost == pytest.approx(full_cost)
@@ -0,0 +1,123 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from main import filter_sellers_df
+from optimizer import (
+    branch_and_bound, build_price_matrix, dp_numpy, dp_numpy_kbest, dp_numpy_max_sellers, dp_python,
+    marginal_costs, plan_cost, solve, solve_decomposed
+)
+from shipping_table import ShippingTable
+
+
+def brute_force(prices: np.ndarray, shipping_table: ShippingTable, max_sellers: int = None) -> float:
+    """Cheapest plan cost over every card -> seller assignment."""
+    offering = [np.flatnonzero(np.isfinite(prices[:, j])) for j in range(prices.shape[1])]
+    best = float('inf')
+    for assignment in itertools.product(*offering):
+        assignment = np.array(assignment)
+        if max_sellers is not None and len(set(assignment.tolist())) > max_sellers:
+            continue
+        best = min(best, plan_cost(prices, shipping_table, assignment))
+    return best
+
+
+def test_numpy_dp_matches_python_dp(small):
+    python_cost, python_path = dp_python(small.prices, small.shipping_table, progress=False)
+    numpy_cost, numpy_path = dp_numpy(small.prices, small.shipping_table, progress=False)
+    assert numpy_cost == pytest.approx(python_cost)
+    assert numpy_path == python_path
+
+
+def test_dp_costs_match_their_plans(small):
+    prices, table = small.prices, small.shipping_table
+    cost, path = dp_numpy(prices, table, progress=False)
+    assert cost == pytest.approx(plan_cost(prices, table, np.array(path)))
+
+    plans = dp_numpy_kbest(prices, table, 4, progress=False)
+    # Keeping several paths per seller can only find cheaper plans
+    assert plans[0][0] <= cost + 1e-9
+    for plan_cost_, plan_path in plans:
+        assert plan_cost_ == pytest.approx(plan_cost(prices, table, np.array(plan_path)))
+
+    for limit, (limit_cost, limit_path) in enumerate(dp_numpy_max_sellers(prices, table, 4, progress=False), 1):
+        if np.isfinite(limit_cost):
+            assert len(set(limit_path)) <= limit
+            assert limit_cost == pytest.approx(plan_cost(prices, table, np.array(limit_path)))
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python", "greedy", "anytime", "exact"])
+def test_solver_costs_match_their_plans(small, engine):
+    result = solve(small.prices, small.shipping_table, engine, time_limit=10, progress=False)
+    assert result.cost == pytest.approx(plan_cost(small.prices, small.shipping_table, result.assignment))
+    assert result.lower_bound <= result.cost + 1e-9
+
+
+def test_branch_and_bound_is_optimal(tiny):
+    optimum = brute_force(tiny.prices, tiny.shipping_table)
+    result = branch_and_bound(tiny.prices, tiny.shipping_table)
+    assert result.optimal
+    assert result.cost == pytest.approx(optimum)
+
+    # Seller filtering must not remove the optimal plan
+    filtered_df = filter_sellers_df(tiny.sellers_df, tiny.cards)
+    filtered_prices = build_price_matrix(filtered_df, tiny.cards)
+    filtered_table = ShippingTable.compile(tiny.shipping_dict, filtered_df['country'].tolist())
+    assert branch_and_bound(filtered_prices, filtered_table).cost == pytest.approx(optimum)
+
+
+def test_heuristics_are_not_below_optimum(tiny):
+    optimum = branch_and_bound(tiny.prices, tiny.shipping_table).cost
+    for engine in ["numpy", "greedy", "anytime"]:
+        result = solve(tiny.prices, tiny.shipping_table, engine, time_limit=10, progress=False)
+        assert result.cost >= optimum - 1e-9
+
+
+@pytest.mark.parametrize("max_sellers", [1, 2, 3])
+def test_branch_and_bound_seller_limit(tiny, max_sellers):
+    optimum = brute_force(tiny.prices, tiny.shipping_table, max_sellers)
+    result = branch_and_bound(tiny.prices, tiny.shipping_table, max_sellers=max_sellers)
+    assert result.optimal
+    assert result.cost == pytest.approx(optimum)
+    if np.isfinite(optimum):
+        assert len(set(result.assignment.tolist())) <= max_sellers
+
+
+def test_marginal_costs_are_feasible(tiny):
+    prices, table = tiny.prices, tiny.shipping_table
+    cost, path, without = marginal_costs(prices, table, progress=False)
+    assert cost == pytest.approx(dp_numpy(prices, table, progress=False)[0])
+
+    assignment = np.array(path)
+    num_cards = prices.shape[1]
+    for j in range(num_cards):
+        kept = np.arange(num_cards) != j
+        # No plan without card j is cheaper than the optimum, and dropping j
+        # from the plan itself is always possible
+        assert without[j] >= branch_and_bound(prices[:, kept], table).cost - 1e-9
+        assert without[j] <= plan_cost(prices[:, kept], table, assignment[kept]) + 1e-9
+
+
+def test_marginal_costs_of_a_given_plan(tiny):
+    prices, table = tiny.prices, tiny.shipping_table
+    exact = branch_and_bound(prices, table)
+    cost, path, without = marginal_costs(prices, table, progress=False, assignment=exact.assignment)
+    assert cost == pytest.approx(exact.cost)
+    assert path == exact.assignment.tolist()
+    assert np.all(without <= cost + 1e-9)
+
+
+def test_decomposed_solve_matches_per_component_solves(tiny):
+    # Two copies of the instance that no seller connects
+    num_sellers, num_cards = tiny.prices.shape
+    prices = np.full((2 * num_sellers, 2 * num_cards), np.inf)
+    prices[:num_sellers, :num_cards] = tiny.prices
+    prices[num_sellers:, num_cards:] = tiny.prices
+    table = ShippingTable.compile(tiny.shipping_dict, tiny.sellers_df['country'].tolist() * 2)
+
+    for engine in ["numpy", "exact"]:
+        single = solve(tiny.prices, tiny.shipping_table, engine, progress=False)
+        decomposed = solve_decomposed(prices, table, engine, max_workers=1, progress=False)
+        assert decomposed.cost == pytest.approx(2 * single.cost)
+        assert decomposed.cost == pytest.approx(plan_cost(prices, table, decomposed.assignment))
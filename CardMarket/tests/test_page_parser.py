@@ -0,0 +1,67 @@
+import json
+import os
+
+from page_parser import (
+    PageSnapshots,
+    add_listings,
+    extract_article_rows,
+    parse_article_rows,
+    parse_page,
+    parse_snapshots,
+)
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+PRODUCT_URL = (
+    "https://www.cardmarket.com/en/Magic/Products/Singles/Magic-2010/Lightning-Bolt"
+    "?sellerType=1%2C2&language=1&minCondition=2"
+)
+SEARCH_URL = "https://www.cardmarket.com/en/Magic/Products/Search?mode=list&searchString=lightning+bolt"
+
+
+def load_fixture():
+    """The saved listings page and the ARTICLE_ROW_FIELDS_JS output for it in a browser."""
+    with open(os.path.join(FIXTURES_DIR, "article_rows.html"), 'rb') as f:
+        page_html = f.read()
+    with open(os.path.join(FIXTURES_DIR, "article_rows.json"), 'r', encoding='utf-8') as f:
+        browser_rows = json.load(f)
+    return page_html, browser_rows
+
+
+def test_extract_article_rows_matches_browser_fields():
+    page_html, browser_rows = load_fixture()
+    assert extract_article_rows(page_html) == browser_rows
+    assert extract_article_rows(page_html.decode("utf-8")) == browser_rows
+
+
+def test_parse_page_matches_live_parsing():
+    page_html, browser_rows = load_fixture()
+    expected = add_listings({}, parse_article_rows(browser_rows, PRODUCT_URL, "English"))
+    assert parse_page(page_html, PRODUCT_URL, "English") == expected
+
+    # German rows, rows without a price and rows without a seller are skipped
+    assert expected == {
+        "Lightning Bolt": {
+            "Nordic-Cards": [{"price": 1234.5, "country": "Germany", "quantity": 2, "link": PRODUCT_URL}],
+            "Carta-Magna": [{"price": 0.45, "country": "Spain", "quantity": 1, "link": PRODUCT_URL}],
+            "Kortbutiken": [{"price": 2.0, "country": "Sweden", "quantity": 1, "link": PRODUCT_URL}],
+        }
+    }
+
+
+def test_parse_page_skips_other_pages():
+    page_html, _ = load_fixture()
+    assert parse_page(page_html, SEARCH_URL, "English") is None
+    assert extract_article_rows("") == []
+
+
+def test_snapshots_round_trip(tmp_path):
+    page_html, _ = load_fixture()
+    snapshots = PageSnapshots(str(tmp_path))
+    snapshots.record(PRODUCT_URL, page_html.decode("utf-8"), [SEARCH_URL])
+    snapshots.record("https://www.cardmarket.com/en/Magic", "<html><body></body></html>")
+
+    reopened = PageSnapshots(str(tmp_path))
+    assert [url for url, _ in reopened.pages()] == [PRODUCT_URL, "https://www.cardmarket.com/en/Magic"]
+    assert reopened.redirects() == {SEARCH_URL: PRODUCT_URL}
+    assert parse_snapshots(reopened, "English") == parse_page(page_html, PRODUCT_URL, "English")
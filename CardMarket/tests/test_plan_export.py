@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+import pytest
+
+from main import _card_prices, filter_sellers_df, find_cheapest_seller_group
+from plan_export import PLAN_COLUMNS, ListingIndex, export_plan, plan_rows
+
+
+@pytest.fixture
+def plan(small):
+    """Rows and cost of the numpy engine's plan for the small instance."""
+    filtered_df = filter_sellers_df(small.sellers_df, small.cards)
+    groups, cost = find_cheapest_seller_group(filtered_df, small.shipping_dict, set(small.cards))
+    rows = plan_rows(ListingIndex(small.listings), groups, _card_prices(filtered_df, groups), small.shipping_dict)
+    return rows, cost
+
+
+def test_rows_add_up_to_plan_cost(small, plan):
+    rows, cost = plan
+    assert sorted(row["card"] for row in rows) == sorted(small.cards)
+    assert sum(row["cost"] + row["shipping_share"] for row in rows) == pytest.approx(cost)
+    for row in rows:
+        assert row["cost"] == pytest.approx(row["price"] * row["copies"])
+        assert row["country"] is not None
+
+
+def test_json_export(plan, tmp_path):
+    rows, cost = plan
+    path = tmp_path / "plan.json"
+    export_plan(rows, cost, str(path))
+    exported = json.loads(path.read_text())
+    assert exported["total"] == round(cost, 2)
+    assert exported["card_cost"] + exported["shipping"] == pytest.approx(exported["total"])
+    assert exported["sellers"] == len({row["seller"] for row in rows})
+    assert len(exported["items"]) == len(rows)
+
+
+def test_csv_export(plan, tmp_path):
+    rows, cost = plan
+    path = tmp_path / "plan.csv"
+    export_plan(rows, cost, str(path))
+    exported = pd.read_csv(path)
+    assert list(exported.columns) == PLAN_COLUMNS
+    assert exported["cost"].sum() == pytest.approx(sum(row["cost"] for row in rows), abs=0.01 * len(rows))
+
+
+def test_unknown_format_is_rejected(plan, tmp_path):
+    rows, cost = plan
+    with pytest.raises(ValueError):
+        export_plan(rows, cost, str(tmp_path / "plan.txt"))
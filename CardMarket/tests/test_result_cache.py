@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmark import generate_listings, generate_shipping_dict
+from result_cache import ResultCache, result_key
+
+
+SETTINGS = {"engine": "numpy", "orderings": 1}
+
+
+@pytest.fixture
+def listings() -> pd.DataFrame:
+    return generate_listings(6, 20, 3, 0.5, seed=1)
+
+
+@pytest.fixture
+def card_names(listings) -> list[str]:
+    return sorted(listings['card_name'].astype(str).unique())
+
+
+def test_key_ignores_card_order_case_and_links(listings, card_names):
+    shipping_dict = generate_shipping_dict(1)
+    key = result_key(listings, card_names, shipping_dict, SETTINGS)
+    relinked = listings.copy()
+    relinked['link'] = "https://example.com"
+    assert result_key(listings, [card.upper() for card in reversed(card_names)], shipping_dict, SETTINGS) == key
+    assert result_key(relinked, card_names, shipping_dict, SETTINGS) == key
+
+
+def test_key_changes_with_request(listings, card_names):
+    shipping_dict = generate_shipping_dict(1)
+    key = result_key(listings, card_names, shipping_dict, SETTINGS)
+
+    repriced = listings.copy()
+    repriced.loc[0, 'price'] += 1
+    assert result_key(repriced, card_names, shipping_dict, SETTINGS) != key
+    assert result_key(listings, card_names[1:], shipping_dict, SETTINGS) != key
+    assert result_key(listings, card_names, generate_shipping_dict(2), SETTINGS) != key
+    assert result_key(listings, card_names, shipping_dict, {**SETTINGS, "engine": "exact"}) != key
+
+
+def test_round_trip_and_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=300)
+    value = {"groups": {"seller": {"card": 1}}, "cost": 12.5}
+    assert cache.get("a") is None
+    cache.put("a", value)
+    assert cache.get("a") == value
+
+    # Least recently used entries go first once the cache is over its size
+    for key in ["b", "c", "d"]:
+        os.utime(tmp_path / "a.json", (0, 0))
+        cache.put(key, {"padding": "x" * 100})
+    assert cache.get("a") is None
+    assert cache.get("d") == {"padding": "x" * 100}
+
+
+def test_unreadable_entry_is_dropped(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / "broken.json").write_text("{not json")
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.json").exists()
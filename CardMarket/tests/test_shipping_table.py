@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from benchmark import generate_shipping_dict
+from shipping_table import ShippingTable, country_key
+
+
+COUNTRIES = ["Germany", "France", "Sweden", "Atlantis"]
+
+
+def tier_price(shipping_dict: dict, country: str, value: float) -> float:
+    """Parcel price by the ShippingTable tier rule, from the raw dictionary."""
+    tiers = sorted((tier['maxValue'], tier['price']) for tier in shipping_dict.get(country_key(country), []))
+    if not tiers:
+        return 0.0
+    below = [price for max_value, price in tiers if max_value < value]
+    return below[-1] if below else tiers[0][1]
+
+
+@pytest.fixture
+def shipping_dict() -> dict:
+    return generate_shipping_dict(3)
+
+
+@pytest.fixture
+def values(shipping_dict) -> np.ndarray:
+    # Random values plus the tier breakpoints themselves
+    breakpoints = [tier['maxValue'] for tier in shipping_dict['GERMANY']]
+    rng = np.random.default_rng(3)
+    return np.concatenate([rng.uniform(0, max(breakpoints) * 1.2, 50), breakpoints, [0.0]])
+
+
+def test_scalar_lookups_match_tier_rule(shipping_dict, values):
+    table = ShippingTable.compile(shipping_dict, COUNTRIES)
+    assert table.missing_countries == ["ATLANTIS"]
+    for seller, country in enumerate(COUNTRIES):
+        for value in values:
+            assert table.price_for(seller, value) == tier_price(shipping_dict, country, value)
+
+
+def test_batched_lookups_match_scalar_lookups(shipping_dict, values):
+    table = ShippingTable.compile(shipping_dict, COUNTRIES)
+    grid = np.tile(values[:, None], (1, len(COUNTRIES)))
+    expected = np.array([[table.price_for(s, v) for s in range(len(COUNTRIES))] for v in values])
+    np.testing.assert_array_equal(table.parcel_price(grid), expected)
+
+    sellers = np.array([2, 0, 2])
+    np.testing.assert_array_equal(table.parcel_price(grid[:, sellers], sellers), expected[:, sellers])
+
+
+def test_delta_matches_scalar_delta(shipping_dict, values):
+    table = ShippingTable.compile(shipping_dict, COUNTRIES)
+    rng = np.random.default_rng(4)
+    carried = rng.choice(values, (20, len(COUNTRIES)))
+    added = rng.uniform(0, 30, (20, len(COUNTRIES)))
+    in_plan = carried > values.mean()
+    expected = np.array([
+        [table.delta_for(s, carried[i, s], added[i, s], in_plan[i, s]) for s in range(len(COUNTRIES))]
+        for i in range(len(carried))
+    ])
+    np.testing.assert_allclose(table.delta(carried, added, in_plan), expected)
+
+
+def test_subset_keeps_seller_countries(shipping_dict, values):
+    table = ShippingTable.compile(shipping_dict, COUNTRIES)
+    sellers = np.array([3, 1])
+    subset = table.subset(sellers)
+    assert len(subset) == 2
+    for i, seller in enumerate(sellers):
+        for value in values:
+            assert subset.price_for(i, value) == table.price_for(seller, value)
+
+
+def test_subadditivity_matches_pairwise_check(shipping_dict):
+    table = ShippingTable.compile(shipping_dict, COUNTRIES)
+    for c, country in enumerate(table.countries):
+        breakpoints = table.breakpoints[c].tolist()
+        # Tier prices change just above a breakpoint, so the extremes of every
+        # tier range are on this grid
+        grid = sorted({0.01, *breakpoints, *(b + 0.01 for b in breakpoints)})
+        price = [tier_price(shipping_dict, country, v) for v in grid]
+        monotone = all(p <= q for p, q in zip(price, price[1:]))
+        subadditive = all(
+            tier_price(shipping_dict, country, a + b) <= pa + pb + 1e-9
+            for a, pa in zip(grid, price) for b, pb in zip(grid, price)
+        )
+        assert table.is_subadditive()[c] == (monotone and subadditive)